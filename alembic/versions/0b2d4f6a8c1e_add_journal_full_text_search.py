@@ -0,0 +1,40 @@
+"""Add full-text search index for journal entries
+
+Revision ID: 0b2d4f6a8c1e
+Revises: f9b1d3e5a7c8
+Create Date: 2026-10-18 17:26:52.640173
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0b2d4f6a8c1e'
+down_revision = 'f9b1d3e5a7c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE journal_fts USING fts5(content, user_id UNINDEXED, tokenize='porter unicode61')"
+        )
+        op.execute("INSERT INTO journal_fts (rowid, content, user_id) SELECT id, content, user_id FROM journal_entries")
+    elif dialect == 'postgresql':
+        op.add_column('journal_entries', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute("UPDATE journal_entries SET search_vector = to_tsvector('english', content)")
+        op.create_index('ix_journal_entries_search_vector', 'journal_entries', ['search_vector'], unique=False,
+                        postgresql_using='gin')
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE journal_fts")
+    elif dialect == 'postgresql':
+        op.drop_index('ix_journal_entries_search_vector', table_name='journal_entries')
+        op.drop_column('journal_entries', 'search_vector')
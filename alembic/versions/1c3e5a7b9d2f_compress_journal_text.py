@@ -0,0 +1,42 @@
+"""Compress journal text: compression_dictionaries table, bytea text columns on Postgres
+
+Revision ID: 1c3e5a7b9d2f
+Revises: 0b2d4f6a8c1e
+Create Date: 2026-10-18 18:03:15.927460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c3e5a7b9d2f'
+down_revision = '0b2d4f6a8c1e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('compression_dictionaries',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # SQLite stores compressed blobs in the existing TEXT columns; Postgres needs bytea.
+    # Existing rows keep their text as UTF-8 and are compressed by `python -m app.compression rewrite`.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('journal_entries', 'content', type_=sa.LargeBinary(), existing_nullable=False,
+                        postgresql_using="convert_to(content, 'UTF8')")
+        op.alter_column('journal_entries', 'ai_response', type_=sa.LargeBinary(), existing_nullable=True,
+                        postgresql_using="convert_to(ai_response, 'UTF8')")
+
+
+def downgrade() -> None:
+    # Run `TEXT_COMPRESSION=off python -m app.compression rewrite --restart` first so every value is plain UTF-8
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('journal_entries', 'ai_response', type_=sa.Text(), existing_nullable=True,
+                        postgresql_using="convert_from(ai_response, 'UTF8')")
+        op.alter_column('journal_entries', 'content', type_=sa.Text(), existing_nullable=False,
+                        postgresql_using="convert_from(content, 'UTF8')")
+    op.drop_table('compression_dictionaries')
@@ -0,0 +1,30 @@
+"""Add in_summary to journal_entries
+
+Revision ID: 2e4a6c8d0f1b
+Revises: 1c3e5a7b9d2f
+Create Date: 2026-10-18 21:12:40.318562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e4a6c8d0f1b'
+down_revision = '1c3e5a7b9d2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('journal_entries', sa.Column('in_summary', sa.Boolean(), nullable=False, server_default=sa.false()))
+    # Entries up to each summary's through_date were folded in by the date-based tracking
+    op.execute(
+        "UPDATE journal_entries SET in_summary = true WHERE date <= "
+        "(SELECT through_date FROM journal_summaries WHERE journal_summaries.user_id = journal_entries.user_id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('journal_entries') as batch_op:
+        batch_op.drop_column('in_summary')
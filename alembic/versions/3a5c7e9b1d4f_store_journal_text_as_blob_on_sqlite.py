@@ -0,0 +1,45 @@
+"""Store compressed journal text in BLOB columns on SQLite
+
+Revision ID: 3a5c7e9b1d4f
+Revises: 2e4a6c8d0f1b
+Create Date: 2026-10-18 22:41:07.504183
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a5c7e9b1d4f'
+down_revision = '2e4a6c8d0f1b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Postgres columns became bytea in 1c3e5a7b9d2f
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # The table is copied with CAST(... AS BLOB), so plain values written before compression
+    # become their UTF-8 bytes, like new writes
+    with op.batch_alter_table('journal_entries') as batch_op:
+        batch_op.alter_column('content', type_=sa.LargeBinary(), existing_type=sa.Text(), existing_nullable=False)
+        batch_op.alter_column('ai_response', type_=sa.LargeBinary(), existing_type=sa.Text(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # The copy casts every value to TEXT, which compressed values do not survive
+    compressed = op.get_bind().execute(sa.text(
+        "SELECT count(*) FROM journal_entries "
+        "WHERE hex(substr(content, 1, 1)) = '00' OR hex(substr(ai_response, 1, 1)) = '00'"
+    )).scalar()
+    if compressed:
+        raise RuntimeError(
+            f"{compressed} journal entries hold compressed text; run "
+            "`TEXT_COMPRESSION=off python -m app.compression rewrite --restart` before downgrading"
+        )
+    with op.batch_alter_table('journal_entries') as batch_op:
+        batch_op.alter_column('ai_response', type_=sa.Text(), existing_type=sa.LargeBinary(), existing_nullable=True)
+        batch_op.alter_column('content', type_=sa.Text(), existing_type=sa.LargeBinary(), existing_nullable=False)
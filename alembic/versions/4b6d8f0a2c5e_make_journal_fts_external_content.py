@@ -0,0 +1,50 @@
+"""Make the journal_fts index external-content on SQLite
+
+Revision ID: 4b6d8f0a2c5e
+Revises: 3a5c7e9b1d4f
+Create Date: 2026-10-18 23:52:16.218407
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.compression import register_sqlite_functions
+
+
+# revision identifiers, used by Alembic.
+revision = '4b6d8f0a2c5e'
+down_revision = '3a5c7e9b1d4f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Postgres keeps a tsvector, not a copy of the text
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    # The index reads entries through the view, which decompresses them with decode_text()
+    register_sqlite_functions(bind.connection.driver_connection)
+    op.execute("DROP TABLE journal_fts")
+    op.execute("CREATE VIEW journal_fts_source AS SELECT id, decode_text(content) AS content FROM journal_entries")
+    op.execute(
+        "CREATE VIRTUAL TABLE journal_fts USING fts5("
+        "content, content='journal_fts_source', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute("INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    register_sqlite_functions(bind.connection.driver_connection)
+    op.execute("DROP TABLE journal_fts")
+    op.execute("DROP VIEW journal_fts_source")
+    op.execute(
+        "CREATE VIRTUAL TABLE journal_fts USING fts5(content, user_id UNINDEXED, tokenize='porter unicode61')"
+    )
+    op.execute(
+        "INSERT INTO journal_fts (rowid, content, user_id) "
+        "SELECT id, decode_text(content), user_id FROM journal_entries"
+    )
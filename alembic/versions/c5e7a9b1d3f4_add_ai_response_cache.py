@@ -0,0 +1,33 @@
+"""Add ai_response_cache table and ai_jobs.bypass_cache
+
+Revision ID: c5e7a9b1d3f4
+Revises: a4d6e8f0b2c3
+Create Date: 2026-10-18 12:41:09.337172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e7a9b1d3f4'
+down_revision = 'a4d6e8f0b2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_response_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('total_tokens', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.add_column('ai_jobs', sa.Column('bypass_cache', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('ai_jobs') as batch_op:
+        batch_op.drop_column('bypass_cache')
+    op.drop_table('ai_response_cache')
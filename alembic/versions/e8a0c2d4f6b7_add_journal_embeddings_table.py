@@ -0,0 +1,34 @@
+"""Add journal_embeddings table
+
+Revision ID: e8a0c2d4f6b7
+Revises: d7f9b1c3e5a6
+Create Date: 2026-10-18 15:08:26.471930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a0c2d4f6b7'
+down_revision = 'd7f9b1c3e5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('journal_embeddings',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('token_count', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['entry_id'], ['journal_entries.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('entry_id')
+    )
+    op.create_index(op.f('ix_journal_embeddings_user_id'), 'journal_embeddings', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_journal_embeddings_user_id'), table_name='journal_embeddings')
+    op.drop_table('journal_embeddings')
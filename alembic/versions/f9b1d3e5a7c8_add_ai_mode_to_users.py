@@ -0,0 +1,25 @@
+"""Add ai_mode to users table
+
+Revision ID: f9b1d3e5a7c8
+Revises: e8a0c2d4f6b7
+Create Date: 2026-10-18 16:41:37.205814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9b1d3e5a7c8'
+down_revision = 'e8a0c2d4f6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('ai_mode', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('ai_mode')
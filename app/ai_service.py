@@ -1,47 +1,365 @@
-import openai
-from typing import Optional, List
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.config import settings
+from app import metrics
+from app.database import SessionLocal
+from app.models import AIResponseCacheEntry
+from app.prompt_builder import fit_context
 from app.schemas import AIJournalResponse
+from app.sentiment import SentimentScore, estimate_mood_after, mood_from_score, score_text, tokenize
+
+SYSTEM_PROMPT = "You are a compassionate AI journal companion who provides empathetic and supportive responses."
+
+logger = logging.getLogger(__name__)
+
+
+class AIOverloadedError(Exception):
+    """Raised instead of queueing a completion when too many are already waiting"""
+
+
+class AIEmptyResponseError(Exception):
+    """Raised when a completion comes back without any text (no choices, or None/blank content)"""
+
+
+def openai_module():
+    """The openai package, imported on first use: it is most of the app's import time"""
+    import openai
+
+    return openai
+
+
+@lru_cache(maxsize=None)
+def completion_errors() -> tuple:
+    """Failures of a completion call itself (recorded by the circuit breaker)"""
+    return (openai_module().OpenAIError, asyncio.TimeoutError)
+
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    """Failures worth retrying: the request may well succeed a moment later"""
+    openai = openai_module()
+    return (
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+@lru_cache(maxsize=None)
+def ai_service_errors() -> tuple:
+    """Failures answered with the fallback response (anything else is a bug and propagates)"""
+    return completion_errors() + (CircuitOpenError, AIOverloadedError, AIEmptyResponseError)
+
+
+def completion_text(response) -> str:
+    """The stripped text of a chat completion's first choice"""
+    choices = getattr(response, "choices", None)
+    message = getattr(choices[0], "message", None) if choices else None
+    content = getattr(message, "content", None)
+    if not isinstance(content, str) or not content.strip():
+        finish_reason = getattr(choices[0], "finish_reason", None) if choices else None
+        raise AIEmptyResponseError(f"Completion has no text (finish_reason={finish_reason})")
+    return content.strip()
+
+
+# (keywords, suggestion) pairs used when an entry mentions the theme
+THEME_SUGGESTIONS = [
+    (frozenset("sleep slept insomnia exhausted tired awake nap".split()),
+     "Protect your sleep tonight: put screens away 30 minutes before bed"),
+    (frozenset("work job boss deadline deadlines meeting project exam exams study".split()),
+     "Write down the one task that matters most tomorrow"),
+    (frozenset("anxious anxiety worried worry nervous panic".split()),
+     "Try the 5-4-3-2-1 grounding exercise when worry builds"),
+    (frozenset("lonely alone isolated".split()),
+     "Reach out to someone you trust, even with a short message"),
+    (frozenset("angry frustrated annoyed irritated furious".split()),
+     "Step away for ten minutes before responding to what frustrated you"),
+    (frozenset("sick pain headache ill".split()),
+     "Be gentle with your body today: rest and stay hydrated"),
+    (frozenset("proud accomplished achieved finished won".split()),
+     "Note what made this win possible so you can repeat it"),
+]
+
+# Bump whenever the prompt or its inputs change so cached responses are not reused
+PROMPT_VERSION = "2"
+
+
+class AIResponseCache:
+    """Content-addressed cache of completion text.
+
+    Keys hash everything that shapes the completion (entry content, mood,
+    context entries, model and prompt version), so identical requests share
+    a response. The in-memory LRU tier is per process; the optional table tier
+    is shared by every worker.
+    """
+
+    def __init__(self, max_entries: int, persistent: bool):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    @staticmethod
+    def make_key(
+        journal_content: str,
+        mood_before: Optional[int],
+        previous_entries: Optional[List[str]],
+        history_summary: Optional[str] = None
+    ) -> str:
+        material = json.dumps(
+            [PROMPT_VERSION, settings.openai_model, journal_content, mood_before, previous_entries or [], history_summary],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+        if cached is None and self.persistent:
+            cached = self._load(key)
+            if cached is not None:
+                self._remember(key, cached)
+        metrics.record_cache_lookup("ai_response", cached is not None)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += cached[1]
+        metrics.ai_cache_saved_tokens.inc(cached[1])
+        return cached[0]
+
+    def set(self, key: str, response: str, total_tokens: int) -> None:
+        self._remember(key, (response, total_tokens))
+        if self.persistent:
+            self._store(key, response, total_tokens)
+
+    def _remember(self, key: str, value: Tuple[str, int]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[Tuple[str, int]]:
+        db = SessionLocal()
+        try:
+            row = db.get(AIResponseCacheEntry, key)
+            return (row.response, row.total_tokens or 0) if row else None
+        finally:
+            db.close()
+
+    def _store(self, key: str, response: str, total_tokens: int) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(AIResponseCacheEntry(key=key, response=response, total_tokens=total_tokens))
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same key first
+            db.rollback()
+        except SQLAlchemyError as e:
+            # The cache is best effort, but a table that keeps failing should show up in the logs
+            db.rollback()
+            logger.warning("Could not store AI response cache entry: %r", e)
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "saved_tokens": self.saved_tokens,
+            "entries": len(self._entries),
+            "persistent": self.persistent
+        }
 
 
 class AIJournalService:
     def __init__(self):
-        self.client = None
-        if settings.openai_api_key:
+        self._client = None
+        self._client_failed = False
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self.breaker = CircuitBreaker(
+            "openai",
+            window_size=settings.ai_breaker_window,
+            min_calls=settings.ai_breaker_min_calls,
+            failure_rate_threshold=settings.ai_breaker_failure_rate,
+            slow_call_seconds=settings.ai_breaker_slow_call_seconds,
+            slow_call_rate_threshold=settings.ai_breaker_slow_call_rate,
+            open_seconds=settings.ai_breaker_open_seconds
+        )
+        self.cache = AIResponseCache(settings.ai_cache_max_entries, settings.ai_cache_persistent)
+    
+    @property
+    def configured(self) -> bool:
+        """Whether an OpenAI API key is set (does not import openai)"""
+        return bool(settings.openai_api_key)
+    
+    @property
+    def client(self):
+        """The AsyncOpenAI client, created on first use; None when not configured or it failed to initialize"""
+        if self._client is None and self.configured and not self._client_failed:
             try:
-                # Try the new OpenAI client initialization
-                self.client = openai.OpenAI(api_key=settings.openai_api_key)
-                print("✅ OpenAI client initialized successfully")
+                # Retries are handled in _create_completion so they can release the concurrency slot
+                self._client = openai_module().AsyncOpenAI(
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                    timeout=settings.openai_timeout_seconds,
+                    max_retries=0
+                )
+                logger.info("OpenAI client initialized")
             except Exception as e:
-                print(f"Warning: Failed to initialize OpenAI client: {e}")
-                # Try alternative initialization
+                logger.warning("Failed to initialize OpenAI client: %r", e)
+                self._client_failed = True
+        return self._client
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+        return self._semaphore
+    
+    def _admit(self) -> None:
+        """Shed the call if too many are queued, or short-circuit it while the breaker is open"""
+        if self._waiting >= settings.openai_max_concurrency + settings.openai_max_queued:
+            raise AIOverloadedError(f"{self._waiting} completions already in flight or queued")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+    
+    def _messages(self, prompt: str) -> List[dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def _create_completion(self, prompt: str) -> Tuple[str, int]:
+        """Run a chat completion with a per-call timeout, jittered retries and the process-wide cap.
+
+        Every attempt is recorded by the circuit breaker, which is checked again
+        before each retry.
+        """
+        attempt = 0
+        while True:
+            self._admit()
+            self._waiting += 1
+            try:
+                async with self._get_semaphore():
+                    started = time.monotonic()
+                    try:
+                        response = await asyncio.wait_for(
+                            self.client.chat.completions.create(
+                                model=settings.openai_model,
+                                messages=self._messages(prompt),
+                                max_tokens=500,
+                                temperature=0.7
+                            ),
+                            timeout=settings.openai_timeout_seconds
+                        )
+                    except completion_errors() as e:
+                        self.breaker.record_failure(time.monotonic() - started)
+                        metrics.record_ai_error("completion", e)
+                        raise
+                    self.breaker.record_success(time.monotonic() - started)
+                    metrics.record_ai_call("completion", time.monotonic() - started)
+                usage = getattr(response, "usage", None)
+                return completion_text(response), getattr(usage, "total_tokens", None) or 0
+            except retryable_errors() as e:
+                if attempt >= settings.openai_max_retries:
+                    raise
+                logger.info("OpenAI completion failed (attempt %s), retrying: %r", attempt + 1, e)
+                # Full jitter keeps retrying workers from synchronizing
+                await asyncio.sleep(random.uniform(0, settings.openai_retry_base_seconds * 2 ** attempt))
+                attempt += 1
+            finally:
+                self._waiting -= 1
+    
+    async def _stream_completion(self, prompt: str, usage: dict) -> AsyncIterator[str]:
+        """Yield completion text deltas; the timeout applies to each wait for the next chunk.
+
+        The total token count reported at the end of the stream is stored in `usage`.
+        The circuit breaker judges the call's latency by its time to first chunk.
+        """
+        self._admit()
+        self._waiting += 1
+        try:
+            async with self._get_semaphore():
+                started = time.monotonic()
+                first_chunk_seconds = None
                 try:
-                    openai.api_key = settings.openai_api_key
-                    self.client = openai
-                    print("✅ OpenAI client initialized with legacy method")
-                except Exception as e2:
-                    print(f"Warning: Legacy OpenAI initialization also failed: {e2}")
-                    self.client = None
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=settings.openai_model,
+                            messages=self._messages(prompt),
+                            max_tokens=500,
+                            temperature=0.7,
+                            stream=True,
+                            stream_options={"include_usage": True}
+                        ),
+                        timeout=settings.openai_timeout_seconds
+                    )
+                    try:
+                        chunks = stream.__aiter__()
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.openai_timeout_seconds)
+                            except StopAsyncIteration:
+                                break
+                            if first_chunk_seconds is None:
+                                first_chunk_seconds = time.monotonic() - started
+                            if getattr(chunk, "usage", None) is not None:
+                                usage["total_tokens"] = chunk.usage.total_tokens or 0
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                    finally:
+                        # Also when the consumer stops early (client disconnected): release the
+                        # upstream connection instead of letting OpenAI finish generating
+                        await stream.close()
+                except completion_errors() as e:
+                    self.breaker.record_failure(time.monotonic() - started)
+                    metrics.record_ai_error("stream", e)
+                    raise
+                self.breaker.record_success(first_chunk_seconds or time.monotonic() - started)
+                metrics.record_ai_call("stream", first_chunk_seconds or time.monotonic() - started)
+        finally:
+            self._waiting -= 1
     
-    async def generate_journal_response(
-        self, 
-        journal_content: str, 
+    def _build_prompt(
+        self,
+        journal_content: str,
         mood_before: Optional[int] = None,
-        previous_entries: Optional[List[str]] = None
-    ) -> AIJournalResponse:
-        """Generate an empathetic AI response to a journal entry"""
-        
-        if not self.client:
-            return AIJournalResponse(
-                response="I'm sorry, but the AI service is not available at the moment. Please try again later.",
-                mood_after=mood_before,
-                suggestions=["Consider talking to a trusted friend or professional"]
-            )
+        previous_entries: Optional[List[str]] = None,
+        history_summary: Optional[str] = None
+    ) -> str:
+        # Keep the prompt within the token budget
+        journal_content, previous_entries, history_summary = fit_context(
+            journal_content, previous_entries, history_summary
+        )
         
-        # Build context from previous entries if available
+        # Build context from the history summary and previous entries if available
         context = ""
+        if history_summary:
+            context += f"Summary of earlier journal entries:\n{history_summary}\n\n"
         if previous_entries:
-            context = f"Previous journal entries for context:\n" + "\n".join(previous_entries[-3:]) + "\n\n"
+            context += f"Previous journal entries for context:\n" + "\n".join(previous_entries) + "\n\n"
         
         # Create mood context
         mood_context = ""
@@ -60,7 +378,7 @@ class AIJournalService:
             }
             mood_context = f"The user mentioned their mood was {mood_descriptions.get(mood_before, 'neutral')} ({mood_before}/10) before writing this entry.\n\n"
         
-        prompt = f"""You are a compassionate and understanding AI journal companion. Your role is to provide empathetic, supportive, and helpful responses to users' journal entries. 
+        return f"""You are a compassionate and understanding AI journal companion. Your role is to provide empathetic, supportive, and helpful responses to users' journal entries. 
 
 {context}{mood_context}User's journal entry:
 "{journal_content}"
@@ -75,57 +393,184 @@ Please respond with:
 Keep your response warm, empathetic, and conversational. Avoid being overly clinical or giving unsolicited advice. Focus on being a supportive listener who understands and cares.
 
 Your response should be 2-3 paragraphs long and end with a thoughtful question to encourage continued reflection."""
+    
+    def _complete_response(self, ai_response: str, journal_content: str, mood_before: Optional[int]) -> AIJournalResponse:
+        # Generate suggestions based on the content
+        suggestions = self._generate_suggestions(journal_content, mood_before)
+        
+        # Estimate mood after (simple heuristic)
+        mood_after = self._estimate_mood_after(journal_content, mood_before)
+        
+        return AIJournalResponse(
+            response=ai_response,
+            mood_after=mood_after,
+            suggestions=suggestions
+        )
+    
+    async def generate_journal_response(
+        self, 
+        journal_content: str, 
+        mood_before: Optional[int] = None,
+        previous_entries: Optional[List[str]] = None,
+        fallback_on_error: bool = True,
+        use_cache: bool = True,
+        history_summary: Optional[str] = None
+    ) -> AIJournalResponse:
+        """Generate an empathetic AI response to a journal entry
+
+        With ``fallback_on_error=False`` completion errors propagate instead of
+        being replaced by the generic fallback response (used by background jobs).
+        With ``use_cache=False`` a fresh completion is requested (and cached).
+        """
+        
+        if not self.client:
+            return self.unavailable_response(mood_before)
+        
+        cache_key = (
+            self.cache.make_key(journal_content, mood_before, previous_entries, history_summary)
+            if settings.ai_cache_enabled else None
+        )
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self._complete_response(cached, journal_content, mood_before)
+        
+        prompt = self._build_prompt(journal_content, mood_before, previous_entries, history_summary)
 
         try:
-            # Check if it's the new OpenAI client or legacy
-            if hasattr(self.client, 'chat'):
-                # New OpenAI client
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a compassionate AI journal companion who provides empathetic and supportive responses."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500,
-                    temperature=0.7
-                )
-                ai_response = response.choices[0].message.content.strip()
-            else:
-                # Legacy OpenAI client
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a compassionate AI journal companion who provides empathetic and supportive responses."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=500,
-                    temperature=0.7
-                )
-                ai_response = response.choices[0].message.content.strip()
-            
-            # Generate suggestions based on the content
-            suggestions = self._generate_suggestions(journal_content, mood_before)
-            
-            # Estimate mood after (simple heuristic)
-            mood_after = self._estimate_mood_after(journal_content, mood_before)
-            
-            return AIJournalResponse(
-                response=ai_response,
-                mood_after=mood_after,
-                suggestions=suggestions
-            )
+            ai_response, total_tokens = await self._create_completion(prompt)
+            if cache_key:
+                self.cache.set(cache_key, ai_response, total_tokens)
+            return self._complete_response(ai_response, journal_content, mood_before)
             
-        except Exception as e:
-            return AIJournalResponse(
-                response=f"I'm here to listen and support you. Your thoughts and feelings are valid, and it's great that you're taking time to reflect through journaling. What would you like to explore further about your current situation?",
-                mood_after=mood_before,
-                suggestions=["Consider what you're grateful for today", "Think about what you need most right now"]
-            )
-    
-    def _generate_suggestions(self, content: str, mood_before: Optional[int]) -> List[str]:
+        except ai_service_errors() as e:
+            if not fallback_on_error:
+                raise
+            self._log_fallback(e)
+            return self.fallback_response(mood_before)
+    
+    async def stream_journal_response(
+        self,
+        journal_content: str,
+        mood_before: Optional[int] = None,
+        previous_entries: Optional[List[str]] = None,
+        use_cache: bool = True,
+        history_summary: Optional[str] = None
+    ) -> AsyncIterator[Union[str, AIJournalResponse]]:
+        """Stream the response text as the model produces it, then yield the final AIJournalResponse.
+
+        If the stream fails part way, the final item is the fallback response,
+        which supersedes any text already streamed.
+        """
+        if not self.client:
+            fallback = self.unavailable_response(mood_before)
+            yield fallback.response
+            yield fallback
+            return
+        
+        cache_key = (
+            self.cache.make_key(journal_content, mood_before, previous_entries, history_summary)
+            if settings.ai_cache_enabled else None
+        )
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                yield self._complete_response(cached, journal_content, mood_before)
+                return
+        
+        prompt = self._build_prompt(journal_content, mood_before, previous_entries, history_summary)
+        parts = []
+        usage = {}
+        deltas = self._stream_completion(prompt, usage)
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+        except ai_service_errors() as e:
+            self._log_fallback(e)
+            fallback = self.fallback_response(mood_before)
+            if not parts:
+                yield fallback.response
+            yield fallback
+            return
+        finally:
+            # Closed by our consumer part way: close the completion stream now, not when collected
+            await deltas.aclose()
+        
+        ai_response = "".join(parts).strip()
+        if not ai_response:
+            self._log_fallback(AIEmptyResponseError("Streamed completion has no text"))
+            fallback = self.fallback_response(mood_before)
+            yield fallback.response
+            yield fallback
+            return
+        if cache_key:
+            self.cache.set(cache_key, ai_response, usage.get("total_tokens", 0))
+        yield self._complete_response(ai_response, journal_content, mood_before)
+    
+    def _log_fallback(self, error: Exception) -> None:
+        if isinstance(error, (CircuitOpenError, AIOverloadedError)):
+            # Expected while degraded; the breaker already logged why it opened
+            logger.debug("Serving fallback AI response: %s", error)
+        else:
+            logger.warning("AI completion failed, serving fallback response: %r", error)
+    
+    def unavailable_response(self, mood_before: Optional[int] = None) -> AIJournalResponse:
+        """Response used when no OpenAI client is configured"""
+        return AIJournalResponse(
+            response="I'm sorry, but the AI service is not available at the moment. Please try again later.",
+            mood_after=mood_before,
+            suggestions=["Consider talking to a trusted friend or professional"]
+        )
+    
+    def fallback_response(self, mood_before: Optional[int] = None) -> AIJournalResponse:
+        """Generic supportive response used when the AI call fails"""
+        return AIJournalResponse(
+            response=f"I'm here to listen and support you. Your thoughts and feelings are valid, and it's great that you're taking time to reflect through journaling. What would you like to explore further about your current situation?",
+            mood_after=mood_before,
+            suggestions=["Consider what you're grateful for today", "Think about what you need most right now"]
+        )
+    
+    def local_journal_response(self, journal_content: str, mood_before: Optional[int] = None) -> AIJournalResponse:
+        """Build every response field locally from lexicon sentiment and rule-based suggestions (no network)"""
+        score = score_text(journal_content)
+        return AIJournalResponse(
+            response=self._local_reflection(score),
+            mood_after=mood_from_score(mood_before, score),
+            suggestions=self._generate_suggestions(journal_content, mood_before, score)
+        )
+    
+    def _local_reflection(self, score: SentimentScore) -> str:
+        if score.compound >= 0.3:
+            return ("It sounds like there was real good in what you wrote about today. "
+                    "What made the biggest difference, and how could you make room for more of it?")
+        if score.compound <= -0.3:
+            return ("Thank you for writing this down; it sounds like today weighed on you, and those feelings are valid. "
+                    "What is one small thing that might make tomorrow a little easier?")
+        return ("Thanks for taking a moment to reflect today. "
+                "What stands out most to you when you read this entry back?")
+    
+    def _generate_suggestions(
+        self,
+        content: str,
+        mood_before: Optional[int],
+        score: Optional[SentimentScore] = None
+    ) -> List[str]:
         """Generate helpful suggestions based on journal content"""
         suggestions = []
         
+        # Topic-based suggestions for themes mentioned in the entry
+        tokens = set(tokenize(content))
+        for keywords, suggestion in THEME_SUGGESTIONS:
+            if not tokens.isdisjoint(keywords):
+                suggestions.append(suggestion)
+        
+        # Without a mood rating, fall back on the entry's sentiment
+        if not mood_before:
+            compound = (score or score_text(content)).compound
+            mood_before = 3 if compound <= -0.3 else 8 if compound >= 0.3 else None
+        
         # Mood-based suggestions
         if mood_before and mood_before <= 4:
             suggestions.extend([
@@ -146,28 +591,11 @@ Your response should be 2-3 paragraphs long and end with a thoughtful question t
                 "Write about what you need most right now"
             ])
         
-        return suggestions[:3]  # Return top 3 suggestions
+        return list(dict.fromkeys(suggestions))[:3]  # Return top 3 suggestions
     
     def _estimate_mood_after(self, content: str, mood_before: Optional[int]) -> Optional[int]:
-        """Simple heuristic to estimate mood after journaling"""
-        if not mood_before:
-            return None
-        
-        # Simple keyword-based mood estimation
-        positive_words = ["happy", "good", "great", "excited", "grateful", "proud", "accomplished", "better", "relief"]
-        negative_words = ["sad", "angry", "frustrated", "worried", "anxious", "stressed", "overwhelmed", "tired"]
-        
-        content_lower = content.lower()
-        positive_count = sum(1 for word in positive_words if word in content_lower)
-        negative_count = sum(1 for word in negative_words if word in content_lower)
-        
-        # Adjust mood based on content
-        if positive_count > negative_count:
-            return min(10, mood_before + 1)
-        elif negative_count > positive_count:
-            return max(1, mood_before - 1)
-        else:
-            return mood_before
+        """Estimate mood after journaling from the entry's lexicon sentiment"""
+        return estimate_mood_after(content, mood_before)
 
 
 # Global instance
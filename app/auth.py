@@ -1,21 +1,52 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app import metrics
 from app.config import settings
 from app.database import get_db
 from app.models import User
 from app.schemas import TokenData
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing - hashes made with a different cost are upgraded on next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+# bcrypt runs in its own small pool so it never blocks the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash"
+)
+_hash_semaphore: Optional[asyncio.Semaphore] = None
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# user_id -> (token_version, is_active, confirmed_at) as last read from the database
+_token_versions: Dict[int, Tuple[int, bool, float]] = {}
+
+
+class AuthenticatedUser:
+    """Principal built from verified token claims, without a database round trip"""
+    __slots__ = ("id", "email", "is_active", "token_version")
+
+    def __init__(self, id: int, email: str, is_active: bool, token_version: int):
+        self.id = id
+        self.email = email
+        self.is_active = is_active
+        self.token_version = token_version
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -27,6 +58,30 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _get_hash_semaphore() -> asyncio.Semaphore:
+    global _hash_semaphore
+    if _hash_semaphore is None:
+        _hash_semaphore = asyncio.Semaphore(settings.password_hash_concurrency)
+    return _hash_semaphore
+
+
+async def _run_password_hash(func, *args):
+    """Run a bcrypt call on the hashing pool, bounded by the hashing concurrency limit"""
+    async with _get_hash_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash without blocking the event loop"""
+    return await _run_password_hash(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await _run_password_hash(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -40,18 +95,109 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user with email and password"""
+def create_user_access_token(user: Union[User, AuthenticatedUser], expires_delta: Optional[timedelta] = None) -> str:
+    """Create an access token for a user, embedding id/status claims when enabled"""
+    data = {"sub": user.email}
+    if settings.stateless_auth_tokens:
+        data.update({
+            "uid": user.id,
+            "act": bool(user.is_active),
+            "ver": user.token_version or 0,
+        })
+    return create_access_token(data, expires_delta=expires_delta)
+
+
+def create_refresh_token(user: Union[User, AuthenticatedUser]) -> str:
+    """Create a long-lived, single-use refresh token"""
+    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    to_encode = {
+        "sub": user.email,
+        "uid": user.id,
+        "ver": user.token_version or 0,
+        "typ": "refresh",
+        "jti": uuid.uuid4().hex,
+        "exp": expire,
+    }
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Decode a refresh token, returning None if it is invalid or not a refresh token"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    if payload.get("typ") != "refresh" or not payload.get("jti") or "uid" not in payload:
+        return None
+    return payload
+
+
+def remember_token_version(user: User) -> None:
+    """Record the token version and status just read from the database"""
+    _token_versions[user.id] = (user.token_version or 0, bool(user.is_active), time.monotonic())
+
+
+def revoke_user_tokens(db: Session, user: User) -> None:
+    """Invalidate every token issued to a user so far (caller commits)"""
+    user.token_version = (user.token_version or 0) + 1
+    db.flush()
+    remember_token_version(user)
+
+
+def user_from_claims(payload: dict, db: Session) -> Optional[Union[User, AuthenticatedUser]]:
+    """Resolve a user from id/version claims, hitting the database only for stale versions.
+
+    A token version is considered stale when this process has not confirmed the
+    user's version within ``auth_version_cache_seconds`` or when the confirmed
+    version differs from the token's. Only then is the user loaded by primary key.
+    """
+    try:
+        user_id = int(payload["uid"])
+        token_version = int(payload.get("ver", 0))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    cached = _token_versions.get(user_id)
+    if cached is not None:
+        version, is_active, confirmed_at = cached
+        fresh = time.monotonic() - confirmed_at < settings.auth_version_cache_seconds
+        if fresh and version == token_version:
+            metrics.record_cache_lookup("token_version", True)
+            return AuthenticatedUser(user_id, payload.get("sub"), is_active and payload.get("act", True), version)
+
+    metrics.record_cache_lookup("token_version", False)
+    user = db.get(User, user_id)
+    if user is None:
+        _token_versions.pop(user_id, None)
+        return None
+    remember_token_version(user)
+    if (user.token_version or 0) != token_version:
+        return None
+    return user
+
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate a user with email and password, rehashing outdated hashes"""
     user = db.query(User).filter(User.email == email).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
+    if pwd_context.needs_update(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        db.commit()
+    remember_token_version(user)
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get the current authenticated user"""
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> Union[User, AuthenticatedUser]:
+    """Get the current authenticated user
+
+    Tokens carrying a ``uid`` claim are authorized from their claims; legacy
+    email-subject tokens are still resolved through the email column.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -61,20 +207,48 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("typ") == "refresh":
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
     
+    if "uid" in payload:
+        user = user_from_claims(payload, db)
+        if user is None:
+            raise credentials_exception
+        return user
+    
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(
+    current_user: Union[User, AuthenticatedUser] = Depends(get_current_user)
+) -> Union[User, AuthenticatedUser]:
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+def get_current_active_db_user(
+    current_user: Union[User, AuthenticatedUser] = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current active user as a full database row (for routes that need profile fields)"""
+    if isinstance(current_user, User):
+        return current_user
+    user = db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    remember_token_version(user)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
@@ -0,0 +1,332 @@
+"""
+Regenerate AI responses for many journal entries, e.g. after a prompt change
+
+Run with: python -m app.bulk_regenerate [--user-id N] [--since YYYY-MM-DD] [--rate 2] ...
+
+Entries are processed in id order with bounded concurrency and an adaptive
+request rate. Results are written back in batches, and after each batch the
+checkpoint file records how far the run got, so an interrupted run resumes
+where it stopped when started again with the same filters.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import date
+from typing import List, Optional, Tuple
+import openai
+from sqlalchemy import bindparam, update
+from app.ai_service import ai_journal_service, AIEmptyResponseError, AIOverloadedError
+from app.circuit_breaker import CircuitOpenError
+from app.compression import CompressedText, decode_text, load_dictionaries
+from app.config import settings
+from app.database import SessionLocal
+from app.journal_ai import get_context_entries, get_history_summary
+from app.models import JournalEntry
+
+logger = logging.getLogger("app.bulk_regenerate")
+
+_entries = JournalEntry.__table__
+
+# Writes skip entries that were edited or queued for the worker since they were read
+# (content is compared in its stored form, as read)
+_WRITE_BACK = update(_entries).where(
+    _entries.c.id == bindparam("entry_id"),
+    _entries.c.content == bindparam("old_content", type_=CompressedText(encode_binds=False)),
+    _entries.c.ai_status != "pending"
+).values(
+    ai_response=bindparam("new_response"),
+    mood_after=bindparam("new_mood_after"),
+    ai_status="complete"
+)
+
+
+class AdaptiveRateLimiter:
+    """Spaces requests `1 / rate` seconds apart, halving the rate when OpenAI
+    throttles and creeping back up by `increase` per success (AIMD)."""
+
+    def __init__(self, rate: float, min_rate: float = 0.1, increase: float = 0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0
+        self.increase = increase
+        self._next_at = 0.0
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        """Wait out any throttling pause, then for this request's slot (no slots when the rate is unlimited)"""
+        now = time.monotonic()
+        start = max(now, self._paused_until)
+        if self.rate > 0:
+            start = max(start, self._next_at)
+            self._next_at = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def on_success(self) -> None:
+        if self.rate > 0:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, pause_seconds: float) -> None:
+        if self.rate > 0:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause_seconds)
+
+
+class Checkpoint:
+    """Progress of a run: every entry with id <= last_id has been handled"""
+
+    def __init__(self, path: str, filters: dict):
+        self.path = path
+        self.filters = filters
+        self.last_id = 0
+        self.processed = 0
+        self.failed: List[int] = []
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("filters") != self.filters:
+            raise SystemExit(
+                f"Checkpoint {self.path} was written for different filters {data.get('filters')}; "
+                "use --restart or another --checkpoint file"
+            )
+        self.last_id = data["last_id"]
+        self.processed = data.get("processed", 0)
+        self.failed = data.get("failed", [])
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "filters": self.filters,
+                "last_id": self.last_id,
+                "processed": self.processed,
+                "failed": self.failed,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+class BulkRegenerator:
+    def __init__(
+        self,
+        filters: dict,
+        checkpoint: Checkpoint,
+        concurrency: int,
+        rate: float,
+        batch_size: int,
+        max_attempts: int,
+        use_cache: bool
+    ):
+        self.filters = filters
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.limiter = AdaptiveRateLimiter(rate)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.use_cache = use_cache
+        self.db = SessionLocal()
+        # Ids in dispatch order; the checkpoint advances over the handled prefix
+        self._dispatched = deque()
+        self._handled = set()
+        self._results: List[dict] = []
+        self._failed: List[int] = []
+        self._latencies: List[float] = []
+        self._started = 0.0
+        self._done = 0
+
+    def _select(self, after_id: int, limit: int) -> List[Tuple[int, int, object, Optional[int]]]:
+        query = self.db.query(
+            JournalEntry.id, JournalEntry.user_id, JournalEntry._content, JournalEntry.mood_before
+        ).filter(JournalEntry.id > after_id)
+        if self.filters.get("user_ids"):
+            query = query.filter(JournalEntry.user_id.in_(self.filters["user_ids"]))
+        if self.filters.get("since"):
+            query = query.filter(JournalEntry.date >= date.fromisoformat(self.filters["since"]))
+        if self.filters.get("until"):
+            query = query.filter(JournalEntry.date <= date.fromisoformat(self.filters["until"]))
+        if self.filters.get("statuses"):
+            query = query.filter(JournalEntry.ai_status.in_(self.filters["statuses"]))
+        if self.filters.get("only_fallback"):
+            query = query.filter(JournalEntry.ai_response == ai_journal_service.fallback_response().response)
+        return query.order_by(JournalEntry.id).limit(limit).all()
+
+    async def _regenerate(self, entry_id: int, user_id: int, stored_content, mood_before: Optional[int]) -> None:
+        content = decode_text(stored_content)
+        previous_entries = get_context_entries(self.db, user_id, content, exclude_entry_id=entry_id)
+        history_summary = get_history_summary(self.db, user_id)
+
+        attempt = 0
+        while attempt < self.max_attempts:
+            await self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                ai_response = await ai_journal_service.generate_journal_response(
+                    journal_content=content,
+                    mood_before=mood_before,
+                    previous_entries=previous_entries,
+                    fallback_on_error=False,
+                    use_cache=self.use_cache,
+                    history_summary=history_summary
+                )
+            except (CircuitOpenError, AIOverloadedError) as e:
+                # Not an attempt against OpenAI: wait for the circuit to close and try again
+                logger.info("Entry %s deferred: %s", entry_id, e)
+                self.limiter.on_throttled(settings.ai_breaker_open_seconds)
+                continue
+            except openai.RateLimitError as e:
+                attempt += 1
+                logger.info("Entry %s throttled (attempt %s): %r", entry_id, attempt, e)
+                self.limiter.on_throttled(settings.openai_retry_base_seconds * 2 ** attempt)
+                continue
+            except (openai.OpenAIError, asyncio.TimeoutError, AIEmptyResponseError) as e:
+                attempt += 1
+                logger.warning("Entry %s failed (attempt %s): %r", entry_id, attempt, e)
+                continue
+
+            self.limiter.on_success()
+            self._latencies.append(time.perf_counter() - started)
+            self._results.append({
+                "entry_id": entry_id,
+                "old_content": stored_content,
+                "new_response": ai_response.response,
+                "new_mood_after": ai_response.mood_after,
+            })
+            return
+
+        self._failed.append(entry_id)
+
+    def _flush(self, final: bool = False) -> None:
+        """Write finished results in one transaction, then advance the checkpoint"""
+        results, failed = self._results, self._failed
+        self._results, self._failed = [], []
+        if results:
+            self.db.execute(_WRITE_BACK, results)
+        self.db.commit()
+
+        self._handled.update(result["entry_id"] for result in results)
+        self._handled.update(failed)
+        self.checkpoint.processed += len(results)
+        self.checkpoint.failed.extend(failed)
+        self._done += len(results) + len(failed)
+        while self._dispatched and self._dispatched[0] in self._handled:
+            self._handled.discard(self._dispatched[0])
+            self.checkpoint.last_id = self._dispatched.popleft()
+        self.checkpoint.save()
+        self._report(final)
+
+    def _report(self, final: bool = False) -> None:
+        elapsed = time.perf_counter() - self._started
+        latencies = sorted(self._latencies[-1000:])
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        logger.info(
+            "%s%s entries in %.0fs (%.2f/s), %s failed, p50 completion %.2fs, rate limit %.2f/s, checkpoint id %s",
+            "Finished: " if final else "", self._done, elapsed, self._done / elapsed if elapsed else 0.0,
+            len(self.checkpoint.failed), p50, self.limiter.rate, self.checkpoint.last_id
+        )
+
+    async def run(self, limit: Optional[int] = None) -> None:
+        self._started = time.perf_counter()
+        in_flight = set()
+        after_id = self.checkpoint.last_id
+        remaining = limit
+        exhausted = False
+
+        try:
+            while True:
+                # Keep up to `concurrency` completions in flight, reading entries a page at a time
+                if not exhausted and len(in_flight) < self.concurrency:
+                    page_size = self.concurrency - len(in_flight)
+                    if remaining is not None:
+                        page_size = min(page_size, remaining)
+                    rows = self._select(after_id, page_size) if page_size > 0 else []
+                    if not rows:
+                        exhausted = True
+                    for entry_id, user_id, stored_content, mood_before in rows:
+                        self._dispatched.append(entry_id)
+                        in_flight.add(asyncio.create_task(
+                            self._regenerate(entry_id, user_id, stored_content, mood_before)
+                        ))
+                        after_id = entry_id
+                    if remaining is not None:
+                        remaining -= len(rows)
+
+                if not in_flight:
+                    break
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+
+                if len(self._results) + len(self._failed) >= self.batch_size:
+                    self._flush()
+            self._flush(final=True)
+        finally:
+            for task in in_flight:
+                task.cancel()
+            self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate AI responses for journal entries in bulk")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids", help="only this user (repeatable)")
+    parser.add_argument("--since", help="only entries dated on or after YYYY-MM-DD")
+    parser.add_argument("--until", help="only entries dated on or before YYYY-MM-DD")
+    parser.add_argument("--status", action="append", dest="statuses", choices=["complete", "failed", "pending"],
+                        help="only entries with this ai_status (repeatable)")
+    parser.add_argument("--only-fallback", action="store_true", help="only entries holding the fallback response")
+    parser.add_argument("--limit", type=int, help="stop after this many entries")
+    parser.add_argument("--concurrency", type=int, default=settings.openai_max_concurrency,
+                        help="completions in flight at once")
+    parser.add_argument("--rate", type=float, default=2.0, help="max completions started per second (0 = unlimited)")
+    parser.add_argument("--batch-size", type=int, default=50, help="results written per commit")
+    parser.add_argument("--max-attempts", type=int, default=3, help="attempts per entry before it is skipped")
+    parser.add_argument("--use-cache", action="store_true", help="reuse cached responses for unchanged inputs")
+    parser.add_argument("--checkpoint", default="bulk_regenerate.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # One line per completion request drowns out the progress reports
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Each of --max-attempts is one request, retried here at the adaptive rate; the
+    # service's own retries would multiply the requests made for a failing entry
+    settings.openai_max_retries = 0
+
+    if not settings.openai_api_key:
+        raise SystemExit("OPENAI_API_KEY is not configured")
+
+    filters = {
+        "user_ids": sorted(args.user_ids or []),
+        "since": args.since,
+        "until": args.until,
+        "statuses": sorted(args.statuses or []),
+        "only_fallback": args.only_fallback,
+    }
+    load_dictionaries()
+    checkpoint = Checkpoint(args.checkpoint, filters)
+    if not args.restart:
+        checkpoint.load()
+    if checkpoint.last_id:
+        logger.info("Resuming after entry %s (%s done so far)", checkpoint.last_id, checkpoint.processed)
+
+    regenerator = BulkRegenerator(
+        filters,
+        checkpoint,
+        concurrency=max(1, min(args.concurrency, settings.openai_max_concurrency + settings.openai_max_queued)),
+        rate=args.rate,
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts,
+        use_cache=args.use_cache
+    )
+    asyncio.run(regenerator.run(limit=args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Error-rate and latency circuit breaker over a rolling window of calls.
+
+    closed     calls go through; the circuit opens once at least `min_calls`
+               of the last `window_size` calls are recorded and either the
+               failure rate or the slow-call rate reaches its threshold.
+    open       calls are rejected immediately for `open_seconds`.
+    half_open  up to `half_open_max_calls` trial calls go through; one success
+               closes the circuit, one failure (or slow call) opens it again.
+               Trial calls that never report back are given up on after
+               another `open_seconds`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 8.0,
+        slow_call_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._calls = deque(maxlen=window_size)  # (failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_calls = 0
+
+    def allow_request(self) -> bool:
+        """Whether a call may proceed now (counts as a trial call when half open)"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                if self._trial_calls and now - self._trial_started >= self.open_seconds:
+                    self._trial_calls = 0
+                if self._trial_calls < self.half_open_max_calls:
+                    self._trial_calls += 1
+                    self._trial_started = now
+                    return True
+            return False
+
+    def record_success(self, duration: float) -> None:
+        with self._lock:
+            if self._state == self.OPEN:
+                # Calls started before the circuit opened; already accounted for
+                return
+            slow = duration >= self.slow_call_seconds
+            if self._state == self.HALF_OPEN:
+                if slow:
+                    self._open(f"trial call took {duration:.1f}s")
+                else:
+                    logger.info("Circuit %s closed", self.name)
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, duration: float) -> None:
+        with self._lock:
+            if self._state == self.OPEN:
+                return
+            if self._state == self.HALF_OPEN:
+                self._open("trial call failed")
+                return
+            self._calls.append((True, duration >= self.slow_call_seconds))
+            self._evaluate()
+
+    def _evaluate(self) -> None:
+        if self._state != self.CLOSED or len(self._calls) < self.min_calls:
+            return
+        total = len(self._calls)
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow_calls = sum(1 for _, slow in self._calls if slow)
+        if failures / total >= self.failure_rate_threshold or slow_calls / total >= self.slow_call_rate_threshold:
+            self._open(f"{failures}/{total} calls failed, {slow_calls}/{total} slower than {self.slow_call_seconds}s")
+
+    def _open(self, reason: str) -> None:
+        logger.warning("Circuit %s opened for %ss: %s", self.name, self.open_seconds, reason)
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "window_calls": len(self._calls),
+                "window_failures": sum(1 for failed, _ in self._calls if failed),
+            }
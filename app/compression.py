@@ -0,0 +1,356 @@
+"""
+Transparent compression for large journal text columns
+
+Values of at least TEXT_COMPRESSION_MIN_BYTES are stored compressed behind a
+two-byte header: b"\\x00" (never the first byte of stored text) and a codec
+byte, b"s" for zstd (optionally with a trained dictionary, whose id is
+recorded in the zstd frame) or b"z" for zlib. Shorter values, values that do
+not shrink and rows written before compression was enabled are stored as
+plain text, so old rows stay readable and no big-bang migration is needed.
+
+Models expose the raw column under a private attribute and the text through
+lazy_text(), which decompresses on first attribute access only.
+
+Trained dictionaries are loaded by load_dictionaries() when a process starts;
+new writes use the newest one, so a freshly trained dictionary is picked up
+by each process on its next restart.
+
+Maintenance:
+    python -m app.compression train     # train a zstd dictionary from existing entries
+    python -m app.compression rewrite   # (re)compress existing rows, resumable
+    python -m app.compression stats     # stored vs. uncompressed size
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple, Union
+from sqlalchemy import LargeBinary, bindparam, select, text, type_coerce, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used when zstandard is not installed
+    zstandard = None
+
+MARKER = b"\x00"
+ZSTD = b"s"
+ZLIB = b"z"
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+_local = threading.local()
+_dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+_write_dictionary_id = 0
+_lock = threading.Lock()
+
+
+def _codec() -> Optional[bytes]:
+    if settings.text_compression == "off":
+        return None
+    if settings.text_compression == "zlib" or zstandard is None:
+        return ZLIB
+    return ZSTD
+
+
+# zstd dictionaries live in the compression_dictionaries table, keyed by their zstd dictionary id
+
+def load_dictionaries(db: Optional[Session] = None) -> int:
+    """Load the trained zstd dictionaries through `db`'s connection and return the id new writes use.
+
+    Called once at process startup, so compressing a bound value never needs
+    a connection of its own.
+    """
+    global _write_dictionary_id
+    if db is None:
+        from app.database import SessionLocal
+
+        with SessionLocal() as session:
+            return load_dictionaries(session)
+    try:
+        rows = db.connection().execute(
+            text("SELECT id, data FROM compression_dictionaries ORDER BY created_at, id")
+        ).all()
+    except DBAPIError:
+        db.rollback()
+        rows = []  # table not migrated yet, or no database: compress without a dictionary
+    if zstandard is not None:
+        with _lock:
+            for dict_id, data in rows:
+                _dictionaries[dict_id] = zstandard.ZstdCompressionDict(bytes(data))
+    _write_dictionary_id = rows[-1][0] if rows and zstandard is not None else 0
+    return _write_dictionary_id
+
+
+def _load_dictionary(dict_id: int) -> "zstandard.ZstdCompressionDict":
+    dictionary = _dictionaries.get(dict_id)
+    if dictionary is None:
+        # Only when reading text compressed with a dictionary trained after this process started
+        from app.database import engine
+
+        with engine.connect() as connection:
+            data = connection.execute(
+                text("SELECT data FROM compression_dictionaries WHERE id = :id"), {"id": dict_id}
+            ).scalar()
+        if data is None:
+            raise LookupError(f"zstd dictionary {dict_id} not found")
+        dictionary = zstandard.ZstdCompressionDict(bytes(data))
+        with _lock:
+            _dictionaries[dict_id] = dictionary
+    return dictionary
+
+
+def _compressor() -> "zstandard.ZstdCompressor":
+    dict_id = _write_dictionary_id
+    compressors = getattr(_local, "compressors", None)
+    if compressors is None:
+        compressors = _local.compressors = {}
+    compressor = compressors.get(dict_id)
+    if compressor is None:
+        dictionary = _load_dictionary(dict_id) if dict_id else None
+        compressor = compressors[dict_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    return compressor
+
+
+def _decompressor(dict_id: int) -> "zstandard.ZstdDecompressor":
+    decompressors = getattr(_local, "decompressors", None)
+    if decompressors is None:
+        decompressors = _local.decompressors = {}
+    decompressor = decompressors.get(dict_id)
+    if decompressor is None:
+        dictionary = _load_dictionary(dict_id) if dict_id else None
+        decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressor
+
+
+def encode_text(value: str, as_bytes: bool = False) -> Union[str, bytes]:
+    """Stored form of `value`: compressed bytes, or the text itself (as UTF-8 bytes if `as_bytes`)"""
+    raw = value.encode("utf-8")
+    codec = _codec()
+    if codec is not None and len(raw) >= settings.text_compression_min_bytes:
+        if codec == ZSTD:
+            packed = MARKER + ZSTD + _compressor().compress(raw)
+        else:
+            packed = MARKER + ZLIB + zlib.compress(raw, ZLIB_LEVEL)
+        if len(packed) < len(raw):
+            return packed
+    return raw if as_bytes else value
+
+
+def decode_text(stored: Union[str, bytes, memoryview, None]) -> Optional[str]:
+    """Text of a stored value in any of the forms written by encode_text (or by older versions)"""
+    if stored is None or isinstance(stored, str):
+        return stored
+    stored = bytes(stored)
+    if stored[:1] != MARKER:
+        return stored.decode("utf-8")
+    codec, payload = stored[1:2], stored[2:]
+    if codec == ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to read zstd-compressed text")
+        dict_id = zstandard.get_frame_parameters(payload).dict_id
+        return _decompressor(dict_id).decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown text compression codec {codec!r}")
+
+
+def register_sqlite_functions(dbapi_connection) -> None:
+    """Make decode_text(column) callable from SQL on a sqlite3 connection.
+
+    The journal_fts index reads entry text through a view that uses it.
+    """
+    dbapi_connection.create_function("decode_text", 1, decode_text, deterministic=True)
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed in a binary column (bytea on Postgres, BLOB on SQLite).
+
+    Bound strings are encoded with encode_text. Results are returned as stored
+    unless `decode_results` is set; models decode lazily via lazy_text().
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, decode_results: bool = False, encode_binds: bool = True):
+        super().__init__()
+        self.decode_results = decode_results
+        self.encode_binds = encode_binds
+
+    def process_bind_param(self, value, dialect):
+        if self.encode_binds and isinstance(value, str):
+            return encode_text(value, as_bytes=True)
+        return value
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value) if self.decode_results else value
+
+
+def lazy_text(raw_attribute: str, name: str) -> hybrid_property:
+    """Text attribute over a CompressedText column, decompressed on first access.
+
+    Assigning sets the raw column to the text (compressed when flushed). At
+    class level it is the column decoded in SQL results, so queries such as
+    db.query(Model.id, Model.content) still return text.
+    """
+    cache_attribute = "_decoded" + raw_attribute
+
+    def fget(self):
+        stored = getattr(self, raw_attribute)
+        cached = self.__dict__.get(cache_attribute)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        value = decode_text(stored)
+        self.__dict__[cache_attribute] = (stored, value)
+        return value
+
+    def fset(self, value):
+        setattr(self, raw_attribute, value)
+
+    def expr(cls):
+        return type_coerce(getattr(cls, raw_attribute), CompressedText(decode_results=True)).label(name)
+
+    return hybrid_property(fget, fset, expr=expr)
+
+
+# Maintenance
+
+def _text_columns(table):
+    return [table.c.content, table.c.ai_response]
+
+
+def train_dictionary(samples: int = 5000, size: int = 64 * 1024) -> Tuple[int, int]:
+    """Train a zstd dictionary on recent journal text and make it the one new writes use"""
+    if zstandard is None:
+        raise SystemExit("Training a dictionary requires the zstandard package")
+    from app.database import SessionLocal
+    from app.models import CompressionDictionary, JournalEntry
+
+    db = SessionLocal()
+    try:
+        rows = db.query(JournalEntry.content, JournalEntry.ai_response).order_by(
+            JournalEntry.id.desc()
+        ).limit(samples).all()
+        corpus = [value.encode("utf-8") for row in rows for value in row if value]
+        if len(corpus) < 100:
+            raise SystemExit(f"Need at least 100 text samples to train a dictionary, found {len(corpus)}")
+        dictionary = zstandard.train_dictionary(size, corpus)
+        db.merge(CompressionDictionary(id=dictionary.dict_id(), data=dictionary.as_bytes()))
+        db.commit()
+        return dictionary.dict_id(), len(corpus)
+    finally:
+        db.close()
+
+
+def rewrite(batch_size: int = 500, checkpoint_path: Optional[str] = None) -> Tuple[int, int, float]:
+    """Re-encode every journal entry with the current settings, in id-ordered chunks.
+
+    Progress is saved to `checkpoint_path` after each chunk so an interrupted
+    run resumes where it stopped; rows already in their target form are skipped.
+    """
+    from app.database import engine
+    from app.models import JournalEntry
+
+    load_dictionaries()
+    table = JournalEntry.__table__
+    columns = _text_columns(table)
+    write = update(table).where(table.c.id == bindparam("row_id")).values({
+        column.name: bindparam("new_" + column.name, type_=CompressedText(encode_binds=False))
+        for column in columns
+    })
+
+    last_id = 0
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            last_id = json.load(f)["last_id"]
+
+    started = time.perf_counter()
+    scanned = changed = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(table.c.id, *columns).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                stored = {column.name: row._mapping[column] for column in columns}
+                encoded = {
+                    name: None if value is None else encode_text(decode_text(value), as_bytes=True)
+                    for name, value in stored.items()
+                }
+                if any(encoded[name] != (bytes(value) if isinstance(value, memoryview) else value)
+                       for name, value in stored.items()):
+                    updates.append({"row_id": row.id, **{"new_" + name: value for name, value in encoded.items()}})
+            if updates:
+                connection.execute(write, updates)
+        scanned += len(rows)
+        changed += len(updates)
+        last_id = rows[-1].id
+        if checkpoint_path:
+            with open(checkpoint_path, "w") as f:
+                json.dump({"last_id": last_id}, f)
+    return scanned, changed, time.perf_counter() - started
+
+
+def storage_stats() -> Dict[str, int]:
+    """Stored and uncompressed byte counts of the journal text columns"""
+    from app.database import engine
+    from app.models import JournalEntry
+
+    table = JournalEntry.__table__
+    columns = _text_columns(table)
+    stats = {"rows": 0, "compressed_values": 0, "stored_bytes": 0, "text_bytes": 0}
+    with engine.connect() as connection:
+        for row in connection.execution_options(yield_per=1000).execute(select(*columns)):
+            stats["rows"] += 1
+            for value in row:
+                if value is None:
+                    continue
+                stored = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+                stats["stored_bytes"] += len(stored)
+                stats["text_bytes"] += len(decode_text(value).encode("utf-8"))
+                stats["compressed_values"] += stored[:1] == MARKER
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Journal text compression maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train = subparsers.add_parser("train", help="train a zstd dictionary from existing entries")
+    train.add_argument("--samples", type=int, default=5000)
+    train.add_argument("--size", type=int, default=64 * 1024, help="dictionary size in bytes")
+    rewrite_parser = subparsers.add_parser("rewrite", help="re-encode existing rows with the current settings")
+    rewrite_parser.add_argument("--batch-size", type=int, default=500)
+    rewrite_parser.add_argument("--checkpoint", default="compression_rewrite.checkpoint.json")
+    rewrite_parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    subparsers.add_parser("stats", help="show stored vs. uncompressed size")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        dict_id, sample_count = train_dictionary(args.samples, args.size)
+        print(f"Trained zstd dictionary {dict_id} on {sample_count} samples; "
+              "run 'rewrite --restart' to recompress existing rows with it")
+    elif args.command == "rewrite":
+        if args.restart and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        scanned, changed, elapsed = rewrite(args.batch_size, args.checkpoint)
+        print(f"Rewrote {changed} of {scanned} journal entries in {elapsed:.1f}s")
+    else:
+        stats = storage_stats()
+        ratio = stats["text_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 1.0
+        print(f"{stats['rows']} entries, {stats['compressed_values']} compressed values: "
+              f"{stats['stored_bytes']} bytes stored for {stats['text_bytes']} bytes of text ({ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,150 @@
-from pydantic import BaseSettings
+from pydantic import BaseSettings, validator
 from typing import Optional
 import os
+import tempfile
+
+AI_MODES = ("llm", "local", "hybrid")
 
 class Settings(BaseSettings):
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./wellness_tracker.db")
+    # Connection pool per process (ignored for SQLite); every server worker has its own pool
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Connections the database server accepts for this app (Postgres max_connections minus reserved)
+    db_max_connections: int = int(os.getenv("DB_MAX_CONNECTIONS", "97"))
 
     # JWT Settings
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    refresh_token_expire_days: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+    # Revoked refresh tokens are mirrored into an in-memory Bloom filter synced on this interval
+    revocation_sync_seconds: int = int(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+    revocation_filter_capacity: int = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+    # Revocations of expired tokens are deleted, and the filter rebuilt without them, on this interval
+    revocation_purge_seconds: int = int(os.getenv("REVOCATION_PURGE_SECONDS", "3600"))
+    # Embed user id / active / token version claims so most requests skip the users table
+    stateless_auth_tokens: bool = os.getenv("STATELESS_AUTH_TOKENS", "False").lower() == "true"
+    # How long a token version confirmed against the database is trusted in-process
+    auth_version_cache_seconds: int = int(os.getenv("AUTH_VERSION_CACHE_SECONDS", "300"))
+
+    # Password hashing (bcrypt cost roughly doubles per round; 12 is ~250ms per hash)
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    password_hash_concurrency: int = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "4"))
+
+    # Rate limiting (password route limits are derived from the bcrypt budget above)
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory or sqlite
+    rate_limit_sqlite_path: str = os.getenv(
+        "RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "wellness_rate_limit.db")
+    )
+    rate_limit_trust_proxy: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", "False").lower() == "true"
+    rate_limit_login_per_email_per_minute: int = int(os.getenv("RATE_LIMIT_LOGIN_PER_EMAIL_PER_MINUTE", "5"))
+    rate_limit_api_per_second: float = float(os.getenv("RATE_LIMIT_API_PER_SECOND", "20"))
+    rate_limit_user_per_second: float = float(os.getenv("RATE_LIMIT_USER_PER_SECOND", "10"))
 
     # OpenAI API
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
+    openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # Point at another OpenAI-compatible server, e.g. fake_openai_server.py for load tests
+    openai_base_url: Optional[str] = os.getenv("OPENAI_BASE_URL") or None
+    openai_timeout_seconds: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "15"))
+    openai_max_retries: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+    openai_retry_base_seconds: float = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", "0.5"))
+    # Completions in flight per process; further calls wait for a slot
+    openai_max_concurrency: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    # Calls allowed to wait for a slot; beyond that the fallback is served immediately
+    openai_max_queued: int = int(os.getenv("OPENAI_MAX_QUEUED", "32"))
+    # Circuit breaker: open on the failure or slow-call rate over the last N calls
+    ai_breaker_window: int = int(os.getenv("AI_BREAKER_WINDOW", "20"))
+    ai_breaker_min_calls: int = int(os.getenv("AI_BREAKER_MIN_CALLS", "5"))
+    ai_breaker_failure_rate: float = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+    ai_breaker_slow_call_seconds: float = float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "8"))
+    ai_breaker_slow_call_rate: float = float(os.getenv("AI_BREAKER_SLOW_CALL_RATE", "0.5"))
+    ai_breaker_open_seconds: float = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+    # Default AI mode for journal entries: llm (OpenAI response), local (lexicon scoring and
+    # rule-based suggestions only) or hybrid (local at once, OpenAI response filled in later)
+    ai_default_mode: str = os.getenv("AI_DEFAULT_MODE", "llm")
+    # Identical AI requests reuse one completion (LRU per process, optionally shared via a table)
+    ai_cache_enabled: bool = os.getenv("AI_CACHE_ENABLED", "True").lower() == "true"
+    ai_cache_max_entries: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+    ai_cache_persistent: bool = os.getenv("AI_CACHE_PERSISTENT", "False").lower() == "true"
+    # Upper bound on prompt size; older history is carried by a rolling per-user summary
+    ai_prompt_token_budget: int = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "1200"))
+    ai_summary_max_tokens: int = int(os.getenv("AI_SUMMARY_MAX_TOKENS", "250"))
+    # Prior entries picked by similarity to the entry being answered
+    ai_context_entries: int = int(os.getenv("AI_CONTEXT_ENTRIES", "3"))
+    ai_context_token_budget: int = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "500"))
+
+    # Background AI jobs: journal writes return immediately and `python -m app.worker` fills responses in
+    ai_job_queue: bool = os.getenv("AI_JOB_QUEUE", "False").lower() == "true"
+    ai_worker_concurrency: int = int(os.getenv("AI_WORKER_CONCURRENCY", "4"))
+    ai_worker_poll_seconds: float = float(os.getenv("AI_WORKER_POLL_SECONDS", "1.0"))
+    ai_job_max_attempts: int = int(os.getenv("AI_JOB_MAX_ATTEMPTS", "3"))
+    # Running jobs not finished within this window are assumed lost and requeued
+    ai_job_lease_seconds: int = int(os.getenv("AI_JOB_LEASE_SECONDS", "120"))
+
+    # Journal text of at least min_bytes is stored compressed: auto (zstd if installed, else zlib), zstd, zlib or off
+    text_compression: str = os.getenv("TEXT_COMPRESSION", "auto")
+    text_compression_min_bytes: int = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", "256"))
+
+    # Responses of at least min_bytes are gzip or brotli compressed when the client accepts it
+    # (brotli needs the optional brotli package; levels: gzip 1-9, brotli 0-11)
+    response_compression_enabled: bool = os.getenv("RESPONSE_COMPRESSION_ENABLED", "True").lower() == "true"
+    response_compression_min_bytes: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    response_compression_gzip_level: int = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "6"))
+    response_compression_brotli_level: int = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_LEVEL", "4"))
+
+    # Production server (start_production.py). Workers are async, so one per core is enough;
+    # threads bound the pool running sync dependencies and routes in each worker
+    port: int = int(os.getenv("PORT", "8000"))
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    web_threads: int = int(os.getenv("WEB_THREADS", "40"))
+    web_preload: bool = os.getenv("WEB_PRELOAD", "True").lower() == "true"
+    # Recycle each worker after this many requests (plus up to jitter) to bound memory creep; 0 disables
+    web_max_requests: int = int(os.getenv("WEB_MAX_REQUESTS", "2000"))
+    web_max_requests_jitter: int = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "200"))
+    web_keepalive: int = int(os.getenv("WEB_KEEPALIVE", "5"))
+    web_timeout: int = int(os.getenv("WEB_TIMEOUT", "60"))
+    web_graceful_timeout: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
+    # Readiness probe: database ping timeout and how long a result is reused
+    health_db_timeout_seconds: float = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "0.5"))
+    health_cache_seconds: float = float(os.getenv("HEALTH_CACHE_SECONDS", "1.0"))
+
+    # Log a warning when a request runs more statements than the budget, or one statement
+    # shape more than the limit (an N+1 loop); DEBUG adds a Server-Timing header with the totals
+    db_query_budget: int = int(os.getenv("DB_QUERY_BUDGET", "25"))
+    db_repeated_statement_limit: int = int(os.getenv("DB_REPEATED_STATEMENT_LIMIT", "5"))
+
+    # Statements slower than the threshold go to a rotating JSONL log (0 disables), with the
+    # plan of slow SELECTs captured in the background at most once per statement per interval
+    slow_query_threshold_ms: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "250"))
+    slow_query_log_path: str = os.getenv("SLOW_QUERY_LOG_PATH", "logs/slow_queries.jsonl")
+    slow_query_log_max_bytes: int = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    slow_query_log_backups: int = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+    slow_query_explain: bool = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+    slow_query_explain_interval_seconds: float = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "3600"))
+
+    # Prometheus metrics at /metrics. Gunicorn workers aggregate through files in this directory,
+    # which start_production.py clears at startup (a temp directory when unset)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    prometheus_multiproc_dir: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
 
     # App Settings
     app_name: str = os.getenv("APP_NAME", "Wellness Tracker API")
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+    @validator("ai_default_mode")
+    def _known_ai_mode(cls, value):
+        if value not in AI_MODES:
+            raise ValueError(f"AI_DEFAULT_MODE must be one of {', '.join(AI_MODES)}, not {value!r}")
+        return value
+
     class Config:
         env_file = ".env"
 
@@ -1,13 +1,32 @@
-from sqlalchemy import create_engine
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.compression import register_sqlite_functions
 from app.config import settings
 
 # Create database engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+if "sqlite" in settings.database_url:
+    engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+else:
+    engine = create_engine(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True
+    )
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _register_sqlite_functions(dbapi_connection, connection_record):
+        register_sqlite_functions(dbapi_connection)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -16,6 +35,101 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def warm_pool() -> int:
+    """Open the pool's connections now so the first requests do not pay for connecting"""
+    count = 1 if engine.dialect.name == "sqlite" else settings.db_pool_size
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+# Expanded IN lists render one placeholder per value; collapse them so they count as one shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))*\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", statement)
+
+
+class QueryStats:
+    """Statements executed on behalf of one request (or one test block)"""
+
+    def __init__(self, label: Optional[str] = None):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, limit: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed more than `limit` times, the usual sign of an N+1 loop"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+# The stats object is mutated, never replaced, so statements run by sync routes in the
+# thread pool (which runs in a copy of the request's context) still land in it
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Process-wide captures (see capture_queries), which see statements from every thread
+_captures: List[QueryStats] = []
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries(label: Optional[str] = None) -> Iterator[QueryStats]:
+    """Record the statements executed in this context (e.g. one request, labelled "GET /path")"""
+    stats = QueryStats(label)
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Record every statement this process executes in the block, whichever thread or task runs it (tests)"""
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_statement_timer(connection, cursor, statement, parameters, context, executemany):
+    if context is not None and (_query_stats.get() is not None or _captures):
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_statement(connection, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    for capture in _captures:
+        capture.record(statement, seconds)
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -0,0 +1,274 @@
+"""
+Local journal entry embeddings and per-user similarity search
+
+Entries are embedded at write time with a feature-hashing embedder (no model
+download, no network) and stored as float32 blobs in journal_embeddings.
+Each process keeps a per-user matrix in memory so a lookup is a single
+matrix-vector product.
+
+Backfill existing entries with: python -m app.embeddings backfill
+"""
+
+import argparse
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import metrics
+from app.config import settings
+from app.models import JournalEntry, JournalEmbedding
+from app.prompt_builder import estimate_tokens
+
+EMBEDDING_DIM = 256
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have i i'm im in is it it's its me my of on or so "
+    "that the this to was we were what when with you your".split()
+)
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Embed text as an L2-normalized float32 vector of hashed unigrams and bigrams"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    tokens = [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    for first, second in zip(tokens, tokens[1:]):
+        bigram = first + " " + second
+        counts[bigram] = counts.get(bigram, 0) + 1
+    for feature, count in counts.items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        # The top hash bit picks the sign so colliding features tend to cancel out
+        vector[h % EMBEDDING_DIM] += (1.0 if h & 0x80000000 else -1.0) * (1.0 + math.log(count))
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def to_blob(vector: np.ndarray) -> bytes:
+    return vector.astype(np.float32).tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class _UserIndex:
+    __slots__ = ("entry_ids", "matrix", "token_counts", "loaded_at")
+
+    def __init__(self, entry_ids: np.ndarray, matrix: np.ndarray, token_counts: np.ndarray):
+        self.entry_ids = entry_ids
+        self.matrix = matrix
+        self.token_counts = token_counts
+        self.loaded_at = time.monotonic()
+
+
+class VectorIndex:
+    """Per-user embedding matrices cached in memory (LRU over users).
+
+    Writes from this process update the cached matrix directly once their
+    transaction commits; a user's matrix is reloaded from the database after `ttl` seconds to pick up
+    writes made by other workers.
+    """
+
+    def __init__(self, max_users: int = 512, ttl: float = 300.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: "OrderedDict[int, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, user_id: int) -> _UserIndex:
+        rows = db.query(
+            JournalEmbedding.entry_id, JournalEmbedding.vector, JournalEmbedding.token_count
+        ).filter(JournalEmbedding.user_id == user_id).all()
+        if rows:
+            entry_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), EMBEDDING_DIM)
+            token_counts = np.fromiter((row[2] or 0 for row in rows), dtype=np.int32, count=len(rows))
+        else:
+            entry_ids = np.empty(0, dtype=np.int64)
+            matrix = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            token_counts = np.empty(0, dtype=np.int32)
+        return _UserIndex(entry_ids, matrix, token_counts)
+
+    def _get(self, db: Session, user_id: int) -> _UserIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and time.monotonic() - index.loaded_at < self.ttl:
+                self._users.move_to_end(user_id)
+                metrics.record_cache_lookup("embedding_index", True)
+                return index
+        metrics.record_cache_lookup("embedding_index", False)
+        index = self._load(db, user_id)
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    def upsert(self, user_id: int, entry_id: int, vector: np.ndarray, token_count: int) -> None:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            keep = index.entry_ids != entry_id
+            index.entry_ids = np.append(index.entry_ids[keep], entry_id)
+            index.matrix = np.vstack([index.matrix[keep], vector[np.newaxis, :]])
+            index.token_counts = np.append(index.token_counts[keep], token_count)
+
+    def remove(self, user_id: int, entry_id: int) -> None:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is None:
+                return
+            keep = index.entry_ids != entry_id
+            index.entry_ids = index.entry_ids[keep]
+            index.matrix = index.matrix[keep]
+            index.token_counts = index.token_counts[keep]
+
+    def search(
+        self,
+        db: Session,
+        user_id: int,
+        query: np.ndarray,
+        k: int,
+        token_budget: int,
+        exclude_entry_id: Optional[int] = None
+    ) -> List[int]:
+        """Ids of the user's most similar entries, best first, within `token_budget`"""
+        index = self._get(db, user_id)
+        if not len(index.entry_ids):
+            return []
+        scores = index.matrix @ query
+        if exclude_entry_id is not None:
+            scores[index.entry_ids == exclude_entry_id] = -np.inf
+        # Over-fetch so entries skipped for the budget or exclusion can be replaced
+        candidates = min(len(scores), 4 * k + 1)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+
+        selected = []
+        remaining = token_budget
+        for position in top:
+            if len(selected) == k or not np.isfinite(scores[position]):
+                break
+            tokens = int(index.token_counts[position])
+            if selected and tokens > remaining:
+                continue
+            selected.append(int(index.entry_ids[position]))
+            remaining -= tokens
+        return selected
+
+
+# Global instance
+vector_index = VectorIndex()
+
+# session.info key of the index changes waiting for the session's transaction to commit
+_PENDING_CHANGES = "vector_index_changes"
+
+
+def _defer_until_commit(db: Session, change) -> None:
+    """Apply `change` to the in-memory index only if the session commits"""
+    db.info.setdefault(_PENDING_CHANGES, []).append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    for change in session.info.pop(_PENDING_CHANGES, ()):
+        change()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session: Session) -> None:
+    session.info.pop(_PENDING_CHANGES, None)
+
+
+def index_entry(db: Session, journal_entry: JournalEntry) -> None:
+    """Embed a journal entry and store its vector (caller commits; entry must be flushed)"""
+    vector = embed_text(journal_entry.content)
+    token_count = estimate_tokens(journal_entry.content)
+    db.merge(JournalEmbedding(
+        entry_id=journal_entry.id,
+        user_id=journal_entry.user_id,
+        vector=to_blob(vector),
+        token_count=token_count
+    ))
+    user_id, entry_id = journal_entry.user_id, journal_entry.id
+    _defer_until_commit(db, lambda: vector_index.upsert(user_id, entry_id, vector, token_count))
+
+
+def unindex_entry(db: Session, journal_entry: JournalEntry) -> None:
+    db.query(JournalEmbedding).filter(JournalEmbedding.entry_id == journal_entry.id).delete(synchronize_session=False)
+    user_id, entry_id = journal_entry.user_id, journal_entry.id
+    _defer_until_commit(db, lambda: vector_index.remove(user_id, entry_id))
+
+
+def find_relevant_entries(
+    db: Session,
+    user_id: int,
+    text: str,
+    exclude_entry_id: Optional[int] = None
+) -> Optional[List[str]]:
+    """Contents of the prior entries most relevant to `text`, or None if the user has no index yet"""
+    entry_ids = vector_index.search(
+        db, user_id, embed_text(text),
+        k=settings.ai_context_entries,
+        token_budget=settings.ai_context_token_budget,
+        exclude_entry_id=exclude_entry_id
+    )
+    if not entry_ids:
+        return None
+    contents = dict(db.query(JournalEntry.id, JournalEntry.content).filter(JournalEntry.id.in_(entry_ids)).all())
+    return [contents[entry_id] for entry_id in entry_ids if entry_id in contents]
+
+
+def backfill(batch_size: int = 500) -> Tuple[int, float]:
+    """Embed every journal entry that has no stored vector yet"""
+    from app.database import SessionLocal
+
+    started = time.perf_counter()
+    total = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            entries = db.query(JournalEntry).outerjoin(
+                JournalEmbedding, JournalEmbedding.entry_id == JournalEntry.id
+            ).filter(
+                JournalEmbedding.entry_id.is_(None),
+                JournalEntry.id > last_id
+            ).order_by(JournalEntry.id).limit(batch_size).all()
+            if not entries:
+                break
+            for entry in entries:
+                index_entry(db, entry)
+            db.commit()
+            total += len(entries)
+            last_id = entries[-1].id
+    finally:
+        db.close()
+    return total, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Journal embedding maintenance")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    total, elapsed = backfill(args.batch_size)
+    print(f"Embedded {total} journal entries in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
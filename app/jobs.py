@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import AIJob, JournalEntry
+
+
+def enqueue_ai_job(db: Session, journal_entry: JournalEntry, bypass_cache: bool = False) -> None:
+    """Queue AI response generation for a journal entry (caller commits)"""
+    journal_entry.ai_status = "pending"
+    if journal_entry.id is not None:
+        pending = db.query(AIJob).filter(
+            AIJob.journal_entry_id == journal_entry.id,
+            AIJob.status == "pending"
+        ).first()
+        if pending:
+            pending.bypass_cache = pending.bypass_cache or bypass_cache
+            return
+    db.add(AIJob(
+        journal_entry=journal_entry,
+        user_id=journal_entry.user_id,
+        status="pending",
+        attempts=0,
+        bypass_cache=bypass_cache
+    ))
+
+
+def claim_ai_jobs(db: Session, worker_id: str, limit: int) -> List[int]:
+    """Atomically claim up to `limit` pending jobs for this worker and return their ids.
+
+    Postgres uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never
+    block on or double-claim a row. SQLite serializes writers, so a single
+    UPDATE ... WHERE id IN (subquery) tagged with a unique claim token is
+    equally safe there.
+    """
+    now = datetime.utcnow()
+    claim_token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    pending = select(AIJob.id).where(AIJob.status == "pending").order_by(AIJob.id).limit(limit)
+
+    if db.bind.dialect.name == "postgresql":
+        job_ids = db.execute(pending.with_for_update(skip_locked=True)).scalars().all()
+        if not job_ids:
+            db.commit()
+            return []
+        db.execute(
+            update(AIJob)
+            .where(AIJob.id.in_(job_ids))
+            .values(status="running", locked_by=claim_token, locked_at=now, attempts=AIJob.attempts + 1)
+        )
+        db.commit()
+        return list(job_ids)
+
+    db.execute(
+        update(AIJob)
+        .where(AIJob.id.in_(pending.scalar_subquery()), AIJob.status == "pending")
+        .values(status="running", locked_by=claim_token, locked_at=now, attempts=AIJob.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.execute(
+        select(AIJob.id).where(AIJob.locked_by == claim_token, AIJob.status == "running")
+    ).scalars().all()
+
+
+def requeue_expired_jobs(db: Session) -> int:
+    """Return running jobs whose lease expired (crashed worker) to the queue"""
+    expired_before = datetime.utcnow() - timedelta(seconds=settings.ai_job_lease_seconds)
+    result = db.execute(
+        update(AIJob)
+        .where(AIJob.status == "running", AIJob.locked_at < expired_before)
+        .values(status="pending", locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def is_superseded(db: Session, job: AIJob) -> bool:
+    """True if a newer job exists for the same entry (its content changed again)"""
+    return db.query(AIJob.id).filter(
+        AIJob.journal_entry_id == job.journal_entry_id,
+        AIJob.id > job.id
+    ).first() is not None
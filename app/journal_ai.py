@@ -0,0 +1,163 @@
+import logging
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, JournalEntry, JournalSummary
+from app.schemas import AIJournalResponse
+from app.ai_service import ai_journal_service, ai_service_errors
+from app.prompt_builder import summarize_entry, fold_into_summary
+from app.embeddings import find_relevant_entries
+
+logger = logging.getLogger(__name__)
+
+# Most recent entries passed to the model verbatim; older ones live in the rolling summary
+RECENT_CONTEXT_ENTRIES = 3
+
+
+def get_previous_entries(db: Session, user_id: int, exclude_entry_id: Optional[int] = None) -> List[str]:
+    """Get the contents of the user's most recent journal entries for AI context"""
+    query = db.query(JournalEntry).filter(JournalEntry.user_id == user_id)
+    if exclude_entry_id is not None:
+        query = query.filter(JournalEntry.id != exclude_entry_id)
+    recent_entries = query.order_by(JournalEntry.date.desc()).limit(RECENT_CONTEXT_ENTRIES).all()
+    return [entry.content for entry in recent_entries]
+
+
+def get_context_entries(
+    db: Session,
+    user_id: int,
+    journal_content: str,
+    exclude_entry_id: Optional[int] = None
+) -> List[str]:
+    """Prior entries most relevant to the entry being answered, falling back to the most recent ones"""
+    relevant = find_relevant_entries(db, user_id, journal_content, exclude_entry_id=exclude_entry_id)
+    if relevant is None:
+        return get_previous_entries(db, user_id, exclude_entry_id=exclude_entry_id)
+    return relevant
+
+
+def get_history_summary(db: Session, user_id: int) -> Optional[str]:
+    """Get the rolling summary of the user's older journal entries"""
+    summary = db.get(JournalSummary, user_id)
+    return summary.summary if summary and summary.summary else None
+
+
+def refresh_history_summary(db: Session, user_id: int) -> None:
+    """Fold entries that have left the recent-context window into the rolling summary (caller flushes first, then commits)
+
+    Only entries not yet folded in (`in_summary` is false) are read, so each
+    entry is summarized once and the work per new entry stays constant.
+    Backdated entries are folded as soon as they are outside the window, and an
+    edited entry (whose flag the update resets) replaces its earlier line.
+    """
+    summary = db.get(JournalSummary, user_id)
+    if summary is None:
+        summary = JournalSummary(user_id=user_id, summary="", entry_count=0)
+        db.add(summary)
+    
+    window_start = db.query(JournalEntry.date).filter(
+        JournalEntry.user_id == user_id
+    ).order_by(JournalEntry.date.desc()).offset(RECENT_CONTEXT_ENTRIES - 1).limit(1).scalar()
+    if window_start is None:
+        return
+    
+    entries = db.query(JournalEntry).filter(
+        JournalEntry.user_id == user_id,
+        JournalEntry.date < window_start,
+        JournalEntry.in_summary == False
+    ).order_by(JournalEntry.date.asc()).all()
+    if not entries:
+        return
+    
+    # Re-folded (edited) entries replace their line and are not counted again
+    summarized_dates = {line.partition(":")[0] for line in (summary.summary or "").splitlines()}
+    summary.entry_count = (summary.entry_count or 0) + sum(
+        entry.date.isoformat() not in summarized_dates for entry in entries
+    )
+    summary.summary = fold_into_summary(
+        summary.summary,
+        [summarize_entry(entry.content, entry.date) for entry in entries]
+    )
+    for entry in entries:
+        entry.in_summary = True
+    summary.through_date = max(filter(None, [summary.through_date, entries[-1].date]))
+
+
+def remove_from_history_summary(db: Session, journal_entry: JournalEntry) -> None:
+    """Drop a deleted entry's line from the rolling summary (caller commits)"""
+    summary = db.get(JournalSummary, journal_entry.user_id)
+    if summary is None or not summary.summary:
+        return
+    prefix = journal_entry.date.isoformat() + ":"
+    lines = summary.summary.splitlines()
+    kept = [line for line in lines if not line.startswith(prefix)]
+    if len(kept) != len(lines):
+        summary.summary = "\n".join(kept)
+        summary.entry_count = max(0, (summary.entry_count or 0) - 1)
+
+
+async def generate_for_entry(
+    db: Session,
+    journal_entry: JournalEntry,
+    fallback_on_error: bool = True,
+    use_cache: bool = True
+) -> AIJournalResponse:
+    """Generate an AI response for a journal entry and store it on the entry (caller commits)"""
+    previous_contents = get_context_entries(
+        db, journal_entry.user_id, journal_entry.content, exclude_entry_id=journal_entry.id
+    )
+    
+    ai_response = await ai_journal_service.generate_journal_response(
+        journal_content=journal_entry.content,
+        mood_before=journal_entry.mood_before,
+        previous_entries=previous_contents,
+        fallback_on_error=fallback_on_error,
+        use_cache=use_cache,
+        history_summary=get_history_summary(db, journal_entry.user_id)
+    )
+    
+    apply_ai_response(journal_entry, ai_response)
+    return ai_response
+
+
+def resolve_ai_mode(db: Session, user_id: int, requested: Optional[str] = None) -> str:
+    """The AI mode for a request: the one asked for, else the user's preference, else the default"""
+    if requested:
+        return requested
+    return db.query(User.ai_mode).filter(User.id == user_id).scalar() or settings.ai_default_mode
+
+
+def apply_local_response(journal_entry: JournalEntry) -> AIJournalResponse:
+    """Fill the entry's AI fields from local scoring, without calling OpenAI (caller commits)"""
+    ai_response = ai_journal_service.local_journal_response(journal_entry.content, journal_entry.mood_before)
+    apply_ai_response(journal_entry, ai_response)
+    return ai_response
+
+
+async def fill_ai_response(entry_id: int, use_cache: bool = True) -> None:
+    """Replace a locally generated response with the OpenAI one (run after the request returns)
+
+    When OpenAI is not configured or the completion fails, the local response
+    is kept rather than replaced with the generic fallback text.
+    """
+    db = SessionLocal()
+    try:
+        journal_entry = db.get(JournalEntry, entry_id)
+        if journal_entry is None:
+            return
+        if ai_journal_service.client is not None:
+            try:
+                await generate_for_entry(db, journal_entry, fallback_on_error=False, use_cache=use_cache)
+            except ai_service_errors() as e:
+                logger.info("Keeping the local response for journal entry %s: %r", entry_id, e)
+        journal_entry.ai_status = "complete"
+        db.commit()
+    finally:
+        db.close()
+
+
+def apply_ai_response(journal_entry: JournalEntry, ai_response: AIJournalResponse) -> None:
+    journal_entry.ai_response = ai_response.response
+    journal_entry.mood_after = ai_response.mood_after
+    journal_entry.ai_status = "complete"
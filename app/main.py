@@ -1,7 +1,23 @@
+import asyncio
+import logging
+import anyio
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from app.compression import load_dictionaries
 from app.config import settings
-from app.routers import auth, habits, moods, journal, analytics, goals
+from app.database import engine, warm_pool
+from app.metrics import MetricsMiddleware
+from app.query_tracking import QueryTrackingMiddleware
+from app.rate_limit import RateLimitMiddleware
+from app.revocation import purge_periodically as purge_revocations_periodically
+from app.response_compression import ResponseCompressionMiddleware
+from app.slow_queries import install as install_slow_query_log
+from app.routers import auth, habits, moods, journal, analytics, goals, health, metrics
+
+logger = logging.getLogger(__name__)
 
 # Note: Database tables are created via Alembic migrations
 # Run 'alembic upgrade head' to apply migrations
@@ -10,9 +26,21 @@ from app.routers import auth, habits, moods, journal, analytics, goals
 app = FastAPI(
     title=settings.app_name,
     description="A comprehensive wellness tracking API with habit tracking, mood monitoring, and AI-powered journaling",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Write statements slower than SLOW_QUERY_THRESHOLD_MS to the slow-query log
+install_slow_query_log(engine)
+
+# Compression is innermost, so rate-limited requests never reach it
+if settings.response_compression_enabled:
+    app.add_middleware(ResponseCompressionMiddleware)
+
+# Rate limiting runs inside CORS so 429 responses still carry CORS headers
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware)
+
 # Add CORS middleware - Allow all origins for now
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +51,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Metrics wrap every other middleware, so request latency includes them
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Query tracking is outermost: the statement counts it records are read by the metrics
+app.add_middleware(QueryTrackingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(habits.router, prefix="/habits", tags=["Habits"])
@@ -30,6 +65,41 @@ app.include_router(moods.router, prefix="/moods", tags=["Moods"])
 app.include_router(journal.router, prefix="/journal", tags=["Journal"])
 app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 app.include_router(goals.router, prefix="/goals", tags=["Goals"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+if settings.metrics_enabled:
+    app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"], include_in_schema=False)
+
+
+@app.on_event("startup")
+async def configure_thread_pool():
+    # Sync dependencies and routes run on this pool; WEB_THREADS bounds it per worker
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.web_threads
+
+
+@app.on_event("startup")
+async def warm_database_pool():
+    try:
+        opened = await run_in_threadpool(warm_pool)
+        logger.info("Warmed %s database connection(s)", opened)
+    except SQLAlchemyError as e:
+        # Not fatal: the readiness probe reports the database until it is reachable
+        logger.warning("Could not warm the database pool: %r", e)
+
+
+@app.on_event("startup")
+async def load_compression_dictionaries():
+    # Before any request, so compressing a bound value never opens a connection of its own
+    await run_in_threadpool(load_dictionaries)
+
+
+@app.on_event("startup")
+async def start_revocation_purge():
+    app.state.revocation_purge = asyncio.create_task(purge_revocations_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_revocation_purge():
+    app.state.revocation_purge.cancel()
 
 
 @app.get("/")
@@ -39,8 +109,3 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs"
     }
-
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
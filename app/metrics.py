@@ -0,0 +1,151 @@
+"""
+Prometheus metrics
+
+Per-route request counts and latency histograms, in-flight requests, database
+statements per request, connection pool usage, OpenAI call latency and errors,
+and cache lookups (hit ratio = hits / all lookups).
+
+Under gunicorn every worker writes its samples to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR, and /metrics aggregates the files of all workers, so
+a scrape sees the whole server whichever worker answers it. Without that
+directory (a single uvicorn process) the default in-process registry is used.
+Recording a sample is a dict lookup and a lock, cheap enough to leave on.
+"""
+
+import os
+import time
+from app.config import settings
+
+# prometheus_client picks its storage when imported, so the directory must be known first
+if settings.prometheus_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.prometheus_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event  # noqa: E402
+from app.database import current_query_stats, engine  # noqa: E402
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Latency buckets from 5ms (cached reads) to 30s (slow completions)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+http_requests = Counter(
+    "http_requests_total", "Requests served", ["method", "route", "status"]
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to the last byte of the response", ["method", "route"],
+    buckets=_LATENCY_BUCKETS
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests being served", multiprocess_mode="livesum"
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "Database statements executed per request", ["route"], buckets=_QUERY_BUCKETS
+)
+db_pool_checked_out = Gauge(
+    "db_pool_connections_checked_out", "Pooled connections in use", multiprocess_mode="livesum"
+)
+db_pool_open = Gauge(
+    "db_pool_connections_open", "Connections opened by the pool and not yet closed", multiprocess_mode="livesum"
+)
+ai_call_duration = Histogram(
+    "ai_completion_duration_seconds", "OpenAI call latency (to the first chunk for streams)", ["kind"],
+    buckets=_LATENCY_BUCKETS
+)
+ai_call_errors = Counter(
+    "ai_completion_errors_total", "Failed OpenAI calls", ["kind", "error"]
+)
+cache_lookups = Counter(
+    "cache_lookups_total", "Cache lookups", ["cache", "result"]
+)
+ai_cache_saved_tokens = Counter(
+    "ai_cache_saved_tokens_total", "OpenAI tokens not spent thanks to AI response cache hits"
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_lookups.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_ai_call(kind: str, seconds: float) -> None:
+    ai_call_duration.labels(kind).observe(seconds)
+
+
+def record_ai_error(kind: str, error: Exception) -> None:
+    ai_call_errors.labels(kind, type(error).__name__).inc()
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    db_pool_checked_out.inc()
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    db_pool_checked_out.dec()
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    db_pool_open.inc()
+
+
+@event.listens_for(engine, "close")
+def _on_close(dbapi_connection, connection_record):
+    db_pool_open.dec()
+
+
+def render_metrics():
+    """The exposition text and its content type"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _route_paths(app) -> dict:
+    """Endpoint function -> path template, so labels stay bounded (/journal/{entry_id}, not every id)"""
+    paths = getattr(app.state, "metric_route_paths", None)
+    if paths is None:
+        paths = {route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")}
+        app.state.metric_route_paths = paths
+    return paths
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics (outside every layer but query tracking)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = _route_paths(scope["app"]).get(scope.get("endpoint"), UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_request_duration.labels(method, route).observe(time.perf_counter() - started)
+            http_requests.labels(method, route, str(status)).inc()
+            queries = current_query_stats()
+            if queries is not None:
+                db_queries_per_request.labels(route).observe(queries.count)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Date, LargeBinary, false
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.compression import CompressedText, lazy_text
 
 
 class User(Base):
@@ -13,6 +14,8 @@ class User(Base):
     full_name = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bump to revoke issued tokens
+    ai_mode = Column(String)  # llm, local or hybrid; null uses settings.ai_default_mode
     
     # Relationships
     habits = relationship("Habit", back_populates="user")
@@ -76,12 +79,18 @@ class JournalEntry(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     date = Column(Date, nullable=False)
-    content = Column(Text, nullable=False)
-    ai_response = Column(Text)
+    _content = Column("content", CompressedText(), nullable=False)
+    _ai_response = Column("ai_response", CompressedText())
     mood_before = Column(Integer)  # 1-10 scale
     mood_after = Column(Integer)  # 1-10 scale
+    ai_status = Column(String, default="complete", server_default="complete")  # pending, complete, failed
+    in_summary = Column(Boolean, nullable=False, default=False, server_default=false())  # folded into JournalSummary
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Stored compressed; decompressed on first access
+    content = lazy_text("_content", "content")
+    ai_response = lazy_text("_ai_response", "ai_response")
+    
     # Relationships
     user = relationship("User", back_populates="journal_entries")
 
@@ -99,3 +108,67 @@ class Goal(Base):
     
     # Relationships
     user = relationship("User")
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # naive UTC, matches the token's exp
+    revoked_at = Column(DateTime, nullable=False, index=True)  # naive UTC
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, running, done, failed
+    bypass_cache = Column(Boolean, nullable=False, default=False, server_default=false())
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    locked_by = Column(String)
+    locked_at = Column(DateTime)  # naive UTC
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    journal_entry = relationship("JournalEntry")
+
+
+class AIResponseCacheEntry(Base):
+    __tablename__ = "ai_response_cache"
+    
+    key = Column(String(64), primary_key=True)  # sha256 of the completion inputs
+    response = Column(Text, nullable=False)
+    total_tokens = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class JournalSummary(Base):
+    __tablename__ = "journal_summaries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    through_date = Column(Date)  # newest entry date folded into the summary
+    entry_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class JournalEmbedding(Base):
+    __tablename__ = "journal_embeddings"
+    
+    entry_id = Column(Integer, ForeignKey("journal_entries.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    vector = Column(LargeBinary, nullable=False)  # float32[EMBEDDING_DIM], see app.embeddings
+    token_count = Column(Integer)  # estimated tokens of the entry content
+
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # zstd dictionary id
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
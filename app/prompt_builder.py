@@ -0,0 +1,101 @@
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+from app.config import settings
+
+# Rough size of the fixed instructions wrapped around the context in AIJournalService._build_prompt
+PROMPT_TEMPLATE_TOKENS = 220
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the token count of English text (about 4 characters per token)"""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly `max_tokens`, on a word boundary"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "..."
+
+
+def truncate_to_last_tokens(text: str, max_tokens: int) -> str:
+    """Keep roughly the last `max_tokens` of text, starting on a line (else word) boundary"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[-max_tokens * 4:]
+    for boundary in ("\n", " "):
+        position = cut.find(boundary)
+        if 0 <= position < len(cut) // 2:
+            cut = cut[position + 1:]
+            break
+    return "..." + cut.lstrip()
+
+
+def fit_context(
+    journal_content: str,
+    previous_entries: Optional[List[str]],
+    history_summary: Optional[str],
+    budget: Optional[int] = None
+) -> Tuple[str, List[str], Optional[str]]:
+    """Trim the prompt inputs so the whole prompt stays within `budget` tokens.
+
+    The current entry is kept first (up to 60% of the budget), then the rolling
+    summary of older entries (up to 20%, keeping its newest lines, which come
+    last), then as many recent entries, newest first, as fit in what is left.
+    """
+    budget = budget or settings.ai_prompt_token_budget
+    available = max(0, budget - PROMPT_TEMPLATE_TOKENS)
+
+    journal_content = truncate_to_tokens(journal_content, int(available * 0.6))
+    available -= estimate_tokens(journal_content)
+
+    if history_summary:
+        history_summary = truncate_to_last_tokens(history_summary, min(available, int(budget * 0.2))) or None
+        available -= estimate_tokens(history_summary)
+
+    entries = []
+    for entry in previous_entries or []:
+        if available <= 0:
+            break
+        entry = truncate_to_tokens(entry, available)
+        entries.append(entry)
+        available -= estimate_tokens(entry)
+
+    return journal_content, entries, history_summary
+
+
+def summarize_entry(content: str, entry_date: date, max_tokens: int = 40) -> str:
+    """One-line extractive summary of an entry: its date and opening sentence"""
+    text = _WHITESPACE.sub(" ", content).strip()
+    first_sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return f"{entry_date.isoformat()}: {truncate_to_tokens(first_sentence, max_tokens)}"
+
+
+def fold_into_summary(summary: Optional[str], lines: List[str], max_tokens: Optional[int] = None) -> str:
+    """Merge summary lines in date order, dropping the oldest once the summary exceeds `max_tokens`.
+
+    Lines start with their entry's date (see summarize_entry), and a user has one
+    entry per date, so a new line for a date replaces the old one (an edited entry).
+    """
+    max_tokens = max_tokens or settings.ai_summary_max_tokens
+    by_date = {}
+    for line in (summary.splitlines() if summary else []) + lines:
+        by_date[line.partition(":")[0]] = line
+    all_lines = [by_date[key] for key in sorted(by_date)]
+    while len(all_lines) > 1 and estimate_tokens("\n".join(all_lines)) > max_tokens:
+        all_lines.pop(0)
+    return "\n".join(all_lines)
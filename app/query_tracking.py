@@ -0,0 +1,65 @@
+"""
+Per-request SQL statement counting and N+1 detection
+
+Every request records the statements it executes and their total time (see
+the cursor-execute hooks in app.database). A warning is logged when a request
+runs more than DB_QUERY_BUDGET statements, or repeats one statement shape more
+than DB_REPEATED_STATEMENT_LIMIT times, which is what a query inside a loop
+looks like. With DEBUG=True the totals are also sent as a Server-Timing header,
+so they show up in the browser's network panel.
+"""
+
+import logging
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from app.config import settings
+from app.database import QueryStats, track_queries
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text quoted in a warning
+_SHAPE_PREVIEW_CHARS = 200
+
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+
+
+def report_query_stats(method: str, path: str, stats: QueryStats) -> None:
+    if stats.count > settings.db_query_budget:
+        logger.warning(
+            "%s %s executed %s statements (budget %s) in %.1fms",
+            method, path, stats.count, settings.db_query_budget, stats.seconds * 1000
+        )
+    for shape, count in stats.repeated_shapes(settings.db_repeated_statement_limit):
+        logger.warning(
+            "Possible N+1: %s %s executed the same statement %s times: %s",
+            method, path, count, shape[:_SHAPE_PREVIEW_CHARS]
+        )
+
+
+class QueryTrackingMiddleware:
+    """ASGI middleware recording each request's statements (outermost, so every layer is covered)"""
+
+    def __init__(self, app, server_timing_header: Optional[bool] = None):
+        self.app = app
+        self.server_timing_header = settings.debug if server_timing_header is None else server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope['method']} {scope['path']}") as stats:
+            if self.server_timing_header:
+                async def send_wrapper(message):
+                    # The route has run by the time the response starts; streamed bodies may query later
+                    if message["type"] == "http.response.start":
+                        MutableHeaders(scope=message).append("Server-Timing", server_timing(stats))
+                    await send(message)
+            else:
+                send_wrapper = send
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                report_query_stats(scope["method"], scope["path"], stats)
@@ -0,0 +1,314 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from app.config import settings
+
+# Wall time of one bcrypt hash at cost 12 on a typical instance core
+BCRYPT_SECONDS_AT_COST_12 = 0.25
+
+# Routes that run bcrypt and share the hashing budget
+PASSWORD_HASH_ROUTES = {"/auth/login", "/auth/register"}
+
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+# Largest login body read to find the email; a real one is well under 1 KB
+MAX_LOGIN_BODY_BYTES = 4096
+
+
+def bcrypt_hashes_per_second() -> float:
+    """Hashes one worker process can compute per second at the configured cost"""
+    cost = BCRYPT_SECONDS_AT_COST_12 * 2 ** (settings.bcrypt_rounds - 12)
+    return settings.password_hash_workers / cost
+
+
+class Limit:
+    """Token bucket parameters: `rate` tokens per second, bursts up to `capacity`"""
+    __slots__ = ("rate", "capacity")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+
+
+def default_limits() -> Dict[str, Limit]:
+    """Default limits, derived from the bcrypt budget for the password routes.
+
+    - ``hash``: the whole worker may not accept more password work than its
+      hashing pool can finish, so excess logins get 429 instead of queueing.
+    - ``auth_ip``: one client may use at most a quarter of that budget.
+    - ``login_email``: per target account, to blunt credential stuffing.
+    """
+    budget = bcrypt_hashes_per_second()
+    return {
+        "hash": Limit(budget, 2 * budget),
+        "auth_ip": Limit(budget / 4, math.ceil(budget / 2)),
+        "login_email": Limit(settings.rate_limit_login_per_email_per_minute / 60.0,
+                             settings.rate_limit_login_per_email_per_minute),
+        "api_ip": Limit(settings.rate_limit_api_per_second, 2 * settings.rate_limit_api_per_second),
+        "api_user": Limit(settings.rate_limit_user_per_second, 2 * settings.rate_limit_user_per_second),
+    }
+
+
+class InMemoryBackend:
+    """Token buckets local to this process"""
+
+    MAX_KEYS = 100000
+    # Never waits on I/O, so it is called directly on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0 if allowed, else seconds until it would be"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                if len(self._buckets) > self.MAX_KEYS:
+                    self._prune(now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / limit.rate
+
+    def refund(self, key: str, limit: Limit, cost: float = 1.0) -> None:
+        """Return tokens taken by a request that was rejected by a later check"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                self._buckets[key] = (min(limit.capacity, bucket[0] + cost), bucket[1])
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for a minute are refilled for any sane limit; forgetting them is free
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > 60]
+        for key in stale:
+            del self._buckets[key]
+
+
+class SQLiteBackend:
+    """Token buckets shared by every worker on the host through a local SQLite file
+
+    Calls wait on the file lock (up to a second), so the middleware runs them in
+    the thread pool. Buckets idle long enough to have refilled completely are
+    deleted every PRUNE_INTERVAL seconds: a missing row means a full bucket.
+    """
+
+    PRUNE_INTERVAL = 60.0
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        # Longest time any limit seen so far takes to refill from empty
+        self._refill_seconds = 0.0
+        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def _run(self, statements) -> bool:
+        """Run `statements(connection)` in an immediate transaction; False if the database was busy"""
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            statements(connection)
+            connection.execute("COMMIT")
+            return True
+        except sqlite3.Error:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return False
+
+    def consume(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        now = time.time()
+        self._refill_seconds = max(self._refill_seconds, limit.capacity / limit.rate)
+        wait = 0.0
+
+        def take(connection):
+            nonlocal wait
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (limit.capacity, now)
+            tokens = min(limit.capacity, tokens + max(0.0, now - updated) * limit.rate)
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / limit.rate
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+
+        if not self._run(take):
+            # Fail open: a contended limiter must not take the API down
+            return 0.0
+        if time.monotonic() >= self._next_prune:
+            self.prune()
+        return wait
+
+    def refund(self, key: str, limit: Limit, cost: float = 1.0) -> None:
+        self._run(lambda connection: connection.execute(
+            "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE key = ?", (limit.capacity, cost, key)
+        ))
+
+    def prune(self) -> None:
+        """Delete buckets that have been idle long enough to be full again"""
+        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+        cutoff = time.time() - self._refill_seconds
+        self._run(lambda connection: connection.execute("DELETE FROM buckets WHERE updated < ?", (cutoff,)))
+
+
+def create_backend():
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteBackend(settings.rate_limit_sqlite_path)
+    return InMemoryBackend()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying token buckets per IP, per login email and per user.
+
+    The password-hash budget is always enforced per process, since it protects
+    this worker's CPU; the other buckets use the configured (possibly shared) backend.
+    """
+
+    def __init__(self, app, backend=None, limits: Optional[Dict[str, Limit]] = None):
+        self.app = app
+        self.backend = backend or create_backend()
+        self.local_backend = InMemoryBackend()
+        self.limits = limits or default_limits()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["path"].startswith("/health"):
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = self._client_ip(scope)
+        path = scope["path"].rstrip("/") or "/"
+
+        if scope["method"] == "POST" and path in PASSWORD_HASH_ROUTES:
+            checks = [("ip:" + client_ip, self.limits["auth_ip"], self.backend)]
+            if path == "/auth/login":
+                body, receive = await self._buffer_body(receive, MAX_LOGIN_BODY_BYTES)
+                if body is None:
+                    response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+                    await response(scope, receive, send)
+                    return
+                email = self._login_email(body)
+                if email:
+                    checks.append(("email:" + email, self.limits["login_email"], self.backend))
+            checks.append(("hash", self.limits["hash"], self.local_backend))
+        else:
+            checks = [("api-ip:" + client_ip, self.limits["api_ip"], self.backend)]
+            user_key = self._user_key(scope)
+            if user_key:
+                checks.append(("user:" + user_key, self.limits["api_user"], self.backend))
+
+        if any(backend.blocking for _, _, backend in checks):
+            retry_after = await run_in_threadpool(self._consume_all, checks)
+        else:
+            retry_after = self._consume_all(checks)
+        if retry_after > 0:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _consume_all(checks) -> float:
+        """Take a token from every bucket; if one is empty, refund the others and return its wait"""
+        taken = []
+        for key, limit, backend in checks:
+            retry_after = backend.consume(key, limit)
+            if retry_after > 0:
+                # A rejected request must not use up the budgets it passed
+                for taken_key, taken_limit, taken_backend in taken:
+                    taken_backend.refund(taken_key, taken_limit)
+                return retry_after
+            taken.append((key, limit, backend))
+        return 0.0
+
+    @staticmethod
+    def _client_ip(scope) -> str:
+        if settings.rate_limit_trust_proxy:
+            for name, value in scope.get("headers", []):
+                if name == b"x-forwarded-for":
+                    # The right-most entry was added by our own proxy and cannot be spoofed
+                    return value.decode("latin-1").split(",")[-1].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _user_key(scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+                except JWTError:
+                    return None
+                user = payload.get("uid", payload.get("sub"))
+                return str(user) if user is not None else None
+        return None
+
+    @staticmethod
+    async def _buffer_body(receive, max_bytes: int):
+        """Read the request body and return a receive callable that replays it.
+
+        The body is None if it is longer than `max_bytes`; reading stops there.
+        """
+        chunks: List[bytes] = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > max_bytes:
+                return None, receive
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    @staticmethod
+    def _login_email(body: bytes) -> Optional[str]:
+        try:
+            email = json.loads(body).get("email")
+        except (ValueError, AttributeError):
+            return None
+        return email.strip().lower() if isinstance(email, str) else None
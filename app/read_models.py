@@ -0,0 +1,145 @@
+"""
+Read models for the analytics and stats endpoints
+
+Core select() queries over just the columns each endpoint reads, returned as
+small tuple records. Nothing is loaded into the session identity map, so
+reading a long history costs a few tuples per row instead of full ORM
+instances with change tracking.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models import Goal, Habit, HabitCheckIn, JournalEntry, MoodEntry
+
+_habits = Habit.__table__
+_check_ins = HabitCheckIn.__table__
+_moods = MoodEntry.__table__
+_journal = JournalEntry.__table__
+_goals = Goal.__table__
+
+
+class HabitRecord(NamedTuple):
+    id: int
+    name: str
+
+
+class CheckInRecord(NamedTuple):
+    date: date
+    completed: Optional[bool]
+
+
+class MoodRecord(NamedTuple):
+    date: date
+    mood_score: int
+    energy_level: Optional[int]
+    stress_level: Optional[int]
+
+
+class JournalMoodRecord(NamedTuple):
+    date: date
+    mood_before: Optional[int]
+    mood_after: Optional[int]
+
+
+class GoalCounts(NamedTuple):
+    total: int
+    completed: int
+    due_soon: int
+    overdue: int
+
+
+def active_habits(db: Session, user_id: int) -> List[HabitRecord]:
+    rows = db.execute(
+        select(_habits.c.id, _habits.c.name).where(_habits.c.user_id == user_id, _habits.c.is_active == True)
+    )
+    return list(map(HabitRecord._make, rows))
+
+
+def completed_dates_by_habit(db: Session, habit_ids: Iterable[int]) -> Dict[int, List[date]]:
+    """Dates of each habit's completed check-ins, newest first, in one query"""
+    habit_ids = list(habit_ids)
+    dates = defaultdict(list)
+    if not habit_ids:
+        return dates
+    rows = db.execute(
+        select(_check_ins.c.habit_id, _check_ins.c.date).where(
+            _check_ins.c.habit_id.in_(habit_ids),
+            _check_ins.c.completed == True
+        ).order_by(_check_ins.c.habit_id, _check_ins.c.date.desc())
+    )
+    for habit_id, check_in_date in rows:
+        dates[habit_id].append(check_in_date)
+    return dates
+
+
+def check_ins_between(db: Session, user_id: int, start: date, end: date) -> List[CheckInRecord]:
+    rows = db.execute(
+        select(_check_ins.c.date, _check_ins.c.completed).where(
+            _check_ins.c.user_id == user_id,
+            _check_ins.c.date >= start,
+            _check_ins.c.date <= end
+        )
+    )
+    return list(map(CheckInRecord._make, rows))
+
+
+def count_completed_check_ins(db: Session, user_id: int, start: date, end: date) -> int:
+    return db.execute(
+        select(func.count()).select_from(_check_ins).where(
+            _check_ins.c.user_id == user_id,
+            _check_ins.c.date >= start,
+            _check_ins.c.date <= end,
+            _check_ins.c.completed == True
+        )
+    ).scalar_one()
+
+
+def moods_between(db: Session, user_id: int, start: date, end: date, ordered: bool = False) -> List[MoodRecord]:
+    query = select(
+        _moods.c.date, _moods.c.mood_score, _moods.c.energy_level, _moods.c.stress_level
+    ).where(
+        _moods.c.user_id == user_id,
+        _moods.c.date >= start,
+        _moods.c.date <= end
+    )
+    if ordered:
+        query = query.order_by(_moods.c.date.asc())
+    return list(map(MoodRecord._make, db.execute(query)))
+
+
+def journal_moods_between(db: Session, user_id: int, start: date, end: date) -> List[JournalMoodRecord]:
+    rows = db.execute(
+        select(_journal.c.date, _journal.c.mood_before, _journal.c.mood_after).where(
+            _journal.c.user_id == user_id,
+            _journal.c.date >= start,
+            _journal.c.date <= end
+        )
+    )
+    return list(map(JournalMoodRecord._make, rows))
+
+
+def journal_dates_between(db: Session, user_id: int, start: date, end: date) -> List[date]:
+    return db.execute(
+        select(_journal.c.date).where(
+            _journal.c.user_id == user_id,
+            _journal.c.date >= start,
+            _journal.c.date <= end
+        )
+    ).scalars().all()
+
+
+def goal_counts(db: Session, user_id: int, today: date, due_by: date) -> GoalCounts:
+    """All, completed, due between today and due_by, and overdue goals, in one query"""
+    open_goal = _goals.c.is_completed == False
+    row = db.execute(
+        select(
+            func.count(),
+            func.count().filter(_goals.c.is_completed == True),
+            func.count().filter(open_goal, _goals.c.target_date <= due_by, _goals.c.target_date >= today),
+            func.count().filter(open_goal, _goals.c.target_date < today)
+        ).where(_goals.c.user_id == user_id)
+    ).one()
+    return GoalCounts._make(row)
@@ -0,0 +1,201 @@
+"""
+Negotiated gzip / brotli compression of HTTP responses
+
+The encoding is picked from the request's Accept-Encoding (brotli preferred
+when the optional brotli package is installed). Bodies smaller than
+RESPONSE_COMPRESSION_MIN_BYTES, 204/304 and other bodiless responses,
+responses that already carry a Content-Encoding and media types that are
+compressed already go out unchanged. Streaming responses, such as the AI
+response event stream, are compressed chunk by chunk and flushed after each
+chunk, so every event still reaches the client as soon as it is produced.
+"""
+
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered when brotli is not installed
+    brotli = None
+
+# Statuses that never carry a body
+_BODILESS_STATUSES = {204, 205, 304}
+
+# Media types that are compressed already
+_INCOMPRESSIBLE_PREFIXES = ("image/", "audio/", "video/", "font/woff")
+_INCOMPRESSIBLE_TYPES = {"application/zip", "application/gzip", "application/x-gzip", "application/zstd"}
+
+
+def supported_encodings():
+    """Encodings this process can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The best supported encoding acceptable to the client, or None for identity"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    default = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in supported_encodings():
+        quality = qualities.get(coding, default)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, more: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, more: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.flush() if more else self._compressor.finish())
+
+
+def _compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in _BODILESS_STATUSES:
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return not (media_type.startswith(_INCOMPRESSIBLE_PREFIXES) or media_type in _INCOMPRESSIBLE_TYPES)
+
+
+class ResponseCompressionMiddleware:
+    """ASGI middleware compressing response bodies with the negotiated encoding"""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_level: Optional[int] = None
+    ):
+        self.app = app
+        self.minimum_size = settings.response_compression_min_bytes if minimum_size is None else minimum_size
+        self.gzip_level = settings.response_compression_gzip_level if gzip_level is None else gzip_level
+        self.brotli_level = settings.response_compression_brotli_level if brotli_level is None else brotli_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self._encoder_factory(encoding), self.minimum_size)
+        await self.app(scope, receive, responder.send)
+        await responder.finish()
+
+    def _encoder_factory(self, encoding: str):
+        if encoding == "br":
+            return lambda: _BrotliEncoder(self.brotli_level)
+        return lambda: _GzipEncoder(self.gzip_level)
+
+
+class _CompressingResponder:
+    """Holds the response start until the first body chunk shows whether compressing is worth it"""
+
+    def __init__(self, send, encoding: str, make_encoder, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.make_encoder = make_encoder
+        self.minimum_size = minimum_size
+        self._start = None
+        self._encoder = None
+        self._decided = False
+
+    async def send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if self._decided:
+            await self._send_body(message)
+            return
+        if message["type"] != "http.response.body":
+            # Not a body (e.g. trailers): nothing to compress, pass the response through as is
+            await self._pass_through()
+            await self._send(message)
+            return
+
+        self._decided = True
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=self._start)
+        if not _compressible(self._start["status"], headers):
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            declared_length = headers.get("content-length")
+            small = declared_length is not None and declared_length.isdigit() and int(declared_length) < self.minimum_size
+        else:
+            small = len(body) < self.minimum_size
+        if small:
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        self._encoder = self.make_encoder()
+        headers["Content-Encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed representation is no longer byte-identical to the original
+            headers["ETag"] = "W/" + etag
+        compressed = self._encoder.compress(body, more_body)
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(compressed))
+        await self._send(self._start)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    async def _pass_through(self) -> None:
+        self._decided = True
+        if self._start is not None:
+            await self._send(self._start)
+
+    async def finish(self) -> None:
+        """Forward a response start the app sent without any body message"""
+        if not self._decided and self._start is not None:
+            await self._pass_through()
+            await self._send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_body(self, message) -> None:
+        if self._encoder is not None and message["type"] == "http.response.body":
+            more_body = message.get("more_body", False)
+            message = {
+                "type": "http.response.body",
+                "body": self._encoder.compress(message.get("body", b""), more_body),
+                "more_body": more_body,
+            }
+        await self._send(message)
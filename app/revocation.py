@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """Revoked refresh token ids, answered from memory in the common case.
+
+    The Bloom filter is refreshed from ``revoked_tokens`` at most once per
+    ``revocation_sync_seconds``; a token that is not in the filter is known not
+    to be revoked, so only filter hits (revoked or false positive) query the table.
+    Every ``rebuild_interval`` seconds the filter is rebuilt from unexpired rows,
+    so expired tokens stop taking up its capacity.
+    """
+
+    # Rows committed slightly out of order are picked up by re-reading this window
+    SYNC_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self, capacity: int, sync_interval: int, rebuild_interval: int = 3600):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = BloomFilter(capacity)
+        self._synced_until = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        # jti -> revoked_at of the ids already in the filter that the overlap window re-reads
+        self._recent: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, db: Session) -> None:
+        """Pull revocations recorded since the last sync (by any worker)"""
+        started = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(RevokedToken.expires_at > started)
+        rebuild = self._synced_until is None or time.monotonic() >= self._next_rebuild
+        if not rebuild:
+            query = query.filter(RevokedToken.revoked_at >= self._synced_until - self.SYNC_OVERLAP)
+        rows = query.all()
+
+        with self._lock:
+            if not rebuild:
+                rows = [(jti, revoked_at) for jti, revoked_at in rows if jti not in self._recent]
+                if self._filter.count + len(rows) > self.capacity:
+                    # The filter is saturated: rebuild from unexpired rows only
+                    rebuild = True
+                    rows = db.query(RevokedToken.jti, RevokedToken.revoked_at).filter(
+                        RevokedToken.expires_at > started
+                    ).all()
+            if rebuild:
+                self._filter = BloomFilter(self.capacity)
+                self._recent = {}
+                self._next_rebuild = time.monotonic() + self.rebuild_interval
+            for jti, revoked_at in rows:
+                self._filter.add(jti)
+                self._recent[jti] = revoked_at
+            window_start = started - self.SYNC_OVERLAP
+            self._recent = {jti: revoked_at for jti, revoked_at in self._recent.items() if revoked_at >= window_start}
+            self._synced_until = started
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def maybe_sync(self, db: Session) -> None:
+        if time.monotonic() >= self._next_sync:
+            self.sync(db)
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.maybe_sync(db)
+        if jti not in self._filter:
+            return False
+        return db.query(RevokedToken.id).filter(RevokedToken.jti == jti).first() is not None
+
+    def revoke(self, db: Session, jti: str, user_id: int, expires_at: datetime) -> bool:
+        """Record a revocation; returns False if the token was already revoked"""
+        revoked_at = datetime.utcnow()
+        db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=revoked_at))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return False
+        with self._lock:
+            if jti not in self._recent:
+                self._filter.add(jti)
+                self._recent[jti] = revoked_at
+        return True
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete revocations for tokens that have expired anyway"""
+        deleted = db.query(RevokedToken).filter(
+            RevokedToken.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+# Global instance
+revocation_list = RevocationList(
+    capacity=settings.revocation_filter_capacity,
+    sync_interval=settings.revocation_sync_seconds,
+    rebuild_interval=settings.revocation_purge_seconds
+)
+
+
+def purge_expired_revocations() -> int:
+    db = SessionLocal()
+    try:
+        return revocation_list.purge_expired(db)
+    finally:
+        db.close()
+
+
+async def purge_periodically() -> None:
+    """Delete expired revocations now and every REVOCATION_PURGE_SECONDS (run by each server worker)"""
+    while True:
+        try:
+            deleted = await run_in_threadpool(purge_expired_revocations)
+            if deleted:
+                logger.info("Purged %s expired token revocations", deleted)
+        except SQLAlchemyError as e:
+            logger.warning("Could not purge expired token revocations: %r", e)
+        await asyncio.sleep(settings.revocation_purge_seconds)
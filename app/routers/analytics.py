@@ -4,11 +4,12 @@ from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 from app.database import get_db
-from app.models import User, Habit, HabitCheckIn, MoodEntry, JournalEntry
+from app.models import User
 from app.schemas import (
     HabitStreak, MoodTrend, WeeklyStats
 )
 from app.auth import get_current_active_user
+from app import read_models
 
 router = APIRouter()
 
@@ -24,61 +25,41 @@ async def get_dashboard_data(
     week_end = week_start + timedelta(days=6)
     
     # Get habits data
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
-    
-    # Get today's check-ins
-    today_check_ins = db.query(HabitCheckIn).filter(
-        HabitCheckIn.user_id == current_user.id,
-        HabitCheckIn.date == today
-    ).all()
-    
-    # Get weekly check-ins
-    weekly_check_ins = db.query(HabitCheckIn).filter(
-        HabitCheckIn.user_id == current_user.id,
-        HabitCheckIn.date >= week_start,
-        HabitCheckIn.date <= week_end
-    ).all()
+    habits = read_models.active_habits(db, current_user.id)
+    
+    # Get today's and this week's completed check-ins
+    completed_today = read_models.count_completed_check_ins(db, current_user.id, today, today)
+    weekly_completed = read_models.count_completed_check_ins(db, current_user.id, week_start, week_end)
     
     # Get mood data
-    recent_mood = db.query(MoodEntry).filter(
-        MoodEntry.user_id == current_user.id,
-        MoodEntry.date == today
-    ).first()
+    today_moods = read_models.moods_between(db, current_user.id, today, today)
+    recent_mood = today_moods[0] if today_moods else None
     
     # Get journal entries
-    recent_journal = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date == today
-    ).first()
+    today_journal = read_models.journal_moods_between(db, current_user.id, today, today)
+    recent_journal = today_journal[0] if today_journal else None
     
     # Calculate statistics
     total_habits = len(habits)
-    completed_today = len([c for c in today_check_ins if c.completed])
     completion_rate_today = (completed_today / total_habits * 100) if total_habits > 0 else 0
     
     # Weekly completion rate
-    weekly_completed = len([c for c in weekly_check_ins if c.completed])
     weekly_total = total_habits * 7  # Assuming daily habits
     weekly_completion_rate = (weekly_completed / weekly_total * 100) if weekly_total > 0 else 0
     
     # Calculate streaks
+    completed_dates = read_models.completed_dates_by_habit(db, [habit.id for habit in habits])
     habit_streaks = []
     for habit in habits:
-        check_ins = db.query(HabitCheckIn).filter(
-            HabitCheckIn.habit_id == habit.id,
-            HabitCheckIn.completed == True
-        ).order_by(HabitCheckIn.date.desc()).all()
+        check_in_dates = completed_dates[habit.id]
         
         current_streak = 0
-        if check_ins:
+        if check_in_dates:
             current_date = today
-            for check_in in check_ins:
-                if check_in.date == current_date or check_in.date == current_date - timedelta(days=current_streak):
+            for check_in_date in check_in_dates:
+                if check_in_date == current_date or check_in_date == current_date - timedelta(days=current_streak):
                     current_streak += 1
-                    current_date = check_in.date - timedelta(days=1)
+                    current_date = check_in_date - timedelta(days=1)
                 else:
                     break
         
@@ -120,21 +101,16 @@ async def get_habit_streaks(
     db: Session = Depends(get_db)
 ):
     """Get detailed streak information for all habits"""
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
+    habits = read_models.active_habits(db, current_user.id)
+    completed_dates = read_models.completed_dates_by_habit(db, [habit.id for habit in habits])
     
     streaks = []
     today = date.today()
     
     for habit in habits:
-        check_ins = db.query(HabitCheckIn).filter(
-            HabitCheckIn.habit_id == habit.id,
-            HabitCheckIn.completed == True
-        ).order_by(HabitCheckIn.date.desc()).all()
+        check_in_dates = completed_dates[habit.id]
         
-        if not check_ins:
+        if not check_in_dates:
             streaks.append(HabitStreak(
                 habit_id=habit.id,
                 habit_name=habit.name,
@@ -148,10 +124,10 @@ async def get_habit_streaks(
         current_streak = 0
         current_date = today
         
-        for check_in in check_ins:
-            if check_in.date == current_date or check_in.date == current_date - timedelta(days=current_streak):
+        for check_in_date in check_in_dates:
+            if check_in_date == current_date or check_in_date == current_date - timedelta(days=current_streak):
                 current_streak += 1
-                current_date = check_in.date - timedelta(days=1)
+                current_date = check_in_date - timedelta(days=1)
             else:
                 break
         
@@ -160,13 +136,13 @@ async def get_habit_streaks(
         temp_streak = 0
         prev_date = None
         
-        for check_in in check_ins:
-            if prev_date is None or check_in.date == prev_date - timedelta(days=1):
+        for check_in_date in check_in_dates:
+            if prev_date is None or check_in_date == prev_date - timedelta(days=1):
                 temp_streak += 1
             else:
                 longest_streak = max(longest_streak, temp_streak)
                 temp_streak = 1
-            prev_date = check_in.date
+            prev_date = check_in_date
         
         longest_streak = max(longest_streak, temp_streak)
         
@@ -175,7 +151,7 @@ async def get_habit_streaks(
             habit_name=habit.name,
             current_streak=current_streak,
             longest_streak=longest_streak,
-            last_completed=check_ins[0].date if check_ins else None
+            last_completed=check_in_dates[0] if check_in_dates else None
         ))
     
     return streaks
@@ -191,11 +167,7 @@ async def get_mood_trends(
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    mood_entries = db.query(MoodEntry).filter(
-        MoodEntry.user_id == current_user.id,
-        MoodEntry.date >= start_date,
-        MoodEntry.date <= end_date
-    ).order_by(MoodEntry.date.asc()).all()
+    mood_entries = read_models.moods_between(db, current_user.id, start_date, end_date, ordered=True)
     
     trends = []
     for entry in mood_entries:
@@ -218,54 +190,46 @@ async def get_weekly_stats(
     """Get weekly statistics for the specified number of weeks"""
     today = date.today()
     stats = []
+    if weeks <= 0:
+        return stats
+    
+    # Read the whole span once and bucket by week; week 0 is the current week
+    current_week_start = today - timedelta(days=today.weekday())
+    first_day = current_week_start - timedelta(days=7 * (weeks - 1))
+    last_day = current_week_start + timedelta(days=6)
+    
+    def week_of(day: date) -> int:
+        return weeks - 1 - (day - first_day).days // 7
+    
+    total_habits = len(read_models.active_habits(db, current_user.id)) * 7  # Assuming daily habits
+    habits_completed = [0] * weeks
+    mood_scores = [[] for _ in range(weeks)]
+    journal_entries = [0] * weeks
+    
+    for check_in in read_models.check_ins_between(db, current_user.id, first_day, last_day):
+        if check_in.completed:
+            habits_completed[week_of(check_in.date)] += 1
+    
+    for mood_entry in read_models.moods_between(db, current_user.id, first_day, last_day):
+        mood_scores[week_of(mood_entry.date)].append(mood_entry.mood_score)
+    
+    for journal_date in read_models.journal_dates_between(db, current_user.id, first_day, last_day):
+        journal_entries[week_of(journal_date)] += 1
     
     for week in range(weeks):
-        week_start = today - timedelta(days=today.weekday() + (week * 7))
+        week_start = current_week_start - timedelta(days=week * 7)
         week_end = week_start + timedelta(days=6)
         
-        # Get habits for this week
-        habits = db.query(Habit).filter(
-            Habit.user_id == current_user.id,
-            Habit.is_active == True
-        ).all()
-        
-        # Get check-ins for this week
-        check_ins = db.query(HabitCheckIn).filter(
-            HabitCheckIn.user_id == current_user.id,
-            HabitCheckIn.date >= week_start,
-            HabitCheckIn.date <= week_end
-        ).all()
-        
-        # Get mood entries for this week
-        mood_entries = db.query(MoodEntry).filter(
-            MoodEntry.user_id == current_user.id,
-            MoodEntry.date >= week_start,
-            MoodEntry.date <= week_end
-        ).all()
-        
-        # Get journal entries for this week
-        journal_entries = db.query(JournalEntry).filter(
-            JournalEntry.user_id == current_user.id,
-            JournalEntry.date >= week_start,
-            JournalEntry.date <= week_end
-        ).all()
-        
-        # Calculate statistics
-        habits_completed = len([c for c in check_ins if c.completed])
-        total_habits = len(habits) * 7  # Assuming daily habits
-        
-        average_mood = None
-        if mood_entries:
-            mood_scores = [entry.mood_score for entry in mood_entries]
-            average_mood = round(sum(mood_scores) / len(mood_scores), 2)
+        scores = mood_scores[week]
+        average_mood = round(sum(scores) / len(scores), 2) if scores else None
         
         stats.append(WeeklyStats(
             week_start=week_start,
             week_end=week_end,
-            habits_completed=habits_completed,
+            habits_completed=habits_completed[week],
             total_habits=total_habits,
             average_mood=average_mood,
-            journal_entries=len(journal_entries)
+            journal_entries=journal_entries[week]
         ))
     
     return stats
@@ -286,25 +250,13 @@ async def get_calendar_data(
     last_day = date(year, month, monthrange(year, month)[1])
     
     # Get all check-ins for the month
-    check_ins = db.query(HabitCheckIn).filter(
-        HabitCheckIn.user_id == current_user.id,
-        HabitCheckIn.date >= first_day,
-        HabitCheckIn.date <= last_day
-    ).all()
+    check_ins = read_models.check_ins_between(db, current_user.id, first_day, last_day)
     
     # Get mood entries for the month
-    mood_entries = db.query(MoodEntry).filter(
-        MoodEntry.user_id == current_user.id,
-        MoodEntry.date >= first_day,
-        MoodEntry.date <= last_day
-    ).all()
-    
-    # Get journal entries for the month
-    journal_entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date >= first_day,
-        JournalEntry.date <= last_day
-    ).all()
+    mood_entries = read_models.moods_between(db, current_user.id, first_day, last_day)
+    
+    # Get journal entry dates for the month
+    journal_dates = read_models.journal_dates_between(db, current_user.id, first_day, last_day)
     
     # Organize data by date
     calendar_data = {}
@@ -335,8 +287,8 @@ async def get_calendar_data(
             calendar_data[date_str]["mood_score"] = mood_entry.mood_score
     
     # Populate with journal entries
-    for journal_entry in journal_entries:
-        date_str = journal_entry.date.isoformat()
+    for journal_date in journal_dates:
+        date_str = journal_date.isoformat()
         if date_str in calendar_data:
             calendar_data[date_str]["journal_entry"] = True
     
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
 from app.database import get_db
 from app.models import User
-from app.schemas import UserCreate, User as UserSchema, Token, LoginRequest
-from app.auth import authenticate_user, create_access_token, get_password_hash, get_current_active_user
+from app.schemas import UserCreate, User as UserSchema, UserPreferences, Token, LoginRequest, RefreshRequest
+from app.auth import (
+    authenticate_user, create_user_access_token, create_refresh_token, decode_refresh_token,
+    user_from_claims, revoke_user_tokens, get_password_hash_async, get_current_active_db_user
+)
+from app.revocation import revocation_list
 from app.config import settings
 
 router = APIRouter()
@@ -23,7 +27,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         full_name=user.full_name,
@@ -40,7 +44,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """Login and get access token"""
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,14 +53,81 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         )
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user)
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_data: RefreshRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access/refresh token pair (no password check)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    payload = decode_refresh_token(refresh_data.refresh_token)
+    if payload is None:
+        raise credentials_exception
+    
+    if revocation_list.is_revoked(db, payload["jti"]):
+        # A rotated token being replayed: revoke the whole session family
+        user = db.get(User, payload["uid"])
+        if user is not None:
+            revoke_user_tokens(db, user)
+            db.commit()
+        raise credentials_exception
+    
+    user = user_from_claims(payload, db)
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    # Rotate: the presented token can never be used again
+    if not revocation_list.revoke(db, payload["jti"], user.id, datetime.utcfromtimestamp(payload["exp"])):
+        raise credentials_exception
+    db.commit()
+    
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    return {
+        "access_token": create_user_access_token(user, expires_delta=access_token_expires),
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user)
+    }
+
+
+@router.post("/logout")
+async def logout(refresh_data: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke a refresh token"""
+    payload = decode_refresh_token(refresh_data.refresh_token)
+    if payload is not None:
+        revocation_list.revoke(db, payload["jti"], payload["uid"], datetime.utcfromtimestamp(payload["exp"]))
+        db.commit()
+    
+    return {"message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_active_db_user)):
     """Get current user information"""
     return current_user
+
+
+@router.put("/me/preferences", response_model=UserSchema)
+async def update_preferences(
+    preferences: UserPreferences,
+    current_user: User = Depends(get_current_active_db_user),
+    db: Session = Depends(get_db)
+):
+    """Update the current user's preferences (ai_mode: llm, local, hybrid, or null for the default)"""
+    for field, value in preferences.dict(exclude_unset=True).items():
+        setattr(current_user, field, value)
+    
+    db.commit()
+    db.refresh(current_user)
+    
+    return current_user
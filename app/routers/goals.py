@@ -8,6 +8,8 @@ from app.schemas import (
     GoalCreate, GoalUpdate, Goal as GoalSchema
 )
 from app.auth import get_current_active_user
+from app.serialization import list_response, schema_columns
+from app import read_models
 
 router = APIRouter()
 
@@ -40,14 +42,12 @@ async def get_goals(
     db: Session = Depends(get_db)
 ):
     """Get all goals for the current user with optional completion filter"""
-    query = db.query(Goal).filter(Goal.user_id == current_user.id)
+    query = db.query(*schema_columns(Goal, GoalSchema)).filter(Goal.user_id == current_user.id)
     
     if completed is not None:
         query = query.filter(Goal.is_completed == completed)
     
-    goals = query.order_by(Goal.created_at.desc()).all()
-    
-    return goals
+    return list_response(query.order_by(Goal.created_at.desc()))
 
 
 @router.get("/{goal_id}", response_model=GoalSchema)
@@ -141,28 +141,14 @@ async def get_goals_overview(
     db: Session = Depends(get_db)
 ):
     """Get goals overview statistics"""
-    total_goals = db.query(Goal).filter(Goal.user_id == current_user.id).count()
-    completed_goals = db.query(Goal).filter(
-        Goal.user_id == current_user.id,
-        Goal.is_completed == True
-    ).count()
-    
-    # Goals due soon (within 7 days)
+    # Goals due soon are open goals due within 7 days; overdue ones are open and past due
     from datetime import timedelta
-    soon_due_date = date.today() + timedelta(days=7)
-    due_soon = db.query(Goal).filter(
-        Goal.user_id == current_user.id,
-        Goal.is_completed == False,
-        Goal.target_date <= soon_due_date,
-        Goal.target_date >= date.today()
-    ).count()
-    
-    # Overdue goals
-    overdue = db.query(Goal).filter(
-        Goal.user_id == current_user.id,
-        Goal.is_completed == False,
-        Goal.target_date < date.today()
-    ).count()
+    today = date.today()
+    counts = read_models.goal_counts(db, current_user.id, today, today + timedelta(days=7))
+    total_goals = counts.total
+    completed_goals = counts.completed
+    due_soon = counts.due_soon
+    overdue = counts.overdue
     
     completion_rate = (completed_goals / total_goals * 100) if total_goals > 0 else 0
     
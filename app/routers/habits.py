@@ -10,6 +10,8 @@ from app.schemas import (
     HabitStreak
 )
 from app.auth import get_current_active_user
+from app.serialization import list_response, schema_columns
+from app import read_models
 
 router = APIRouter()
 
@@ -42,12 +44,12 @@ async def get_habits(
     db: Session = Depends(get_db)
 ):
     """Get all habits for the current user"""
-    habits = db.query(Habit).filter(
+    query = db.query(*schema_columns(Habit, HabitSchema)).filter(
         Habit.user_id == current_user.id,
         Habit.is_active == True
-    ).all()
+    )
     
-    return habits
+    return list_response(query)
 
 
 @router.get("/{habit_id}", response_model=HabitSchema)
@@ -171,7 +173,9 @@ async def get_habit_check_ins(
     db: Session = Depends(get_db)
 ):
     """Get habit check-ins with optional filters"""
-    query = db.query(HabitCheckIn).filter(HabitCheckIn.user_id == current_user.id)
+    query = db.query(*schema_columns(HabitCheckIn, HabitCheckInSchema)).filter(
+        HabitCheckIn.user_id == current_user.id
+    )
     
     if habit_id:
         query = query.filter(HabitCheckIn.habit_id == habit_id)
@@ -182,9 +186,7 @@ async def get_habit_check_ins(
     if end_date:
         query = query.filter(HabitCheckIn.date <= end_date)
     
-    check_ins = query.order_by(HabitCheckIn.date.desc()).all()
-    
-    return check_ins
+    return list_response(query.order_by(HabitCheckIn.date.desc()))
 
 
 @router.put("/check-ins/{check_in_id}", response_model=HabitCheckInSchema)
@@ -218,21 +220,16 @@ async def get_habit_streaks(
     db: Session = Depends(get_db)
 ):
     """Get current streaks for all habits"""
-    habits = db.query(Habit).filter(
-        Habit.user_id == current_user.id,
-        Habit.is_active == True
-    ).all()
+    habits = read_models.active_habits(db, current_user.id)
+    # Completed check-in dates of every habit, newest first
+    completed_dates = read_models.completed_dates_by_habit(db, [habit.id for habit in habits])
     
     streaks = []
     
     for habit in habits:
-        # Get check-ins ordered by date
-        check_ins = db.query(HabitCheckIn).filter(
-            HabitCheckIn.habit_id == habit.id,
-            HabitCheckIn.completed == True
-        ).order_by(HabitCheckIn.date.desc()).all()
+        check_in_dates = completed_dates[habit.id]
         
-        if not check_ins:
+        if not check_in_dates:
             streaks.append(HabitStreak(
                 habit_id=habit.id,
                 habit_name=habit.name,
@@ -248,11 +245,11 @@ async def get_habit_streaks(
         expected_date = today
         
         # Allow streak to continue if user completed yesterday
-        if check_ins[0].date == today - timedelta(days=1):
+        if check_in_dates[0] == today - timedelta(days=1):
             expected_date = today - timedelta(days=1)
         
-        for check_in in check_ins:
-            if check_in.date == expected_date:
+        for check_in_date in check_in_dates:
+            if check_in_date == expected_date:
                 current_streak += 1
                 expected_date = expected_date - timedelta(days=1)
             else:
@@ -263,13 +260,13 @@ async def get_habit_streaks(
         temp_streak = 0
         prev_date = None
         
-        for check_in in check_ins:
-            if prev_date is None or check_in.date == prev_date - timedelta(days=1):
+        for check_in_date in check_in_dates:
+            if prev_date is None or check_in_date == prev_date - timedelta(days=1):
                 temp_streak += 1
             else:
                 longest_streak = max(longest_streak, temp_streak)
                 temp_streak = 1
-            prev_date = check_in.date
+            prev_date = check_in_date
         
         longest_streak = max(longest_streak, temp_streak)
         
@@ -278,7 +275,7 @@ async def get_habit_streaks(
             habit_name=habit.name,
             current_streak=current_streak,
             longest_streak=longest_streak,
-            last_completed=check_ins[0].date if check_ins else None
+            last_completed=check_in_dates[0] if check_in_dates else None
         ))
     
     return streaks
@@ -0,0 +1,119 @@
+"""
+Liveness and readiness probes
+
+/health/live only shows the worker's event loop is serving requests.
+/health/ready also pings the database through the pool (with a short timeout),
+checks that the schema is at the Alembic head revision and reports the OpenAI
+circuit breaker. An open circuit leaves the worker ready, since it serves the
+fallback response and every worker shares the same upstream. Readiness results
+are cached for HEALTH_CACHE_SECONDS, and concurrent probes share one check, so
+probe floods add no database load.
+"""
+
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app.ai_service import ai_journal_service
+from app.config import settings
+from app.database import engine
+
+router = APIRouter()
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+@lru_cache(maxsize=1)
+def alembic_head() -> Optional[str]:
+    """Head revision of the migration scripts shipped with this code"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def _probe_database() -> Optional[str]:
+    """Ping the database through the pool and return its Alembic revision"""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+class ReadinessProbe:
+    def __init__(self, cache_seconds: Optional[float] = None, db_timeout: Optional[float] = None):
+        self.cache_seconds = settings.health_cache_seconds if cache_seconds is None else cache_seconds
+        self.db_timeout = settings.health_db_timeout_seconds if db_timeout is None else db_timeout
+        self._result: Optional[dict] = None
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def check(self) -> dict:
+        if time.monotonic() < self._expires_at:
+            return self._result
+        async with self._get_lock():
+            # Another probe may have refreshed the result while this one waited
+            if time.monotonic() < self._expires_at:
+                return self._result
+            self._result = await self._run_checks()
+            self._expires_at = time.monotonic() + self.cache_seconds
+            return self._result
+
+    async def _run_checks(self) -> dict:
+        checks = {}
+
+        started = time.perf_counter()
+        revision = None
+        try:
+            revision = await asyncio.wait_for(run_in_threadpool(_probe_database), timeout=self.db_timeout)
+            checks["database"] = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except asyncio.TimeoutError:
+            checks["database"] = {"ok": False, "error": f"no connection within {self.db_timeout}s"}
+        except SQLAlchemyError as e:
+            checks["database"] = {"ok": False, "error": type(e).__name__}
+
+        head = alembic_head()
+        checks["migrations"] = {
+            "ok": checks["database"]["ok"] and revision == head,
+            "current": revision,
+            "head": head,
+        }
+
+        breaker = ai_journal_service.breaker.stats()
+        checks["ai"] = {"ok": True, "circuit": breaker["state"], "configured": ai_journal_service.configured}
+
+        ready = all(check["ok"] for check in checks.values())
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+
+readiness = ReadinessProbe()
+
+
+@router.get("")
+async def health_check():
+    return {"status": "healthy"}
+
+
+@router.get("/live")
+async def liveness():
+    """The worker is up and its event loop is serving requests"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Whether this worker can serve traffic (503 when it cannot)"""
+    result = await readiness.check()
+    return ORJSONResponse(result, status_code=200 if result["status"] == "ready" else 503)
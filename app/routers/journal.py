@@ -1,26 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime, timedelta
-from app.database import get_db
-from app.models import User, JournalEntry
+import json
+from app.database import get_db, SessionLocal
+from app.config import settings
+from app.models import User, JournalEntry, AIJob
 from app.schemas import (
     JournalEntryCreate, JournalEntryUpdate, JournalEntry as JournalEntrySchema,
-    AIJournalResponse
+    AIJournalResponse, AIJobStatus, AIMode, JournalSearchPage
 )
 from app.auth import get_current_active_user
 from app.ai_service import ai_journal_service
+from app.jobs import enqueue_ai_job
+from app.journal_ai import (
+    generate_for_entry, get_context_entries, get_history_summary, refresh_history_summary, apply_ai_response,
+    apply_local_response, fill_ai_response, remove_from_history_summary, resolve_ai_mode
+)
+from app.embeddings import index_entry, unindex_entry
+from app.search import search_entries, SearchNotSupported
+from app.serialization import list_response, schema_columns
+from app import read_models
 
 router = APIRouter()
 
 
+async def _respond_to_entry(
+    db: Session,
+    journal_entry: JournalEntry,
+    mode: str,
+    bypass_cache: bool = False
+) -> Optional[AIJournalResponse]:
+    """Fill the entry's AI fields for the given AI mode (returns None when queued for the worker)"""
+    if mode == "llm":
+        if settings.ai_job_queue:
+            # The worker fills in the AI response; clients poll /{entry_id}/ai-status
+            enqueue_ai_job(db, journal_entry, bypass_cache=bypass_cache)
+            return None
+        return await generate_for_entry(db, journal_entry, use_cache=not bypass_cache)
+    
+    ai_response = apply_local_response(journal_entry)
+    if mode == "hybrid" and ai_journal_service.configured:
+        # Local fields now; the OpenAI response replaces the local text later
+        if settings.ai_job_queue:
+            enqueue_ai_job(db, journal_entry, bypass_cache=bypass_cache)
+        else:
+            journal_entry.ai_status = "pending"
+    return ai_response
+
+
+def _schedule_fill(
+    background_tasks: BackgroundTasks,
+    journal_entry: JournalEntry,
+    mode: str,
+    bypass_cache: bool = False
+) -> None:
+    """In hybrid mode without the job queue, fetch the OpenAI response after the request returns"""
+    if mode == "hybrid" and not settings.ai_job_queue and ai_journal_service.configured:
+        background_tasks.add_task(fill_ai_response, journal_entry.id, use_cache=not bypass_cache)
+
+
 @router.post("/", response_model=JournalEntrySchema)
 async def create_journal_entry(
     journal_entry: JournalEntryCreate,
+    background_tasks: BackgroundTasks,
+    ai_mode: Optional[AIMode] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Create a new journal entry with AI response"""
+    """Create a new journal entry with AI response (ai_mode overrides the user's preference)"""
     # Set date to today if not provided
     entry_date = journal_entry.date or date.today()
     
@@ -36,33 +85,24 @@ async def create_journal_entry(
             detail="Journal entry already exists for this date. Use PUT to update."
         )
     
-    # Get recent journal entries for context
-    recent_entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id
-    ).order_by(JournalEntry.date.desc()).limit(3).all()
-    
-    previous_contents = [entry.content for entry in recent_entries]
-    
-    # Generate AI response
-    ai_response = await ai_journal_service.generate_journal_response(
-        journal_content=journal_entry.content,
-        mood_before=journal_entry.mood_before,
-        previous_entries=previous_contents
-    )
-    
     # Create journal entry
     db_journal_entry = JournalEntry(
         user_id=current_user.id,
         date=entry_date,
         content=journal_entry.content,
-        mood_before=journal_entry.mood_before,
-        ai_response=ai_response.response,
-        mood_after=ai_response.mood_after
+        mood_before=journal_entry.mood_before
     )
     
+    mode = resolve_ai_mode(db, current_user.id, ai_mode)
+    await _respond_to_entry(db, db_journal_entry, mode)
+    
     db.add(db_journal_entry)
+    db.flush()
+    index_entry(db, db_journal_entry)
+    refresh_history_summary(db, current_user.id)
     db.commit()
     db.refresh(db_journal_entry)
+    _schedule_fill(background_tasks, db_journal_entry, mode)
     
     return db_journal_entry
 
@@ -75,7 +115,9 @@ async def get_journal_entries(
     db: Session = Depends(get_db)
 ):
     """Get journal entries with optional date filters"""
-    query = db.query(JournalEntry).filter(JournalEntry.user_id == current_user.id)
+    query = db.query(*schema_columns(JournalEntry, JournalEntrySchema)).filter(
+        JournalEntry.user_id == current_user.id
+    )
     
     if start_date:
         query = query.filter(JournalEntry.date >= start_date)
@@ -83,9 +125,26 @@ async def get_journal_entries(
     if end_date:
         query = query.filter(JournalEntry.date <= end_date)
     
-    journal_entries = query.order_by(JournalEntry.date.desc()).all()
-    
-    return journal_entries
+    return list_response(query.order_by(JournalEntry.date.desc()))
+
+
+@router.get("/search", response_model=JournalSearchPage)
+async def search_journal_entries(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over the user's journal entries, best match first (pass next_cursor for more)"""
+    try:
+        results, next_cursor = search_entries(db, current_user.id, q, limit=limit, cursor=cursor)
+    except SearchNotSupported as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"results": results, "next_cursor": next_cursor}
 
 
 @router.get("/{entry_id}", response_model=JournalEntrySchema)
@@ -110,6 +169,8 @@ async def get_journal_entry(
 async def update_journal_entry(
     entry_id: int,
     journal_update: JournalEntryUpdate,
+    background_tasks: BackgroundTasks,
+    ai_mode: Optional[AIMode] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -126,28 +187,23 @@ async def update_journal_entry(
     for field, value in journal_update.dict(exclude_unset=True).items():
         setattr(journal_entry, field, value)
     
-    # Regenerate AI response if content was updated
+    # Re-index and regenerate AI response if content was updated
+    mode = None
     if journal_update.content is not None:
-        # Get recent journal entries for context
-        recent_entries = db.query(JournalEntry).filter(
-            JournalEntry.user_id == current_user.id,
-            JournalEntry.id != entry_id
-        ).order_by(JournalEntry.date.desc()).limit(3).all()
-        
-        previous_contents = [entry.content for entry in recent_entries]
-        
-        # Generate new AI response
-        ai_response = await ai_journal_service.generate_journal_response(
-            journal_content=journal_entry.content,
-            mood_before=journal_entry.mood_before,
-            previous_entries=previous_contents
-        )
-        
-        journal_entry.ai_response = ai_response.response
-        journal_entry.mood_after = ai_response.mood_after
+        index_entry(db, journal_entry)
+        mode = resolve_ai_mode(db, current_user.id, ai_mode)
+        # The old response answered the old text (a queued job fills the new one in)
+        journal_entry.ai_response = None
+        journal_entry.mood_after = None
+        await _respond_to_entry(db, journal_entry, mode)
+        # Summarize the new text again if the entry is (or was) in the history summary
+        journal_entry.in_summary = False
+        db.flush()
+        refresh_history_summary(db, current_user.id)
     
     db.commit()
     db.refresh(journal_entry)
+    _schedule_fill(background_tasks, journal_entry, mode)
     
     return journal_entry
 
@@ -167,6 +223,10 @@ async def delete_journal_entry(
     if not journal_entry:
         raise HTTPException(status_code=404, detail="Journal entry not found")
     
+    db.query(AIJob).filter(AIJob.journal_entry_id == entry_id).delete(synchronize_session=False)
+    unindex_entry(db, journal_entry)
+    # Its text must not reach later prompts through the rolling summary either
+    remove_from_history_summary(db, journal_entry)
     db.delete(journal_entry)
     db.commit()
     
@@ -176,10 +236,13 @@ async def delete_journal_entry(
 @router.post("/{entry_id}/regenerate-ai", response_model=AIJournalResponse)
 async def regenerate_ai_response(
     entry_id: int,
+    background_tasks: BackgroundTasks,
+    bypass_cache: bool = False,
+    ai_mode: Optional[AIMode] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Regenerate AI response for a journal entry"""
+    """Regenerate AI response for a journal entry (bypass_cache forces a fresh completion)"""
     journal_entry = db.query(JournalEntry).filter(
         JournalEntry.id == entry_id,
         JournalEntry.user_id == current_user.id
@@ -188,28 +251,103 @@ async def regenerate_ai_response(
     if not journal_entry:
         raise HTTPException(status_code=404, detail="Journal entry not found")
     
-    # Get recent journal entries for context
-    recent_entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.id != entry_id
-    ).order_by(JournalEntry.date.desc()).limit(3).all()
+    # Generate new AI response and update the journal entry
+    mode = resolve_ai_mode(db, current_user.id, ai_mode)
+    ai_response = await _respond_to_entry(db, journal_entry, mode, bypass_cache=bypass_cache)
     
-    previous_contents = [entry.content for entry in recent_entries]
+    db.commit()
     
-    # Generate new AI response
-    ai_response = await ai_journal_service.generate_journal_response(
-        journal_content=journal_entry.content,
-        mood_before=journal_entry.mood_before,
-        previous_entries=previous_contents
-    )
+    if ai_response is None:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=AIJobStatus(entry_id=journal_entry.id, ai_status=journal_entry.ai_status).dict()
+        )
+    
+    _schedule_fill(background_tasks, journal_entry, mode, bypass_cache=bypass_cache)
+    return ai_response
+
+
+@router.post("/{entry_id}/regenerate-ai/stream")
+async def stream_ai_response(
+    entry_id: int,
+    bypass_cache: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Regenerate the AI response for a journal entry, streamed as Server-Sent Events
+
+    Emits `token` events with text deltas as the model produces them, then one
+    `done` event with the final AIJournalResponse, which is also saved on the entry.
+    """
+    journal_entry = db.query(JournalEntry).filter(
+        JournalEntry.id == entry_id,
+        JournalEntry.user_id == current_user.id
+    ).first()
     
-    # Update the journal entry
-    journal_entry.ai_response = ai_response.response
-    journal_entry.mood_after = ai_response.mood_after
+    if not journal_entry:
+        raise HTTPException(status_code=404, detail="Journal entry not found")
     
-    db.commit()
+    content = journal_entry.content
+    mood_before = journal_entry.mood_before
+    previous_contents = get_context_entries(db, current_user.id, content, exclude_entry_id=entry_id)
+    history_summary = get_history_summary(db, current_user.id)
+    
+    async def event_stream():
+        items = ai_journal_service.stream_journal_response(
+            journal_content=content,
+            mood_before=mood_before,
+            previous_entries=previous_contents,
+            use_cache=not bypass_cache,
+            history_summary=history_summary
+        )
+        try:
+            async for item in items:
+                if isinstance(item, str):
+                    yield f"event: token\ndata: {json.dumps({'delta': item})}\n\n"
+                    continue
+                
+                # Persist with a fresh session: the request's session may already be closed
+                persist_db = SessionLocal()
+                try:
+                    stored_entry = persist_db.get(JournalEntry, entry_id)
+                    if stored_entry is not None:
+                        apply_ai_response(stored_entry, item)
+                        persist_db.commit()
+                finally:
+                    persist_db.close()
+                yield f"event: done\ndata: {item.json()}\n\n"
+        finally:
+            # The client disconnected: stop generating upstream right away
+            await items.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{entry_id}/ai-status", response_model=AIJobStatus)
+async def get_ai_status(
+    entry_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Poll the AI response status for a journal entry"""
+    journal_entry = db.query(JournalEntry).filter(
+        JournalEntry.id == entry_id,
+        JournalEntry.user_id == current_user.id
+    ).first()
     
-    return ai_response
+    if not journal_entry:
+        raise HTTPException(status_code=404, detail="Journal entry not found")
+    
+    return AIJobStatus(
+        entry_id=journal_entry.id,
+        ai_status=journal_entry.ai_status,
+        ai_response=journal_entry.ai_response if journal_entry.ai_status != "pending" else None,
+        mood_after=journal_entry.mood_after if journal_entry.ai_status != "pending" else None
+    )
 
 
 @router.get("/stats/weekly")
@@ -222,11 +360,7 @@ async def get_weekly_journal_stats(
     end_date = date.today()
     start_date = end_date - timedelta(days=6)
     
-    journal_entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date >= start_date,
-        JournalEntry.date <= end_date
-    ).all()
+    journal_entries = read_models.journal_moods_between(db, current_user.id, start_date, end_date)
     
     if not journal_entries:
         return {
@@ -261,3 +395,4 @@ async def get_weekly_journal_stats(
             "end_date": end_date.isoformat()
         }
     }
+
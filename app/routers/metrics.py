@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("")
+async def metrics():
+    """Prometheus exposition of this server's metrics (all workers under gunicorn)"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
@@ -9,6 +9,8 @@ from app.schemas import (
     MoodTrend
 )
 from app.auth import get_current_active_user
+from app.serialization import list_response, schema_columns
+from app import read_models
 
 router = APIRouter()
 
@@ -56,7 +58,7 @@ async def get_mood_entries(
     db: Session = Depends(get_db)
 ):
     """Get mood entries with optional date filters"""
-    query = db.query(MoodEntry).filter(MoodEntry.user_id == current_user.id)
+    query = db.query(*schema_columns(MoodEntry, MoodEntrySchema)).filter(MoodEntry.user_id == current_user.id)
     
     if start_date:
         query = query.filter(MoodEntry.date >= start_date)
@@ -64,9 +66,7 @@ async def get_mood_entries(
     if end_date:
         query = query.filter(MoodEntry.date <= end_date)
     
-    mood_entries = query.order_by(MoodEntry.date.desc()).all()
-    
-    return mood_entries
+    return list_response(query.order_by(MoodEntry.date.desc()))
 
 
 @router.get("/{entry_id}", response_model=MoodEntrySchema)
@@ -143,11 +143,7 @@ async def get_mood_trends(
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    mood_entries = db.query(MoodEntry).filter(
-        MoodEntry.user_id == current_user.id,
-        MoodEntry.date >= start_date,
-        MoodEntry.date <= end_date
-    ).order_by(MoodEntry.date.asc()).all()
+    mood_entries = read_models.moods_between(db, current_user.id, start_date, end_date, ordered=True)
     
     trends = []
     for entry in mood_entries:
@@ -171,11 +167,7 @@ async def get_weekly_mood_stats(
     end_date = date.today()
     start_date = end_date - timedelta(days=6)
     
-    mood_entries = db.query(MoodEntry).filter(
-        MoodEntry.user_id == current_user.id,
-        MoodEntry.date >= start_date,
-        MoodEntry.date <= end_date
-    ).all()
+    mood_entries = read_models.moods_between(db, current_user.id, start_date, end_date)
     
     if not mood_entries:
         return {
@@ -1,8 +1,11 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import date, datetime
 
 
+AIMode = Literal["llm", "local", "hybrid"]
+
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -18,10 +21,15 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
 
 
+class UserPreferences(BaseModel):
+    ai_mode: Optional[AIMode] = None
+
+
 class User(UserBase):
     id: int
     is_active: bool
     created_at: datetime
+    ai_mode: Optional[str] = None
     
     class Config:
         orm_mode = True
@@ -133,12 +141,27 @@ class JournalEntry(JournalEntryBase):
     user_id: int
     ai_response: Optional[str] = None
     mood_after: Optional[int] = None
+    ai_status: Optional[str] = None
     created_at: datetime
     
     class Config:
         orm_mode = True
 
 
+class JournalSearchResult(BaseModel):
+    id: int
+    date: date
+    snippet: str
+    score: float
+    mood_before: Optional[int] = None
+    mood_after: Optional[int] = None
+
+
+class JournalSearchPage(BaseModel):
+    results: List[JournalSearchResult]
+    next_cursor: Optional[str] = None
+
+
 # Goal Schemas
 class GoalBase(BaseModel):
     title: str
@@ -196,6 +219,11 @@ class WeeklyStats(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -212,3 +240,10 @@ class AIJournalResponse(BaseModel):
     response: str
     mood_after: Optional[int] = None
     suggestions: Optional[List[str]] = None
+
+
+class AIJobStatus(BaseModel):
+    entry_id: int
+    ai_status: Optional[str] = None
+    ai_response: Optional[str] = None
+    mood_after: Optional[int] = None
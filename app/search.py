@@ -0,0 +1,236 @@
+"""
+Full-text search over journal entries
+
+SQLite indexes entries in the journal_fts FTS5 table. It is an external-content
+table: it stores no copy of the text and reads it (for snippets, and to find
+the tokens to remove when an entry changes) through the journal_fts_source
+view, which decompresses content with the decode_text() SQL function that
+app.database registers on every connection. A connection without that
+function cannot search or change journal entries. Postgres keeps a tsvector
+in journal_entries.search_vector with a GIN index. Both are maintained by the
+ORM events below, so every write through a Session keeps the index in sync,
+and both are created with the journal_entries table (by the migration, or by
+metadata.create_all). Results
+are ranked (bm25 / ts_rank_cd) and paged with an opaque offset cursor: ranks
+are floats that shift as the corpus changes, so they make a poor keyset.
+
+Snippets are HTML-escaped, and only then are the matches wrapped in
+<mark>...</mark>, so they are safe to render as HTML.
+"""
+
+import base64
+import html
+import json
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import DDL, bindparam, event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from app.models import JournalEntry
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+# Private-use characters delimit the matches until the snippet text has been escaped
+_MATCH_START = "\ue000"
+_MATCH_END = "\ue001"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchNotSupported(Exception):
+    """Raised when the database has no full-text index"""
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    """Quote each term so user input can never be parsed as FTS5 syntax; the last term matches as a prefix"""
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def encode_cursor(offset: int) -> str:
+    raw = json.dumps({"offset": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        offset = int(json.loads(raw)["offset"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def highlight(snippet: str) -> str:
+    """Escape the snippet's text, then mark its matches"""
+    return html.escape(snippet or "").replace(_MATCH_START, SNIPPET_START).replace(_MATCH_END, SNIPPET_END)
+
+
+# Index tables, created alongside journal_entries when the schema comes from metadata
+
+event.listen(JournalEntry.__table__, "after_create", DDL(
+    "CREATE VIEW IF NOT EXISTS journal_fts_source AS SELECT id, decode_text(content) AS content FROM journal_entries"
+).execute_if(dialect="sqlite"))
+event.listen(JournalEntry.__table__, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5("
+    "content, content='journal_fts_source', content_rowid='id', tokenize='porter unicode61')"
+).execute_if(dialect="sqlite"))
+event.listen(JournalEntry.__table__, "after_create", DDL(
+    "ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS search_vector tsvector"
+).execute_if(dialect="postgresql"))
+event.listen(JournalEntry.__table__, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_journal_entries_search_vector ON journal_entries USING gin (search_vector)"
+).execute_if(dialect="postgresql"))
+event.listen(JournalEntry.__table__, "after_drop", DDL(
+    "DROP TABLE IF EXISTS journal_fts"
+).execute_if(dialect="sqlite"))
+event.listen(JournalEntry.__table__, "after_drop", DDL(
+    "DROP VIEW IF EXISTS journal_fts_source"
+).execute_if(dialect="sqlite"))
+
+
+# Index maintenance
+#
+# An external-content FTS5 table removes a row's tokens by reading the row's
+# current text from the view, so on SQLite an entry is unindexed *before* its
+# content is changed or deleted, and indexed again afterwards.
+
+def _index_entry(connection: Connection, journal_entry: JournalEntry) -> None:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.execute(
+            text("INSERT INTO journal_fts (rowid, content) VALUES (:id, :content)"),
+            {"id": journal_entry.id, "content": journal_entry.content}
+        )
+    elif dialect == "postgresql":
+        connection.execute(
+            text("UPDATE journal_entries SET search_vector = to_tsvector('english', :content) WHERE id = :id"),
+            {"id": journal_entry.id, "content": journal_entry.content}
+        )
+
+
+def _unindex_entry(connection: Connection, journal_entry: JournalEntry) -> None:
+    # On Postgres the tsvector is replaced, or deleted with the row
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DELETE FROM journal_fts WHERE rowid = :id"), {"id": journal_entry.id})
+
+
+@event.listens_for(JournalEntry, "after_insert")
+def _index_inserted_entry(mapper, connection, journal_entry):
+    _index_entry(connection, journal_entry)
+
+
+@event.listens_for(JournalEntry, "before_update")
+def _unindex_updated_entry(mapper, connection, journal_entry):
+    if get_history(journal_entry, "_content").has_changes():
+        _unindex_entry(connection, journal_entry)
+
+
+@event.listens_for(JournalEntry, "after_update")
+def _index_updated_entry(mapper, connection, journal_entry):
+    if get_history(journal_entry, "_content").has_changes():
+        _index_entry(connection, journal_entry)
+
+
+@event.listens_for(JournalEntry, "before_delete")
+def _unindex_deleted_entry(mapper, connection, journal_entry):
+    _unindex_entry(connection, journal_entry)
+
+
+# Queries
+
+_SQLITE_SEARCH = """
+SELECT e.id, e.date, e.mood_before, e.mood_after, bm25(journal_fts) AS rank
+FROM journal_fts
+JOIN journal_entries e ON e.id = journal_fts.rowid
+WHERE journal_fts MATCH :query AND e.user_id = :user_id
+ORDER BY rank, e.id
+LIMIT :limit OFFSET :offset
+"""
+
+# snippet() decompresses the entry through the content view, so only the page's entries are read
+_SQLITE_SNIPPETS = text("""
+SELECT rowid, snippet(journal_fts, 0, :start, :end, '…', 16)
+FROM journal_fts
+WHERE journal_fts MATCH :query AND rowid IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+# Rank is negated so that, as with bm25, lower sorts first
+_POSTGRES_SEARCH = """
+SELECT id, date, mood_before, mood_after,
+       -ts_rank_cd(search_vector, websearch_to_tsquery('english', :query))::float8 AS rank
+FROM journal_entries
+WHERE user_id = :user_id AND search_vector @@ websearch_to_tsquery('english', :query)
+ORDER BY rank, id
+LIMIT :limit OFFSET :offset
+"""
+
+# Stored content may be compressed, so snippets are highlighted from the decoded text of the page only
+_POSTGRES_HEADLINES = """
+SELECT ts_headline('english', doc, websearch_to_tsquery('english', :query), :options)
+FROM unnest(CAST(:docs AS text[])) WITH ORDINALITY AS docs(doc, position)
+ORDER BY position
+"""
+
+
+def search_entries(
+    db: Session,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of the user's entries matching `query`, best first, and the cursor for the next page"""
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        match = _fts5_query(query)
+        sql = _SQLITE_SEARCH
+    elif dialect == "postgresql":
+        match = query.strip() or None
+        sql = _POSTGRES_SEARCH
+    else:
+        raise SearchNotSupported(f"Full-text search is not available on {dialect}")
+    if match is None:
+        return [], None
+
+    offset = decode_cursor(cursor) if cursor else 0
+    params = {"query": match, "user_id": user_id, "limit": limit + 1, "offset": offset}
+    rows = db.execute(text(sql), params).all()
+    page = rows[:limit]
+
+    if dialect == "postgresql":
+        contents = dict(db.query(JournalEntry.id, JournalEntry.content).filter(
+            JournalEntry.id.in_([row.id for row in page])
+        ).all()) if page else {}
+        snippets = db.execute(text(_POSTGRES_HEADLINES), {
+            "query": match,
+            "docs": [contents.get(row.id, "") for row in page],
+            "options": f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=2, MaxWords=20, MinWords=8",
+        }).scalars().all() if page else []
+    else:
+        found = dict(db.execute(_SQLITE_SNIPPETS, {
+            "query": match, "ids": [row.id for row in page], "start": _MATCH_START, "end": _MATCH_END
+        }).all()) if page else {}
+        snippets = [found.get(row.id, "") for row in page]
+
+    results = [
+        {
+            "id": row.id,
+            "date": row.date,
+            "mood_before": row.mood_before,
+            "mood_after": row.mood_after,
+            "snippet": highlight(snippet),
+            "score": -row.rank,
+        }
+        for row, snippet in zip(page, snippets)
+    ]
+    next_cursor = encode_cursor(offset + limit) if len(rows) > limit else None
+    return results, next_cursor
@@ -0,0 +1,32 @@
+"""
+Fast JSON serialization for list endpoints
+
+List routes query only the columns of their response schema and serialize the
+result rows straight to JSON with orjson, skipping ORM instances, pydantic
+validation and jsonable_encoder. The routes keep their response_model, which
+still documents the response in OpenAPI, and their output is the same JSON the
+schema would have produced. Compare the paths with:
+python benchmarks/serialization_bench.py
+"""
+
+from typing import List, Type
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+
+def schema_columns(model, schema: Type[BaseModel]) -> List:
+    """The model's column for each field of `schema`, labelled with the field name, in field order"""
+    return [getattr(model, name).label(name) for name in schema.__fields__]
+
+
+def rows_to_dicts(rows) -> List[dict]:
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def list_response(query: Query) -> ORJSONResponse:
+    """Respond with the rows of a schema_columns query as a JSON list"""
+    return ORJSONResponse(rows_to_dicts(query.all()))
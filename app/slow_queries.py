@@ -0,0 +1,239 @@
+"""
+Slow-query log
+
+Statements taking at least SLOW_QUERY_THRESHOLD_MS are written as JSON lines
+to SLOW_QUERY_LOG_PATH: statement text, the shape of its bound parameters
+(types, never values), duration and the request that ran it. With
+SLOW_QUERY_EXPLAIN the plan of a slow SELECT is captured too (EXPLAIN on
+Postgres, EXPLAIN QUERY PLAN on SQLite), at most once per statement shape per
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS. Plans and file writes happen on a
+background thread, so the request that ran the slow statement never waits for
+them. The file rotates at SLOW_QUERY_LOG_MAX_BYTES; every server worker
+appends to the same file under a lock.
+
+    python -m app.slow_queries summary   # slowest statement shapes in the log
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.database import current_query_stats, statement_shape
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development server, nothing to coordinate with
+    fcntl = None
+
+# Statements sent to capture their plan are not themselves logged
+_SKIP_OPTION = "slow_query_log"
+
+# Plans waiting beyond this are not captured (the record is still written)
+_MAX_PENDING_PLANS = 100
+
+
+class _SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler safe for several processes appending to one file.
+
+    Each write holds an flock on a sidecar lock file; the size check uses the
+    file on disk, and a stream whose file another process rotated is reopened.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self._lock_path = self.baseFilename + ".lock"
+
+    def emit(self, record) -> None:
+        if fcntl is None:
+            super().emit(record)
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reopen_if_rotated()
+                super().emit(record)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def shouldRollover(self, record) -> bool:
+        try:
+            return self.maxBytes > 0 and os.path.getsize(self.baseFilename) >= self.maxBytes
+        except OSError:
+            return False
+
+    def _reopen_if_rotated(self) -> None:
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except OSError:
+            current = None
+        if current != os.fstat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = None
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Types of the bound parameters (values can hold journal text, so they are never logged)"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        engine: Engine,
+        path: str,
+        threshold_ms: float,
+        explain: bool = True,
+        explain_interval: float = 3600.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5
+    ):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self._explained_at = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-log")
+        self._logger = logging.getLogger(f"{__name__}.file")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._handler = _SharedRotatingFileHandler(path, max_bytes, backup_count)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(self._handler)
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def close(self) -> None:
+        """Stop logging, finishing the records already queued"""
+        event.remove(self.engine, "before_cursor_execute", self._before_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_execute)
+        self._executor.shutdown(wait=True)
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+    def _before_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def _after_execute(self, connection, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        if seconds < self.threshold or context.execution_options.get(_SKIP_OPTION) is False:
+            return
+        stats = current_query_stats()
+        record = {
+            "at": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "duration_ms": round(seconds * 1000, 2),
+            "route": stats.label if stats is not None else None,
+            "statement": statement,
+            "params": parameter_shape(parameters, executemany),
+            "pid": os.getpid(),
+        }
+        explain_parameters = parameters if not executemany and self._should_explain(statement) else None
+        self._executor.submit(self._write, record, statement, explain_parameters)
+
+    def _should_explain(self, statement: str) -> bool:
+        if not self.explain or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        shape = statement_shape(statement)
+        now = time.monotonic()
+        with self._lock:
+            if self._pending >= _MAX_PENDING_PLANS:
+                return False
+            explained_at = self._explained_at.get(shape)
+            if explained_at is not None and now - explained_at < self.explain_interval:
+                return False
+            self._explained_at[shape] = now
+            self._pending += 1
+        return True
+
+    def _write(self, record: dict, statement: str, explain_parameters) -> None:
+        if explain_parameters is not None:
+            try:
+                record["plan"] = self._plan(statement, explain_parameters)
+            except Exception as e:
+                record["plan_error"] = repr(e)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+        self._logger.info(json.dumps(record, default=str))
+
+    def _plan(self, statement: str, parameters):
+        prefix = "EXPLAIN QUERY PLAN " if self.engine.dialect.name == "sqlite" else "EXPLAIN "
+        with self.engine.connect().execution_options(**{_SKIP_OPTION: False}) as connection:
+            rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+        if self.engine.dialect.name == "sqlite":
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+
+slow_query_log: Optional[SlowQueryLog] = None
+
+
+def install(engine: Engine) -> Optional[SlowQueryLog]:
+    """Start logging slow statements on `engine` when SLOW_QUERY_THRESHOLD_MS is set"""
+    global slow_query_log
+    if slow_query_log is None and settings.slow_query_threshold_ms > 0:
+        slow_query_log = SlowQueryLog(
+            engine,
+            settings.slow_query_log_path,
+            settings.slow_query_threshold_ms,
+            explain=settings.slow_query_explain,
+            explain_interval=settings.slow_query_explain_interval_seconds,
+            max_bytes=settings.slow_query_log_max_bytes,
+            backup_count=settings.slow_query_log_backups
+        )
+    return slow_query_log
+
+
+def summarize(path: str, top: int) -> None:
+    totals = defaultdict(lambda: [0, 0.0, 0.0, None])
+    with open(path, encoding="utf-8") as log_file:
+        for line in log_file:
+            record = json.loads(line)
+            total = totals[statement_shape(record["statement"])]
+            total[0] += 1
+            total[1] += record["duration_ms"]
+            total[2] = max(total[2], record["duration_ms"])
+            total[3] = record.get("plan") or total[3]
+    ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    for shape, (count, total_ms, max_ms, plan) in ranked:
+        print(f"{count:6d}x  total {total_ms:10.1f}ms  max {max_ms:8.1f}ms  {' '.join(shape.split())[:160]}")
+        for step in plan or []:
+            print(f"{'':10}{step}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the slow-query log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    summary = subcommands.add_parser("summary", help="Statement shapes by total time spent")
+    summary.add_argument("--path", default=settings.slow_query_log_path)
+    summary.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    summarize(args.path, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Background worker for AI journal responses
+
+Run with: python -m app.worker [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AIJob, JournalEntry
+from app.ai_service import ai_journal_service, AIOverloadedError
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.compression import load_dictionaries
+from app.jobs import claim_ai_jobs, requeue_expired_jobs, is_superseded
+from app.journal_ai import generate_for_entry, apply_ai_response
+
+logger = logging.getLogger("app.worker")
+
+
+async def process_job(job_id: int) -> None:
+    """Generate and store the AI response for one claimed job"""
+    db = SessionLocal()
+    try:
+        job = db.get(AIJob, job_id)
+        journal_entry = db.get(JournalEntry, job.journal_entry_id) if job else None
+        if journal_entry is None:
+            if job:
+                job.status = "done"
+                db.commit()
+            return
+
+        try:
+            ai_response = await generate_for_entry(
+                db, journal_entry, fallback_on_error=False, use_cache=not job.bypass_cache
+            )
+        except Exception as e:
+            db.rollback()
+            job = db.get(AIJob, job_id)
+            job.last_error = repr(e)[:1000]
+            if isinstance(e, (CircuitOpenError, AIOverloadedError)):
+                # Never reached OpenAI, so this does not count as an attempt
+                job.attempts -= 1
+            if job.attempts >= settings.ai_job_max_attempts:
+                logger.warning("AI job %s failed permanently: %r", job_id, e)
+                job.status = "failed"
+                journal_entry = db.get(JournalEntry, job.journal_entry_id)
+                if journal_entry is not None and not is_superseded(db, job):
+                    # A hybrid entry keeps its local response; only an unanswered entry gets the fallback
+                    if journal_entry.ai_response is None:
+                        apply_ai_response(journal_entry, ai_journal_service.fallback_response(journal_entry.mood_before))
+                    journal_entry.ai_status = "failed"
+            else:
+                logger.info("AI job %s failed (attempt %s), requeueing: %r", job_id, job.attempts, e)
+                job.status = "pending"
+                job.locked_by = None
+                job.locked_at = None
+            db.commit()
+            return
+
+        if is_superseded(db, job):
+            # The entry was edited again while we worked; the newer job owns the result
+            db.rollback()
+            job = db.get(AIJob, job_id)
+        job.status = "done"
+        job.last_error = None
+        db.commit()
+        logger.debug("AI job %s done (mood_after=%s)", job_id, ai_response.mood_after)
+    finally:
+        db.close()
+
+
+async def run_worker(concurrency: int, poll_seconds: float, once: bool = False) -> None:
+    """Claim and process jobs, keeping up to `concurrency` completions in flight"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    in_flight = set()
+    logger.info("AI worker %s started (concurrency=%s)", worker_id, concurrency)
+
+    while True:
+        free_slots = concurrency - len(in_flight)
+        # While the OpenAI circuit is open, leave jobs queued instead of failing them
+        if free_slots > 0 and ai_journal_service.breaker.state != CircuitBreaker.OPEN:
+            db = SessionLocal()
+            try:
+                requeue_expired_jobs(db)
+                job_ids = claim_ai_jobs(db, worker_id, free_slots)
+            finally:
+                db.close()
+            for job_id in job_ids:
+                in_flight.add(asyncio.create_task(process_job(job_id)))
+
+        if not in_flight:
+            if once:
+                return
+            await asyncio.sleep(poll_seconds)
+            continue
+
+        done, _ = await asyncio.wait(in_flight, timeout=poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            in_flight.discard(task)
+            if task.exception() is not None:
+                logger.error("AI job task crashed: %r", task.exception())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued AI journal responses")
+    parser.add_argument("--concurrency", type=int, default=settings.ai_worker_concurrency,
+                        help="completions processed concurrently by this worker")
+    parser.add_argument("--poll-interval", type=float, default=settings.ai_worker_poll_seconds,
+                        help="seconds to wait between polls when the queue is empty")
+    parser.add_argument("--once", action="store_true", help="exit once the queue is drained")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    load_dictionaries()
+    asyncio.run(run_worker(args.concurrency, args.poll_interval, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Serialization benchmark for list endpoints
+
+Compares, for lists of N rows (default 10,000):
+  orm+json     ORM objects through response_model and jsonable_encoder, rendered with json (the old path)
+  orm+orjson   the same, rendered with orjson (ORJSONResponse as the default response class)
+  rows+orjson  column tuples serialized directly (app.serialization.list_response)
+
+Runs against an in-memory SQLite database and checks every path produces the same JSON.
+
+Usage: python benchmarks/serialization_bench.py [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models import Habit, HabitCheckIn, MoodEntry, User
+from app.schemas import HabitCheckIn as HabitCheckInSchema, MoodEntry as MoodEntrySchema
+from app.serialization import list_response, schema_columns
+
+
+def seed(db, rows: int) -> int:
+    user = User(email="bench@example.com", hashed_password="x", full_name="Bench")
+    db.add(user)
+    db.flush()
+    habits = [Habit(user_id=user.id, name=f"Habit {i}", category="health") for i in range(10)]
+    db.add_all(habits)
+    db.flush()
+    start = date(2020, 1, 1)
+    db.bulk_insert_mappings(HabitCheckIn, [
+        {
+            "user_id": user.id,
+            "habit_id": habits[i % len(habits)].id,
+            "date": start + timedelta(days=i // len(habits)),
+            "completed": random.random() < 0.7,
+            "notes": "Felt good after" if i % 3 == 0 else None,
+        }
+        for i in range(rows)
+    ])
+    db.bulk_insert_mappings(MoodEntry, [
+        {
+            "user_id": user.id,
+            "date": start + timedelta(days=i),
+            "mood_score": random.randint(1, 10),
+            "energy_level": random.randint(1, 10),
+            "stress_level": random.randint(1, 10) if i % 4 else None,
+            "notes": "Long day at work" if i % 5 == 0 else None,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return user.id
+
+
+def time_it(fn, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def bench(db, model, schema, order_by, user_id: int, repeat: int) -> None:
+    field = create_response_field(name=f"Response_{schema.__name__}", type_=List[schema])
+
+    def orm_objects():
+        db.expunge_all()
+        return db.query(model).filter(model.user_id == user_id).order_by(order_by).all()
+
+    def through_response_model(response_class):
+        content = asyncio.run(serialize_response(field=field, response_content=orm_objects()))
+        return response_class(content).body
+
+    def fast_path():
+        query = db.query(*schema_columns(model, schema)).filter(model.user_id == user_id).order_by(order_by)
+        return list_response(query).body
+
+    results = {}
+    for name, fn in [
+        ("orm+json", lambda: through_response_model(JSONResponse)),
+        ("orm+orjson", lambda: through_response_model(ORJSONResponse)),
+        ("rows+orjson", fast_path),
+    ]:
+        results[name] = time_it(fn, repeat)
+
+    bodies = {name: json.loads(body) for name, (_, body) in results.items()}
+    assert bodies["orm+json"] == bodies["orm+orjson"] == bodies["rows+orjson"], "serialized output differs"
+
+    rows = len(bodies["orm+json"])
+    baseline = results["orm+json"][0]
+    print(f"{schema.__name__} ({rows} rows)")
+    for name, (seconds, body) in results.items():
+        print(f"  {name:<12} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x  {len(body) / 1024:7.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of list endpoints")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user_id = seed(db, args.rows)
+
+    bench(db, HabitCheckIn, HabitCheckInSchema, HabitCheckIn.date.desc(), user_id, args.repeat)
+    bench(db, MoodEntry, MoodEntrySchema, MoodEntry.date.desc(), user_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
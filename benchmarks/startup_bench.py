@@ -0,0 +1,100 @@
+"""
+Cold start benchmark: import time of app.main and time to first response
+
+Each sample runs in a fresh interpreter:
+  import          python -c "import app.main"
+  first response  spawn uvicorn, poll GET /health until it answers
+
+Exits non-zero when a median exceeds its budget, so it can gate CI.
+
+Usage: python benchmarks/startup_bench.py [--runs 5] [--import-budget 1.2] [--first-response-budget 2.5]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(env: dict, timeout: float = 30.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start time against a budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.2, help="seconds for import app.main (median)")
+    parser.add_argument("--first-response-budget", type=float, default=2.5,
+                        help="seconds from process start to the first /health response (median)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///./startup_bench.db")
+    # Warm the bytecode cache so every run measures the same thing
+    measure_import(env)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    first_responses = [measure_first_response(env) for _ in range(args.runs)]
+
+    failed = False
+    for name, samples, budget in [
+        ("import app.main", imports, args.import_budget),
+        ("first response", first_responses, args.first_response_budget),
+    ]:
+        median = statistics.median(samples)
+        verdict = "ok" if median <= budget else "OVER BUDGET"
+        failed |= median > budget
+        print(f"{name:<16} median {median * 1000:7.0f} ms  max {max(samples) * 1000:7.0f} ms  "
+              f"budget {budget * 1000:.0f} ms  {verdict}")
+
+    if "openai" in subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print(' '.join(sys.modules))"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    ).stdout.split():
+        print("openai is imported at startup; it should load on first use")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
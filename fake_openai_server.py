@@ -0,0 +1,231 @@
+"""
+Local fake of the OpenAI chat completions API for offline load testing
+
+Start the server:
+    python fake_openai_server.py serve --port 8099 --latency-ms 800 --error-rate 0.05
+
+Point the app at it:
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python run.py
+
+Or drive AIJournalService against it directly and report throughput:
+    python fake_openai_server.py load --requests 500 --concurrency 50
+
+Behaviour can be changed while it runs (e.g. to watch the circuit breaker trip):
+    curl -X POST localhost:8099/fake/config -H 'Content-Type: application/json' -d '{"error_rate": 1}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CONFIG = {
+    "latency_ms": float(os.getenv("FAKE_OPENAI_LATENCY_MS", "500")),
+    "jitter_ms": float(os.getenv("FAKE_OPENAI_JITTER_MS", "200")),
+    "error_rate": float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_OPENAI_RATE_LIMIT_RATE", "0")),
+    "hang_rate": float(os.getenv("FAKE_OPENAI_HANG_RATE", "0")),
+    "tokens_per_second": float(os.getenv("FAKE_OPENAI_TOKENS_PER_SECOND", "50")),
+    "response_words": int(os.getenv("FAKE_OPENAI_RESPONSE_WORDS", "120")),
+}
+
+WORDS = (
+    "it sounds like today asked a lot of you and you still made space to reflect "
+    "on how you feel which matters more than it may seem right now what stood out most"
+).split()
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def _response_text() -> str:
+    count = max(1, CONFIG["response_words"])
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(count))
+    return text[0].upper() + text[1:] + "?"
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _error(status_code: int, message: str, error_type: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}}
+    )
+
+
+async def _injected_failure() -> Optional[JSONResponse]:
+    """Wait the simulated latency and return an error response if one was drawn"""
+    roll = random.random()
+    if roll < CONFIG["hang_rate"]:
+        # Longer than any sane client timeout
+        await asyncio.sleep(3600)
+    delay = max(0.0, CONFIG["latency_ms"] + random.uniform(-1, 1) * CONFIG["jitter_ms"]) / 1000
+    await asyncio.sleep(delay)
+    roll = random.random()
+    if roll < CONFIG["error_rate"]:
+        return _error(500, "The server had an error while processing your request.", "server_error")
+    if roll < CONFIG["error_rate"] + CONFIG["rate_limit_rate"]:
+        return _error(429, "Rate limit reached for requests", "requests")
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake-model")
+    prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    failure = await _injected_failure()
+    if failure is not None:
+        return failure
+
+    text = _response_text()
+    words = text.split(" ")
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(prompt_tokens, len(words)),
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    def chunk(delta: dict, finish_reason: Optional[str] = None, usage: Optional[dict] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        token_delay = 1 / CONFIG["tokens_per_second"] if CONFIG["tokens_per_second"] > 0 else 0
+        yield chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            await asyncio.sleep(token_delay)
+            yield chunk({"content": word if i == 0 else " " + word})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage=_usage(prompt_tokens, len(words)))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "fake"}]}
+
+
+@app.get("/fake/config")
+async def get_config():
+    return CONFIG
+
+
+@app.post("/fake/config")
+async def update_config(request: Request):
+    updates = await request.json()
+    for key, value in updates.items():
+        if key in CONFIG:
+            CONFIG[key] = type(CONFIG[key])(value)
+    return CONFIG
+
+
+async def run_load(requests: int, concurrency: int, stream: bool) -> None:
+    """Send `requests` journal responses through AIJournalService and report throughput"""
+    from app.ai_service import ai_journal_service
+
+    latencies = []
+    outcomes = {"ok": 0, "fallback": 0}
+    fallback_text = ai_journal_service.fallback_response().response
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def one(i: int) -> None:
+        content = f"Load test entry {i}: work was busy but I went for a walk and felt a bit better."
+        started = time.perf_counter()
+        if stream:
+            result = None
+            async for item in ai_journal_service.stream_journal_response(content, mood_before=5):
+                result = item
+        else:
+            result = await ai_journal_service.generate_journal_response(content, mood_before=5)
+        latencies.append(time.perf_counter() - started)
+        outcomes["fallback" if result.response == fallback_text else "ok"] += 1
+
+    async def worker() -> None:
+        while not queue.empty():
+            await one(queue.get_nowait())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{requests} requests in {elapsed:.1f}s ({requests / elapsed:.1f} req/s), concurrency {concurrency}")
+    print(f"ok={outcomes['ok']} fallback={outcomes['fallback']}  p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms")
+    print(f"circuit breaker: {ai_journal_service.breaker.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="run the fake server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8099)
+    for key, value in CONFIG.items():
+        serve.add_argument("--" + key.replace("_", "-"), type=type(value), default=value)
+
+    load = subparsers.add_parser("load", help="load test AIJournalService against a running fake server")
+    load.add_argument("--base-url", default="http://127.0.0.1:8099/v1")
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=20)
+    load.add_argument("--stream", action="store_true", help="use the streaming completion path")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        import uvicorn
+
+        for key in CONFIG:
+            CONFIG[key] = getattr(args, key)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    else:
+        # Settings are read at import time, so configure them before importing the app
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ["AI_CACHE_ENABLED"] = "False"
+        asyncio.run(run_load(args.requests, args.concurrency, args.stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,114 @@
+"""
+Production launcher: gunicorn with uvicorn workers, configured from Settings
+
+    python start_production.py
+
+Worker count, preload, max-requests recycling, keep-alive and graceful
+shutdown come from the WEB_* settings (see env.example). With DEBUG=True it
+runs uvicorn with auto-reload instead.
+"""
+
 import os
+import shutil
+import sys
+import tempfile
 import uvicorn
-import multiprocessing
+from app.config import settings
+
+
+def pool_budget_error(workers: int) -> str:
+    """Why `workers` processes would exhaust the database's connections, or "" if they fit"""
+    if "sqlite" in settings.database_url:
+        return ""
+    per_worker = settings.db_pool_size + settings.db_max_overflow
+    needed = workers * per_worker
+    if needed > settings.db_max_connections:
+        return (
+            f"{workers} workers x {per_worker} pooled connections (DB_POOL_SIZE + DB_MAX_OVERFLOW) = {needed}, "
+            f"more than DB_MAX_CONNECTIONS={settings.db_max_connections}; lower WEB_CONCURRENCY or the pool size"
+        )
+    return ""
+
+
+def gunicorn_options() -> dict:
+    return {
+        "bind": f"0.0.0.0:{settings.port}",
+        "workers": settings.web_concurrency,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": settings.web_preload,
+        "max_requests": settings.web_max_requests,
+        "max_requests_jitter": settings.web_max_requests_jitter,
+        "keepalive": settings.web_keepalive,
+        "timeout": settings.web_timeout,
+        "graceful_timeout": settings.web_graceful_timeout,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+def post_fork(server, worker):
+    # With preload the master imported the app and may have opened connections; a forked
+    # worker must not reuse the parent's sockets, so it starts from an empty pool
+    from app.database import engine
+
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests, pool connections) from /metrics
+    if settings.metrics_enabled:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def prepare_metrics_dir() -> str:
+    """Point the workers at an empty shared directory for their metric files"""
+    path = settings.prometheus_multiproc_dir or os.path.join(tempfile.gettempdir(), "wellness_metrics")
+    # Files left by a previous run would be added to this run's counters
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    if settings.metrics_enabled:
+        # Before the app (and prometheus_client) is imported, which preload does in this process
+        prepare_metrics_dir()
+    ProductionServer(gunicorn_options()).run()
 
-# Get environment variables
-PORT = int(os.getenv("PORT", 8000))
-WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2))
-DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
 if __name__ == "__main__":
-    if DEBUG:
+    if settings.debug:
         # For local development with auto-reloading
         uvicorn.run(
             "app.main:app",
             host="0.0.0.0",
-            port=PORT,
+            port=settings.port,
             reload=True,
             log_level="info"
         )
     else:
-        # For production with Gunicorn
-        os.system(f"gunicorn app.main:app --workers {WEB_CONCURRENCY} --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:{PORT}")
\ No newline at end of file
+        error = pool_budget_error(settings.web_concurrency)
+        if error:
+            sys.exit(f"Refusing to start: {error}")
+        run_gunicorn()
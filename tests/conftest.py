@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway database first
+_tmp_dir = tempfile.mkdtemp(prefix="wellness-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/test.db"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+os.environ["AI_JOB_QUEUE"] = "False"
+os.environ["AI_CACHE_PERSISTENT"] = "False"
+os.environ["SLOW_QUERY_THRESHOLD_MS"] = "0"
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created schema"""
+    import app.models  # noqa: F401  (registers the tables)
+    import app.search  # noqa: F401  (creates the full-text index with them)
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    from app.auth import get_password_hash
+    from app.models import User
+
+    user = User(email="tester@example.com", hashed_password=get_password_hash("secret-password"), full_name="Tester")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    from app.auth import create_user_access_token
+
+    return {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
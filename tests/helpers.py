@@ -0,0 +1,11 @@
+from contextlib import contextmanager
+from app.database import capture_queries
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail unless the block executes at most `limit` statements (from any thread, e.g. a TestClient request)"""
+    with capture_queries() as stats:
+        yield stats
+    shapes = "\n".join(f"  {count}x {shape}" for shape, count in stats.shapes.most_common())
+    assert stats.count <= limit, f"{stats.count} statements executed, expected at most {limit}:\n{shapes}"
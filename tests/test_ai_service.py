@@ -0,0 +1,312 @@
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.ai_service import AIEmptyResponseError, AIJournalService, AIOverloadedError
+from app.circuit_breaker import CircuitBreaker
+from app.config import settings
+
+
+def test_importing_the_app_does_not_import_openai():
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print('openai' in sys.modules)"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().endswith("False")
+
+
+def test_client_is_created_on_first_use(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    service = AIJournalService()
+    assert service._client is None
+    assert service.configured
+    assert service.client is not None
+    assert service.client is service.client
+
+
+def test_unconfigured_service_has_no_client(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    service = AIJournalService()
+    assert not service.configured
+    assert service.client is None
+
+
+def test_unreachable_openai_serves_the_fallback(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_base_url", "http://127.0.0.1:9/v1")
+    monkeypatch.setattr(settings, "openai_max_retries", 0)
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    service = AIJournalService()
+
+    result = asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5))
+    assert result.response == service.fallback_response(5).response
+    assert service.breaker.stats()["window_failures"] == 1
+
+
+def test_cache_stats_are_not_exposed_to_users():
+    from app.main import app
+
+    assert "/journal/stats/ai-cache" not in {route.path for route in app.routes}
+
+
+def test_cache_hits_count_saved_tokens():
+    from prometheus_client import REGISTRY
+    from app.ai_service import AIResponseCache
+
+    before = REGISTRY.get_sample_value("ai_cache_saved_tokens_total") or 0
+    cache = AIResponseCache(max_entries=4, persistent=False)
+    cache.set("key", "response", 120)
+    cache.get("key")
+    assert REGISTRY.get_sample_value("ai_cache_saved_tokens_total") == before + 120
+
+
+def test_persistent_cache_is_shared_between_instances(db):
+    from app.ai_service import AIResponseCache
+
+    AIResponseCache(max_entries=4, persistent=True).set("key", "response", 120)
+    assert AIResponseCache(max_entries=4, persistent=True).get("key") == "response"
+
+
+class _FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.rolled_back = False
+
+    def merge(self, instance):
+        return instance
+
+    def commit(self):
+        raise self.error
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("error, logged", [
+    (IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed")), False),
+    (OperationalError("INSERT", {}, Exception("no such table: ai_response_cache")), True),
+])
+def test_cache_store_failures_roll_back_and_only_real_errors_are_logged(monkeypatch, caplog, error, logged):
+    from app import ai_service
+    from app.ai_service import AIResponseCache
+
+    session = _FailingSession(error)
+    monkeypatch.setattr(ai_service, "SessionLocal", lambda: session)
+    cache = AIResponseCache(max_entries=4, persistent=True)
+    with caplog.at_level(logging.WARNING, logger="app.ai_service"):
+        cache.set("key", "response", 120)
+
+    assert session.rolled_back
+    assert any("Could not store" in record.getMessage() for record in caplog.records) == logged
+    # The in-memory tier still has it
+    assert cache._entries["key"] == ("response", 120)
+
+
+class _FakeCompletions:
+    def __init__(self, response):
+        self.response = response
+
+    async def create(self, **kwargs):
+        return self.response
+
+
+def _service_returning(monkeypatch, response) -> AIJournalService:
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    service = AIJournalService()
+    service._client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(response)))
+    return service
+
+
+@pytest.mark.parametrize("choices", [
+    [],
+    [SimpleNamespace(message=SimpleNamespace(content=None), finish_reason="content_filter")],
+    [SimpleNamespace(message=SimpleNamespace(content="  \n"), finish_reason="stop")],
+])
+def test_empty_completion_serves_the_fallback(monkeypatch, choices):
+    service = _service_returning(monkeypatch, SimpleNamespace(choices=choices, usage=None))
+
+    result = asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5))
+    assert result.response == service.fallback_response(5).response
+
+    with pytest.raises(AIEmptyResponseError):
+        asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5, fallback_on_error=False))
+
+
+def test_completion_text_is_stripped(monkeypatch):
+    choice = SimpleNamespace(message=SimpleNamespace(content="  Thank you for sharing.\n"), finish_reason="stop")
+    service = _service_returning(monkeypatch, SimpleNamespace(choices=[choice], usage=None))
+
+    result = asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5))
+    assert result.response == "Thank you for sharing."
+
+
+def _reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+                           usage=None)
+
+
+class _FlakyCompletions:
+    """Times out `failures` times, then answers"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise asyncio.TimeoutError()
+        return _reply("Thank you for sharing.")
+
+
+def _flaky_service(monkeypatch, failures, max_retries=2):
+    monkeypatch.setattr(settings, "openai_max_retries", max_retries)
+    monkeypatch.setattr(settings, "openai_retry_base_seconds", 0)
+    service = _service_returning(monkeypatch, None)
+    service.breaker = CircuitBreaker("test", min_calls=100)
+    completions = _FlakyCompletions(failures)
+    service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def test_retryable_errors_are_retried_until_the_completion_succeeds(monkeypatch):
+    service, completions = _flaky_service(monkeypatch, failures=2)
+
+    result = asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5, fallback_on_error=False))
+    assert result.response == "Thank you for sharing."
+    assert completions.calls == 3
+    assert service._waiting == 0
+
+
+def test_retries_stop_at_the_cap(monkeypatch):
+    service, completions = _flaky_service(monkeypatch, failures=10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5, fallback_on_error=False))
+    assert completions.calls == 3
+
+    result = asyncio.run(service.generate_journal_response("A quiet day.", mood_before=5))
+    assert result.response == service.fallback_response(5).response
+    assert completions.calls == 6
+    assert service._waiting == 0
+
+
+class _BlockingCompletions:
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def create(self, **kwargs):
+        self.started.set()
+        await self.release.wait()
+        return _reply("Thank you for waiting.")
+
+
+def test_calls_beyond_the_concurrency_cap_and_queue_are_shed(monkeypatch):
+    monkeypatch.setattr(settings, "openai_max_concurrency", 1)
+    monkeypatch.setattr(settings, "openai_max_queued", 0)
+    service = _service_returning(monkeypatch, None)
+
+    async def run():
+        completions = _BlockingCompletions()
+        service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        first = asyncio.ensure_future(service.generate_journal_response("First.", fallback_on_error=False))
+        await completions.started.wait()
+
+        with pytest.raises(AIOverloadedError):
+            await service.generate_journal_response("Second.", fallback_on_error=False)
+        shed = await service.generate_journal_response("Second.", mood_before=5)
+        assert shed.response == service.fallback_response(5).response
+
+        completions.release.set()
+        return await first
+
+    assert asyncio.run(run()).response == "Thank you for waiting."
+    assert service._waiting == 0
+
+
+class _FakeStream:
+    def __init__(self, deltas):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+            for delta in deltas
+        ] + [SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=42))]
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeStreamingCompletions:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.streams = []
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"]
+        self.streams.append(_FakeStream(self.deltas))
+        return self.streams[-1]
+
+
+def _streaming_service(monkeypatch, service, deltas) -> _FakeStreamingCompletions:
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    completions = _FakeStreamingCompletions(deltas)
+    monkeypatch.setattr(service, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+
+
+def test_abandoned_stream_closes_the_upstream_response(monkeypatch):
+    service = AIJournalService()
+    completions = _streaming_service(monkeypatch, service, ["Thank ", "you ", "for sharing."])
+
+    async def read_one_delta():
+        items = service.stream_journal_response("A quiet day.", mood_before=5)
+        first = await items.__anext__()
+        await items.aclose()  # what the response does when the client disconnects
+        # Closed right away, not when the event loop finalizes leftover generators
+        return first, completions.streams[0].closed
+
+    assert asyncio.run(read_one_delta()) == ("Thank ", True)
+
+
+def test_stream_endpoint_sends_tokens_then_saves_the_response(client, auth_headers, db, user, monkeypatch):
+    from datetime import date
+    from app.ai_service import ai_journal_service
+    from app.models import JournalEntry
+
+    completions = _streaming_service(monkeypatch, ai_journal_service, ["Thank ", "you ", "for sharing."])
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="A long week, finally resting.", mood_before=4)
+    db.add(entry)
+    db.commit()
+
+    response = client.post(f"/journal/{entry.id}/regenerate-ai/stream", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n", 1) for block in response.text.strip().split("\n\n")]
+    names = [name for name, _ in events]
+    assert names == ["event: token"] * 3 + ["event: done"]
+    assert [json.loads(data[len("data: "):])["delta"] for _, data in events[:3]] == ["Thank ", "you ", "for sharing."]
+    assert json.loads(events[-1][1][len("data: "):])["response"] == "Thank you for sharing."
+    assert completions.streams[0].closed
+
+    db.expire_all()
+    assert entry.ai_response == "Thank you for sharing."
+    assert entry.ai_status == "complete"
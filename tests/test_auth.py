@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from passlib.context import CryptContext
+
+from app import auth
+from app.auth import AuthenticatedUser, create_refresh_token, revoke_user_tokens, user_from_claims
+from app.config import settings
+from app.models import User
+from tests.helpers import assert_max_queries
+
+
+@pytest.fixture(autouse=True)
+def empty_version_cache(monkeypatch):
+    monkeypatch.setattr(auth, "_token_versions", {})
+
+
+def _claims(user, version=0):
+    return {"sub": user.email, "uid": user.id, "ver": version, "act": True}
+
+
+def test_confirmed_token_version_skips_the_database(db, user):
+    db.expunge_all()
+    with assert_max_queries(1):
+        assert isinstance(user_from_claims(_claims(user), db), User)
+    with assert_max_queries(0):
+        cached = user_from_claims(_claims(user), db)
+    assert isinstance(cached, AuthenticatedUser)
+    assert (cached.id, cached.email, cached.is_active) == (user.id, user.email, True)
+
+
+def test_expired_confirmation_reads_the_database_again(db, user, monkeypatch):
+    monkeypatch.setattr(settings, "auth_version_cache_seconds", 0)
+    user_from_claims(_claims(user), db)
+    db.expunge_all()
+    with assert_max_queries(1) as stats:
+        assert user_from_claims(_claims(user), db) is not None
+    assert stats.count == 1
+
+
+def test_revoking_tokens_rejects_the_old_version(db, user):
+    assert user_from_claims(_claims(user), db) is not None
+    revoke_user_tokens(db, user)
+    db.commit()
+
+    assert user_from_claims(_claims(user, version=0), db) is None
+    assert user_from_claims(_claims(user, version=1), db) is not None
+
+
+def test_unknown_user_is_rejected(db):
+    assert user_from_claims({"sub": "nobody@example.com", "uid": 999, "ver": 0}, db) is None
+    assert user_from_claims({"sub": "nobody@example.com", "uid": "not-an-id"}, db) is None
+
+
+def test_stateless_tokens_authorize_without_loading_the_user(client, db, user, monkeypatch):
+    monkeypatch.setattr(settings, "stateless_auth_tokens", True)
+    headers = {"Authorization": f"Bearer {auth.create_user_access_token(user)}"}
+    assert client.get("/habits/", headers=headers).status_code == 200
+
+    with assert_max_queries(1):  # the habits themselves
+        assert client.get("/habits/", headers=headers).status_code == 200
+
+
+def test_refresh_tokens_rotate_and_a_replay_revokes_the_session(client, db, user):
+    refresh_token = create_refresh_token(user)
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    rotated = response.json()["refresh_token"]
+
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+    # The replay bumped the token version, so the rotated token is no longer valid either
+    assert client.post("/auth/refresh", json={"refresh_token": rotated}).status_code == 401
+
+
+def test_logout_revokes_the_refresh_token(client, db, user):
+    refresh_token = create_refresh_token(user)
+    assert client.post("/auth/logout", json={"refresh_token": refresh_token}).status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+
+def test_password_hashing_runs_off_the_event_loop_behind_the_semaphore(monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_concurrency", 1)
+    monkeypatch.setattr(auth, "_hash_semaphore", None)
+    running = []
+    peak = []
+    threads = set()
+
+    def slow_verify(plain, hashed):
+        threads.add(threading.current_thread().name)
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.1)
+        running.pop()
+        return plain == hashed
+
+    monkeypatch.setattr(auth, "verify_password", slow_verify)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(auth.verify_password_async("pw", "pw") for _ in range(3)))
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert ticks >= 10  # the loop kept running during ~0.3s of hashing
+    assert max(peak) == 1  # PASSWORD_HASH_CONCURRENCY, although the pool has more workers
+    assert all(name.startswith("password-hash") for name in threads)
+
+
+def test_login_rehashes_a_hash_of_an_older_cost(db, user):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret-password")
+    user.hashed_password = old_hash
+    db.commit()
+    assert auth.pwd_context.needs_update(old_hash)
+
+    assert asyncio.run(auth.authenticate_user(db, user.email, "secret-password")) is not None
+    db.refresh(user)
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
+    assert not auth.pwd_context.needs_update(user.hashed_password)
+    assert auth.verify_password("secret-password", user.hashed_password)
+
+    # An up-to-date hash is left alone
+    current_hash = user.hashed_password
+    asyncio.run(auth.authenticate_user(db, user.email, "secret-password"))
+    db.refresh(user)
+    assert user.hashed_password == current_hash
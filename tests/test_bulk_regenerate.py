@@ -0,0 +1,85 @@
+import asyncio
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app import bulk_regenerate
+from app.ai_service import ai_journal_service
+from app.bulk_regenerate import BulkRegenerator, Checkpoint
+from app.circuit_breaker import CircuitBreaker
+from app.config import settings
+from app.models import JournalEntry
+
+
+class _TimingOutCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise asyncio.TimeoutError()
+
+
+@pytest.fixture
+def failing_openai(monkeypatch):
+    completions = _TimingOutCompletions()
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    monkeypatch.setattr(settings, "openai_retry_base_seconds", 0)
+    monkeypatch.setattr(ai_journal_service, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(ai_journal_service, "breaker", CircuitBreaker("test", min_calls=100))
+    return completions
+
+
+def _regenerator(tmp_path, max_attempts):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), {})
+    return BulkRegenerator({}, checkpoint, concurrency=1, rate=0, batch_size=10,
+                           max_attempts=max_attempts, use_cache=False)
+
+
+def test_main_leaves_retries_to_the_attempt_loop(monkeypatch, tmp_path, db):
+    seen = {}
+
+    async def fake_run(self, limit=None):
+        seen["max_retries"] = settings.openai_max_retries
+        self.db.close()
+
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_max_retries", 2)
+    monkeypatch.setattr(BulkRegenerator, "run", fake_run)
+    monkeypatch.setattr(sys, "argv", ["bulk_regenerate", "--checkpoint", str(tmp_path / "checkpoint.json")])
+
+    bulk_regenerate.main()
+    assert seen["max_retries"] == 0
+
+
+def test_failing_entry_makes_one_request_per_attempt(monkeypatch, tmp_path, db, user, failing_openai):
+    monkeypatch.setattr(settings, "openai_max_retries", 0)
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="A long day at work.")
+    db.add(entry)
+    db.commit()
+
+    regenerator = _regenerator(tmp_path, max_attempts=3)
+    asyncio.run(regenerator.run())
+
+    assert failing_openai.calls == 3
+    assert regenerator.checkpoint.failed == [entry.id]
+    assert regenerator.checkpoint.last_id == entry.id
+
+
+def test_unlimited_rate_still_waits_out_a_throttling_pause():
+    from app.bulk_regenerate import AdaptiveRateLimiter
+
+    limiter = AdaptiveRateLimiter(rate=0)
+
+    async def timed_acquire():
+        started = asyncio.get_running_loop().time()
+        await limiter.acquire()
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(timed_acquire()) < 0.05
+    limiter.on_throttled(0.2)
+    assert asyncio.run(timed_acquire()) >= 0.15
+    assert asyncio.run(timed_acquire()) < 0.05
@@ -0,0 +1,60 @@
+import time
+
+from app.circuit_breaker import CircuitBreaker
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(window_size=4, min_calls=4, failure_rate_threshold=0.5, slow_call_seconds=1.0, open_seconds=60)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_stays_closed_below_the_minimum_number_of_calls():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_at_the_failure_rate_threshold():
+    breaker = _breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_opens_when_calls_are_slow():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_success(2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_trial_success_closes_the_circuit(monkeypatch):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    opened = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: opened + 61)
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one trial call at a time
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_trial_failure_reopens_the_circuit(monkeypatch):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    opened = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: opened + 61)
+
+    assert breaker.allow_request()
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
@@ -0,0 +1,81 @@
+import random
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app import compression
+from app.compression import MARKER, ZLIB, ZSTD, decode_text, encode_text, load_dictionaries
+from app.config import settings
+from app.database import engine
+from app.models import CompressionDictionary, JournalEntry
+
+zstandard = pytest.importorskip("zstandard")
+
+WORDS = "today felt calm after a long walk work was busy but I slept well and called my sister".split()
+
+
+def _entry_text(seed: int, words: int = 120) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+@pytest.fixture(autouse=True)
+def no_dictionary(monkeypatch):
+    monkeypatch.setattr(compression, "_write_dictionary_id", 0)
+
+
+@pytest.mark.parametrize("codec, mode", [(ZSTD, "auto"), (ZLIB, "zlib")])
+def test_long_text_round_trips_compressed(monkeypatch, codec, mode):
+    monkeypatch.setattr(settings, "text_compression", mode)
+    value = _entry_text(1)
+    stored = encode_text(value, as_bytes=True)
+    assert stored[:2] == MARKER + codec
+    assert len(stored) < len(value)
+    assert decode_text(stored) == value
+
+
+def test_short_and_legacy_values_stay_plain():
+    assert encode_text("Short day.", as_bytes=True) == b"Short day."
+    assert decode_text(b"Short day.") == "Short day."
+    assert decode_text("Stored before compression.") == "Stored before compression."
+    assert decode_text(None) is None
+
+
+def test_journal_text_is_stored_as_a_blob(db, user):
+    content = _entry_text(2)
+    db.add(JournalEntry(user_id=user.id, date=date.today(), content=content, ai_response="Thanks for sharing."))
+    db.commit()
+
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT typeof(content), typeof(ai_response) FROM journal_entries")).one()
+    assert tuple(row) == ("blob", "blob")
+    db.expire_all()
+    entry = db.query(JournalEntry).one()
+    assert entry.content == content
+    assert entry.ai_response == "Thanks for sharing."
+    assert db.query(JournalEntry.content).scalar() == content
+
+
+def test_dictionary_is_loaded_once_and_used_without_a_connection(db, monkeypatch):
+    samples = [_entry_text(seed, words=40).encode("utf-8") for seed in range(300)]
+    dictionary = zstandard.train_dictionary(4096, samples)
+    db.add(CompressionDictionary(id=dictionary.dict_id(), data=dictionary.as_bytes()))
+    db.commit()
+
+    assert load_dictionaries(db) == dictionary.dict_id()
+
+    def no_connection(*args, **kwargs):
+        raise AssertionError("compression opened a connection")
+
+    monkeypatch.setattr(engine, "connect", no_connection)
+    value = _entry_text(3)
+    stored = encode_text(value, as_bytes=True)
+    assert zstandard.get_frame_parameters(stored[2:]).dict_id == dictionary.dict_id()
+    assert decode_text(stored) == value
+
+
+def test_missing_dictionary_table_compresses_without_one(db):
+    CompressionDictionary.__table__.drop(engine)
+    assert load_dictionaries(db) == 0
+    assert db.execute(text("SELECT 1")).scalar() == 1
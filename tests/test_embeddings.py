@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+from app.embeddings import embed_text, index_entry, unindex_entry, vector_index
+from app.models import JournalEmbedding, JournalEntry
+
+
+@pytest.fixture
+def entry(db, user):
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="Walked by the river after work.")
+    db.add(entry)
+    db.flush()
+    index_entry(db, entry)
+    db.commit()
+    vector_index._users.pop(user.id, None)
+    return entry
+
+
+def _cached_ids(db, user_id):
+    return list(vector_index._get(db, user_id).entry_ids)
+
+
+def test_rolled_back_index_changes_leave_the_memory_index_alone(db, user, entry):
+    assert _cached_ids(db, user.id) == [entry.id]
+
+    other = JournalEntry(user_id=user.id, date=date.today(), content="Slept badly, long day.")
+    db.add(other)
+    db.flush()
+    index_entry(db, other)
+    unindex_entry(db, entry)
+    db.rollback()
+
+    assert _cached_ids(db, user.id) == [entry.id]
+    assert db.query(JournalEmbedding.entry_id).scalar() == entry.id
+
+
+def test_committed_index_changes_reach_the_memory_index(db, user, entry):
+    assert _cached_ids(db, user.id) == [entry.id]
+
+    other = JournalEntry(user_id=user.id, date=date.today(), content="Slept badly, long day.")
+    db.add(other)
+    db.flush()
+    index_entry(db, other)
+    assert _cached_ids(db, user.id) == [entry.id]  # not before the commit
+    db.commit()
+    assert _cached_ids(db, user.id) == [entry.id, other.id]
+
+    unindex_entry(db, entry)
+    db.commit()
+    assert _cached_ids(db, user.id) == [other.id]
+
+
+def test_search_ranks_the_similar_entry_first(db, user, entry):
+    other = JournalEntry(user_id=user.id, date=date.today(), content="Slept badly, long day.")
+    db.add(other)
+    db.flush()
+    index_entry(db, other)
+    db.commit()
+
+    found = vector_index.search(db, user.id, embed_text("river walk"), k=1, token_budget=1000)
+    assert found == [entry.id]
@@ -0,0 +1,78 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+
+def _stamp(db, revision):
+    db.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
+    db.execute(text("DELETE FROM alembic_version"))
+    if revision is not None:
+        db.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"), {"revision": revision})
+    db.commit()
+
+
+def _client():
+    from app.main import app
+    from app.routers.health import readiness
+
+    readiness._expires_at = 0.0
+    return TestClient(app)
+
+
+def test_live_and_static_health():
+    client = _client()
+    assert client.get("/health/live").json() == {"status": "alive"}
+    assert client.get("/health").json() == {"status": "healthy"}
+
+
+def test_ready_at_alembic_head(db):
+    from app.routers.health import alembic_head
+
+    _stamp(db, alembic_head())
+    response = _client().get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database"]["ok"]
+    assert body["checks"]["ai"]["circuit"] == "closed"
+
+
+def test_not_ready_when_migrations_behind(db):
+    _stamp(db, "0000_old")
+    response = _client().get("/health/ready")
+    assert response.status_code == 503
+    migrations = response.json()["checks"]["migrations"]
+    assert not migrations["ok"]
+    assert migrations["current"] == "0000_old"
+
+
+def test_not_ready_when_database_times_out(monkeypatch):
+    import time
+    from app.routers import health
+
+    monkeypatch.setattr(health, "_probe_database", lambda: time.sleep(0.3))
+    probe = health.ReadinessProbe(cache_seconds=10, db_timeout=0.05)
+    result = asyncio.run(probe.check())
+    assert result["status"] == "not_ready"
+    assert not result["checks"]["database"]["ok"]
+
+
+def test_concurrent_probes_share_one_check(monkeypatch):
+    from app.routers import health
+
+    calls = []
+
+    def probe_database():
+        calls.append(1)
+        return health.alembic_head()
+
+    monkeypatch.setattr(health, "_probe_database", probe_database)
+    probe = health.ReadinessProbe(cache_seconds=10, db_timeout=1)
+
+    async def flood():
+        return await asyncio.gather(*(probe.check() for _ in range(50)))
+
+    results = asyncio.run(flood())
+    assert len(calls) == 1
+    assert all(result["status"] == "ready" for result in results)
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+from app.journal_ai import get_history_summary, refresh_history_summary
+from app.models import JournalEntry
+from app.prompt_builder import estimate_tokens, fit_context, fold_into_summary, truncate_to_last_tokens
+
+TODAY = date.today()
+
+
+def _day(days_ago):
+    return (TODAY - timedelta(days=days_ago)).isoformat()
+
+
+def test_fit_context_keeps_the_newest_summary_lines():
+    summary = "\n".join(f"{_day(100 - day)}: Line for day {day} with a few more words in it." for day in range(40))
+    _, _, fitted = fit_context("Today.", [], summary, budget=1200)
+    assert estimate_tokens(fitted) <= 240
+    assert fitted.endswith("Line for day 39 with a few more words in it.")
+    assert "Line for day 0 " not in fitted
+
+
+def test_truncate_to_last_tokens_starts_on_a_line():
+    text = "first line is here\nsecond line\nthird line"
+    assert truncate_to_last_tokens(text, 6) == "...second line\nthird line"
+    assert truncate_to_last_tokens("short", 10) == "short"
+
+
+def test_fold_orders_by_date_and_replaces_edited_lines():
+    summary = fold_into_summary(None, [f"{_day(5)}: five", f"{_day(3)}: three"], max_tokens=1000)
+    summary = fold_into_summary(summary, [f"{_day(9)}: nine (backdated)", f"{_day(3)}: three, edited"], max_tokens=1000)
+    assert summary.splitlines() == [f"{_day(9)}: nine (backdated)", f"{_day(5)}: five", f"{_day(3)}: three, edited"]
+
+
+def _add(db, user, days_ago, content):
+    entry = JournalEntry(user_id=user.id, date=TODAY - timedelta(days=days_ago), content=content)
+    db.add(entry)
+    db.flush()
+    refresh_history_summary(db, user.id)
+    db.commit()
+    return entry
+
+
+def test_backdated_entries_are_summarized(db, user):
+    for days_ago in (6, 5, 4, 3, 2, 1):
+        _add(db, user, days_ago, f"Entry from {days_ago} days ago.")
+    _add(db, user, 30, "A backdated memory.")
+
+    summary = get_history_summary(db, user.id)
+    assert f"{_day(30)}: A backdated memory." in summary.splitlines()[0]
+    assert all(line[:10] < _day(2) for line in summary.splitlines())
+
+
+def test_edited_entries_are_summarized_again(client, auth_headers, db, user):
+    entries = [_add(db, user, days_ago, f"Original text {days_ago}.") for days_ago in (6, 5, 4, 3)]
+    assert f"{_day(6)}: Original text 6." in get_history_summary(db, user.id)
+
+    response = client.put(
+        f"/journal/{entries[0].id}", params={"ai_mode": "local"}, headers=auth_headers,
+        json={"content": "Rewritten text."}
+    )
+    assert response.status_code == 200
+    db.expire_all()
+    lines = get_history_summary(db, user.id).splitlines()
+    assert f"{_day(6)}: Rewritten text." in lines
+    assert not any("Original text 6" in line for line in lines)
+
+
+def test_deleted_entries_leave_the_summary(client, auth_headers, db, user):
+    entries = [_add(db, user, days_ago, f"Secret number {days_ago}.") for days_ago in (6, 5, 4, 3, 2)]
+    assert f"{_day(6)}: Secret number 6." in get_history_summary(db, user.id)
+
+    assert client.delete(f"/journal/{entries[0].id}", headers=auth_headers).status_code == 200
+    db.expire_all()
+    summary = get_history_summary(db, user.id)
+    assert "Secret number 6" not in summary
+    assert f"{_day(5)}: Secret number 5." in summary
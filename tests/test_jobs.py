@@ -0,0 +1,152 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai_service import ai_journal_service
+from app.circuit_breaker import CircuitBreaker
+from app.config import settings
+from app.jobs import claim_ai_jobs, enqueue_ai_job, requeue_expired_jobs
+from app.models import AIJob, JournalEntry
+from app.worker import process_job
+
+
+class _FakeCompletions:
+    def __init__(self, content=None, error=None):
+        self.content = content
+        self.error = error
+
+    async def create(self, **kwargs):
+        if self.error is not None:
+            raise self.error
+        choice = SimpleNamespace(message=SimpleNamespace(content=self.content), finish_reason="stop")
+        return SimpleNamespace(choices=[choice], usage=None)
+
+
+@pytest.fixture
+def openai_returns(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_max_retries", 0)
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    monkeypatch.setattr(ai_journal_service, "breaker", CircuitBreaker("test", min_calls=100))
+
+    def install(**kwargs):
+        completions = _FakeCompletions(**kwargs)
+        monkeypatch.setattr(ai_journal_service, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return install
+
+
+@pytest.fixture
+def entry(db, user):
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="Busy day, but I went for a run.", mood_before=5)
+    db.add(entry)
+    enqueue_ai_job(db, entry)
+    db.commit()
+    return entry
+
+
+def test_enqueue_reuses_the_pending_job(db, entry):
+    enqueue_ai_job(db, entry, bypass_cache=True)
+    db.commit()
+    jobs = db.query(AIJob).all()
+    assert len(jobs) == 1
+    assert jobs[0].bypass_cache
+    assert entry.ai_status == "pending"
+
+
+def test_claim_takes_each_pending_job_once(db, user):
+    for day in range(3):
+        entry = JournalEntry(user_id=user.id, date=date.today() - timedelta(days=day), content=f"Entry {day}")
+        db.add(entry)
+        enqueue_ai_job(db, entry)
+    db.commit()
+
+    first = claim_ai_jobs(db, "worker-a", 2)
+    second = claim_ai_jobs(db, "worker-b", 2)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(first) & set(second)
+    assert claim_ai_jobs(db, "worker-c", 2) == []
+    assert {job.attempts for job in db.query(AIJob)} == {1}
+
+
+def test_expired_leases_are_requeued(db, entry):
+    [job_id] = claim_ai_jobs(db, "worker-a", 1)
+    assert requeue_expired_jobs(db) == 0
+
+    db.get(AIJob, job_id).locked_at = datetime.utcnow() - timedelta(seconds=settings.ai_job_lease_seconds + 1)
+    db.commit()
+    assert requeue_expired_jobs(db) == 1
+    assert claim_ai_jobs(db, "worker-b", 1) == [job_id]
+
+
+def test_processed_job_stores_the_response(db, entry, openai_returns):
+    openai_returns(content="That run sounds like it helped.")
+    [job_id] = claim_ai_jobs(db, "worker-a", 1)
+    asyncio.run(process_job(job_id))
+
+    db.expire_all()
+    assert db.get(AIJob, job_id).status == "done"
+    assert entry.ai_response == "That run sounds like it helped."
+    assert entry.ai_status == "complete"
+
+
+def test_failed_job_is_retried_then_answered_with_the_fallback(db, entry, openai_returns, monkeypatch):
+    monkeypatch.setattr(settings, "ai_job_max_attempts", 2)
+    openai_returns(error=asyncio.TimeoutError())
+
+    [job_id] = claim_ai_jobs(db, "worker-a", 1)
+    asyncio.run(process_job(job_id))
+    db.expire_all()
+    assert db.get(AIJob, job_id).status == "pending"
+    assert entry.ai_status == "pending"
+
+    assert claim_ai_jobs(db, "worker-a", 1) == [job_id]
+    asyncio.run(process_job(job_id))
+    db.expire_all()
+    job = db.get(AIJob, job_id)
+    assert (job.status, job.attempts) == ("failed", 2)
+    assert entry.ai_status == "failed"
+    assert entry.ai_response == ai_journal_service.fallback_response(entry.mood_before).response
+
+
+def test_open_circuit_does_not_use_up_an_attempt(db, entry, openai_returns):
+    openai_returns(content="Unused.")
+    ai_journal_service.breaker._open("test")
+
+    [job_id] = claim_ai_jobs(db, "worker-a", 1)
+    asyncio.run(process_job(job_id))
+    db.expire_all()
+    job = db.get(AIJob, job_id)
+    assert (job.status, job.attempts) == ("pending", 0)
+
+
+def test_failed_hybrid_job_keeps_the_local_response(db, user, openai_returns, monkeypatch):
+    from app.journal_ai import apply_local_response
+
+    monkeypatch.setattr(settings, "ai_job_max_attempts", 1)
+    openai_returns(error=asyncio.TimeoutError())
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="Slept well and felt rested.", mood_before=6)
+    db.add(entry)
+    local = apply_local_response(entry)
+    enqueue_ai_job(db, entry)
+    db.commit()
+
+    [job_id] = claim_ai_jobs(db, "worker-a", 1)
+    asyncio.run(process_job(job_id))
+    db.expire_all()
+    assert db.get(AIJob, job_id).status == "failed"
+    assert (entry.ai_response, entry.mood_after) == (local.response, local.mood_after)
+    assert entry.ai_status == "failed"
+
+
+def test_edited_entry_drops_the_stale_response_while_queued(client, auth_headers, db, entry, monkeypatch):
+    monkeypatch.setattr(settings, "ai_job_queue", True)
+    entry.ai_response = "An answer to the old text."
+    db.commit()
+
+    response = client.put(f"/journal/{entry.id}", params={"ai_mode": "llm"}, headers=auth_headers,
+                          json={"content": "Rewritten entirely."})
+    assert response.status_code == 200
+    assert response.json()["ai_response"] is None
+    assert response.json()["ai_status"] == "pending"
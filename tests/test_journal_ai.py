@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from app.ai_service import AIOverloadedError, ai_journal_service
+from app.config import Settings, settings
+from app.journal_ai import apply_local_response, fill_ai_response
+from app.models import JournalEntry
+
+
+@pytest.fixture
+def local_entry(db, user):
+    entry = JournalEntry(user_id=user.id, date=date.today(), content="Finished the project and felt proud.", mood_before=6)
+    apply_local_response(entry)
+    entry.ai_status = "pending"
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def _reload(db, entry):
+    db.expire_all()
+    return db.get(JournalEntry, entry.id)
+
+
+def test_failed_completion_keeps_the_local_response(db, local_entry, monkeypatch):
+    local_text = local_entry.ai_response
+
+    async def fail(prompt):
+        raise AIOverloadedError("busy")
+
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(ai_journal_service, "_client", object())
+    monkeypatch.setattr(ai_journal_service, "_create_completion", fail)
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    asyncio.run(fill_ai_response(local_entry.id))
+
+    entry = _reload(db, local_entry)
+    assert entry.ai_response == local_text
+    assert entry.ai_status == "complete"
+
+
+def test_successful_completion_replaces_the_local_response(db, local_entry, monkeypatch):
+    async def complete(prompt):
+        return "A thoughtful reply.", 42
+
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(ai_journal_service, "_client", object())
+    monkeypatch.setattr(ai_journal_service, "_create_completion", complete)
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    asyncio.run(fill_ai_response(local_entry.id))
+
+    entry = _reload(db, local_entry)
+    assert entry.ai_response == "A thoughtful reply."
+    assert entry.ai_status == "complete"
+
+
+def test_without_openai_the_local_response_stays(db, local_entry, monkeypatch):
+    local_text = local_entry.ai_response
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    asyncio.run(fill_ai_response(local_entry.id))
+
+    entry = _reload(db, local_entry)
+    assert entry.ai_response == local_text
+    assert entry.ai_status == "complete"
+
+
+def test_hybrid_entry_without_openai_is_complete_at_once(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    response = client.post(
+        "/journal/", params={"ai_mode": "hybrid"}, headers=auth_headers,
+        json={"content": "A calm walk in the park.", "mood_before": 5}
+    )
+    assert response.status_code == 200
+    assert response.json()["ai_status"] == "complete"
+    assert response.json()["ai_response"]
+
+
+def test_unknown_default_ai_mode_is_rejected(monkeypatch):
+    monkeypatch.setenv("AI_DEFAULT_MODE", "lcoal")
+    with pytest.raises(ValidationError, match="AI_DEFAULT_MODE"):
+        Settings()
+    monkeypatch.setenv("AI_DEFAULT_MODE", "hybrid")
+    assert Settings().ai_default_mode == "hybrid"
@@ -0,0 +1,63 @@
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template(client, auth_headers):
+    route = "/journal/{entry_id}/ai-status"
+    before = _sample("http_requests_total", method="GET", route=route, status="404")
+    queries_before = _sample("db_queries_per_request_count", route=route)
+
+    client.get("/journal/12345/ai-status", headers=auth_headers)
+    client.get("/journal/67890/ai-status", headers=auth_headers)
+
+    assert _sample("http_requests_total", method="GET", route=route, status="404") == before + 2
+    assert _sample("db_queries_per_request_count", route=route) == queries_before + 2
+    assert _sample("db_queries_per_request_sum", route=route) > 0
+    assert _sample("http_requests_in_flight") == 0
+
+
+def test_unknown_paths_share_one_label(client):
+    before = _sample("http_requests_total", method="GET", route="<unmatched>", status="404")
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    assert _sample("http_requests_total", method="GET", route="<unmatched>", status="404") == before + 2
+
+
+def test_metrics_endpoint_exposes_text_format(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert "db_pool_connections_checked_out" in response.text
+
+
+def test_cache_lookups_are_counted():
+    from app.ai_service import AIResponseCache
+
+    cache = AIResponseCache(max_entries=4, persistent=False)
+    hits = _sample("cache_lookups_total", cache="ai_response", result="hit")
+    misses = _sample("cache_lookups_total", cache="ai_response", result="miss")
+    cache.get("missing")
+    cache.set("key", "response", 10)
+    cache.get("key")
+    assert _sample("cache_lookups_total", cache="ai_response", result="hit") == hits + 1
+    assert _sample("cache_lookups_total", cache="ai_response", result="miss") == misses + 1
+
+
+def test_multiprocess_files_are_aggregated(tmp_path):
+    import subprocess
+    import sys
+
+    # Two processes write samples to the shared directory, a third renders the sum
+    script = (
+        "from app import metrics; metrics.http_requests.labels('GET', '/x', '200').inc(3)"
+    )
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "DATABASE_URL": "sqlite://", "PATH": ""}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+    render = "from app import metrics; print(metrics.render_metrics()[0].decode())"
+    output = subprocess.run([sys.executable, "-c", render], env=env, check=True, capture_output=True, text=True).stdout
+    assert 'http_requests_total{method="GET",route="/x",status="200"} 6.0' in output
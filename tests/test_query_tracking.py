@@ -0,0 +1,101 @@
+import logging
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.database import engine, statement_shape
+from app.query_tracking import QueryTrackingMiddleware
+from tests.helpers import assert_max_queries
+
+
+def _looping_app(server_timing_header=False):
+    app = FastAPI()
+    app.add_middleware(QueryTrackingMiddleware, server_timing_header=server_timing_header)
+
+    @app.get("/loop")
+    def loop(n: int = 10):
+        with engine.connect() as connection:
+            for value in range(n):
+                connection.execute(text("SELECT :value"), {"value": value})
+        return {"ok": True}
+
+    return app
+
+
+def test_in_lists_of_any_length_share_a_shape():
+    assert statement_shape("SELECT a FROM t WHERE id IN (?, ?, ?)") == statement_shape("SELECT a FROM t WHERE id IN (?)")
+    assert statement_shape("WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "WHERE id IN (?)"
+
+
+def test_repeated_statement_is_reported(caplog):
+    client = TestClient(_looping_app())
+    with caplog.at_level(logging.WARNING, logger="app.query_tracking"):
+        client.get("/loop?n=10")
+    assert any("Possible N+1" in record.getMessage() and "10 times" in record.getMessage() for record in caplog.records)
+
+
+def test_query_budget_is_reported(caplog, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "db_query_budget", 3)
+    monkeypatch.setattr(settings, "db_repeated_statement_limit", 100)
+    client = TestClient(_looping_app())
+    with caplog.at_level(logging.WARNING, logger="app.query_tracking"):
+        client.get("/loop?n=4")
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("executed 4 statements (budget 3)" in message for message in messages)
+    assert not any("N+1" in message for message in messages)
+
+
+def test_server_timing_header_in_debug():
+    response = TestClient(_looping_app(server_timing_header=True)).get("/loop?n=3")
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+    assert "server-timing" not in TestClient(_looping_app()).get("/loop?n=3").headers
+
+
+def test_assert_max_queries_fails_over_the_limit():
+    client = TestClient(_looping_app())
+    with pytest.raises(AssertionError, match="5 statements executed, expected at most 2"):
+        with assert_max_queries(2):
+            client.get("/loop?n=5")
+
+
+@pytest.fixture
+def history(db, user):
+    """A few habits with two months of check-ins, moods and journal entries, so per-row queries would show"""
+    from app.models import Goal, Habit, HabitCheckIn, JournalEntry, MoodEntry
+
+    today = date.today()
+    for index in range(4):
+        habit = Habit(user_id=user.id, name=f"Habit {index}")
+        db.add(habit)
+        db.flush()
+        for day in range(60):
+            db.add(HabitCheckIn(user_id=user.id, habit_id=habit.id, date=today - timedelta(days=day), completed=day % 3 != 0))
+    for day in range(60):
+        db.add(MoodEntry(user_id=user.id, date=today - timedelta(days=day), mood_score=5 + day % 4))
+        db.add(JournalEntry(user_id=user.id, date=today - timedelta(days=day), content="A day.", mood_before=5))
+    db.add(Goal(user_id=user.id, title="Goal", target_date=today + timedelta(days=3)))
+    db.commit()
+
+
+@pytest.mark.parametrize("path, limit", [
+    ("/analytics/dashboard", 7),
+    ("/analytics/habits/streaks", 3),
+    ("/habits/streaks/", 3),
+    ("/analytics/weekly-stats?weeks=12", 5),
+    (f"/analytics/calendar/{date.today().year}/{date.today().month}", 4),
+    ("/moods/trends/", 2),
+    ("/moods/stats/weekly", 2),
+    ("/journal/stats/weekly", 2),
+    ("/goals/stats/overview", 2),
+])
+def test_endpoint_query_budgets(client, auth_headers, history, path, limit):
+    client.get(path, headers=auth_headers)  # warm per-process caches (token version)
+    with assert_max_queries(limit):
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.rate_limit import (
+    MAX_LOGIN_BODY_BYTES, InMemoryBackend, Limit, RateLimitMiddleware, SQLiteBackend, default_limits
+)
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "buckets.db"))
+
+
+@pytest.mark.parametrize("make_backend", [lambda path: InMemoryBackend(), lambda path: SQLiteBackend(str(path / "b.db"))])
+def test_bucket_allows_burst_then_waits(tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+    limit = Limit(rate=1.0, capacity=2)
+    assert backend.consume("k", limit) == 0
+    assert backend.consume("k", limit) == 0
+    assert 0 < backend.consume("k", limit) <= 1.0
+
+
+@pytest.mark.parametrize("make_backend", [lambda path: InMemoryBackend(), lambda path: SQLiteBackend(str(path / "b.db"))])
+def test_refund_returns_tokens(tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+    limit = Limit(rate=0.001, capacity=1)
+    assert backend.consume("k", limit) == 0
+    backend.refund("k", limit)
+    assert backend.consume("k", limit) == 0
+
+
+def test_busy_database_fails_open(sqlite_backend):
+    blocker = sqlite3.connect(sqlite_backend.path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        assert sqlite_backend.consume("k", Limit(1.0, 1)) == 0.0
+        assert not sqlite_backend._connection().in_transaction
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert sqlite_backend.consume("k", Limit(1.0, 1)) == 0.0
+
+
+def test_prune_deletes_only_refilled_buckets(sqlite_backend):
+    limit = Limit(rate=1.0, capacity=10)  # refills from empty in 10s
+    sqlite_backend.consume("fresh", limit)
+    connection = sqlite_backend._connection()
+    connection.execute("INSERT INTO buckets (key, tokens, updated) VALUES ('idle', 0, ?)", (time.time() - 60,))
+    sqlite_backend.prune()
+    keys = {key for (key,) in connection.execute("SELECT key FROM buckets")}
+    assert keys == {"fresh"}
+
+
+def _app(backend, limits):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+
+    @app.post("/auth/login")
+    async def login(request: Request):
+        return {"email": (await request.json()).get("email")}
+
+    app.add_middleware(RateLimitMiddleware, backend=backend, limits=limits)
+    return TestClient(app)
+
+
+def test_rejected_request_refunds_earlier_buckets():
+    backend = InMemoryBackend()
+    limits = default_limits()
+    limits["api_ip"] = Limit(rate=0.001, capacity=5)
+    limits["api_user"] = Limit(rate=0.001, capacity=1)
+    checks = [("api-ip:testclient", limits["api_ip"], backend), ("user:1", limits["api_user"], backend)]
+
+    assert RateLimitMiddleware._consume_all(checks) == 0
+    for _ in range(3):
+        assert RateLimitMiddleware._consume_all(checks) > 0
+    # Only the first request used the per-IP bucket; rejected ones were refunded
+    assert backend._buckets["api-ip:testclient"][0] == pytest.approx(4, abs=0.01)
+
+
+def test_limited_requests_get_429_with_retry_after():
+    limits = default_limits()
+    limits["api_ip"] = Limit(rate=0.5, capacity=1)
+    client = _app(InMemoryBackend(), limits)
+    assert client.get("/items").status_code == 200
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+
+
+def test_blocking_backend_runs_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingBackend(SQLiteBackend):
+        def consume(self, key, limit, cost=1.0):
+            threads.append(threading.current_thread().name)
+            return super().consume(key, limit, cost)
+
+    client = _app(RecordingBackend(str(tmp_path / "b.db")), default_limits())
+    event_loop_threads = []
+
+    @client.app.middleware("http")
+    async def record_loop_thread(request, call_next):
+        event_loop_threads.append(threading.current_thread().name)
+        return await call_next(request)
+
+    assert client.get("/items").status_code == 200
+    assert threads and event_loop_threads
+    assert event_loop_threads[0] not in threads
+
+
+def test_login_email_bucket_applies_after_the_body_is_replayed():
+    limits = default_limits()
+    limits["login_email"] = Limit(rate=0.001, capacity=1)
+    client = _app(InMemoryBackend(), limits)
+
+    response = client.post("/auth/login", json={"email": "Someone@Example.com", "password": "x"})
+    assert response.status_code == 200
+    assert response.json() == {"email": "Someone@Example.com"}
+    assert client.post("/auth/login", json={"email": "someone@example.com", "password": "x"}).status_code == 429
+
+
+def test_oversized_login_body_is_rejected_unread():
+    backend = InMemoryBackend()
+    client = _app(backend, default_limits())
+
+    padding = "x" * MAX_LOGIN_BODY_BYTES
+    response = client.post("/auth/login", json={"email": "someone@example.com", "password": padding})
+    assert response.status_code == 413
+    assert not any(key.startswith("email:") for key in backend._buckets)
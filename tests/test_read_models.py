@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import read_models
+from app.models import Goal, Habit, HabitCheckIn, JournalEntry, MoodEntry, User
+
+TODAY = date.today()
+WEEK_START = TODAY - timedelta(days=TODAY.weekday())
+
+
+def _days_ago(days):
+    return TODAY - timedelta(days=days)
+
+
+@pytest.fixture
+def seeded(db, user):
+    """Habits, moods, entries and goals for `user`, with dates either side of week boundaries"""
+    run = Habit(user_id=user.id, name="Run")
+    read = Habit(user_id=user.id, name="Read")
+    stretch = Habit(user_id=user.id, name="Stretch")
+    retired = Habit(user_id=user.id, name="Retired", is_active=False)
+    db.add_all([run, read, stretch, retired])
+    db.flush()
+
+    # Run: today back to 2 days ago, a missed day, then 4 to 8 days ago
+    for days in (0, 1, 2, 4, 5, 6, 7, 8):
+        db.add(HabitCheckIn(user_id=user.id, habit_id=run.id, date=_days_ago(days), completed=True))
+    db.add(HabitCheckIn(user_id=user.id, habit_id=run.id, date=_days_ago(3), completed=False))
+    # Read: last done yesterday
+    for days in (1, 2):
+        db.add(HabitCheckIn(user_id=user.id, habit_id=read.id, date=_days_ago(days), completed=True))
+    db.add(HabitCheckIn(user_id=user.id, habit_id=retired.id, date=TODAY, completed=True))
+
+    # The Monday and Sunday around each boundary, plus a day just before the first week
+    boundary_days = [WEEK_START, WEEK_START - timedelta(days=1), WEEK_START - timedelta(days=7),
+                     WEEK_START - timedelta(days=8), WEEK_START - timedelta(days=14),
+                     WEEK_START - timedelta(days=15)]
+    for score, day in enumerate(boundary_days, start=3):
+        db.add(MoodEntry(user_id=user.id, date=day, mood_score=score))
+        db.add(JournalEntry(user_id=user.id, date=day, content=f"Entry for {day}"))
+    db.add(MoodEntry(user_id=user.id, date=WEEK_START, mood_score=8))
+    db.add(JournalEntry(user_id=user.id, date=WEEK_START, content="Second entry that Monday"))
+
+    db.add_all([
+        Goal(user_id=user.id, title="Done early", target_date=_days_ago(10), is_completed=True),
+        Goal(user_id=user.id, title="Done, due soon", target_date=TODAY + timedelta(days=3), is_completed=True),
+        Goal(user_id=user.id, title="Overdue", target_date=_days_ago(1)),
+        Goal(user_id=user.id, title="Due today", target_date=TODAY),
+        Goal(user_id=user.id, title="Due in a week", target_date=TODAY + timedelta(days=7)),
+        Goal(user_id=user.id, title="Due later", target_date=TODAY + timedelta(days=8)),
+        Goal(user_id=user.id, title="Someday"),
+    ])
+    db.commit()
+    return {"run": run.id, "read": read.id, "stretch": stretch.id}
+
+
+@pytest.fixture
+def empty_user_headers(db):
+    from app.auth import create_user_access_token, get_password_hash
+
+    other = User(email="empty@example.com", hashed_password=get_password_hash("secret-password"))
+    db.add(other)
+    db.commit()
+    return {"Authorization": f"Bearer {create_user_access_token(other)}"}
+
+
+def _orm_weekly_stats(db, user_id, weeks):
+    """The per-week ORM queries /analytics/weekly-stats used before the read models"""
+    stats = []
+    for week in range(weeks):
+        week_start = TODAY - timedelta(days=TODAY.weekday() + week * 7)
+        week_end = week_start + timedelta(days=6)
+        habits = db.query(Habit).filter(Habit.user_id == user_id, Habit.is_active == True).all()
+        check_ins = db.query(HabitCheckIn).filter(
+            HabitCheckIn.user_id == user_id, HabitCheckIn.date >= week_start, HabitCheckIn.date <= week_end
+        ).all()
+        mood_entries = db.query(MoodEntry).filter(
+            MoodEntry.user_id == user_id, MoodEntry.date >= week_start, MoodEntry.date <= week_end
+        ).all()
+        journal_entries = db.query(JournalEntry).filter(
+            JournalEntry.user_id == user_id, JournalEntry.date >= week_start, JournalEntry.date <= week_end
+        ).all()
+        scores = [entry.mood_score for entry in mood_entries]
+        stats.append({
+            "week_start": week_start.isoformat(),
+            "week_end": week_end.isoformat(),
+            "habits_completed": len([c for c in check_ins if c.completed]),
+            "total_habits": len(habits) * 7,
+            "average_mood": round(sum(scores) / len(scores), 2) if scores else None,
+            "journal_entries": len(journal_entries),
+        })
+    return stats
+
+
+def _orm_completed_dates(db, habit_id):
+    check_ins = db.query(HabitCheckIn).filter(
+        HabitCheckIn.habit_id == habit_id, HabitCheckIn.completed == True
+    ).order_by(HabitCheckIn.date.desc()).all()
+    return [check_in.date for check_in in check_ins]
+
+
+def _orm_goal_overview(db, user_id):
+    goals = db.query(Goal).filter(Goal.user_id == user_id)
+    total = goals.count()
+    completed = goals.filter(Goal.is_completed == True).count()
+    due_soon = goals.filter(
+        Goal.is_completed == False, Goal.target_date >= TODAY, Goal.target_date <= TODAY + timedelta(days=7)
+    ).count()
+    overdue = goals.filter(Goal.is_completed == False, Goal.target_date < TODAY).count()
+    return {
+        "total_goals": total,
+        "completed_goals": completed,
+        "completion_rate": round(completed / total * 100 if total else 0, 1),
+        "due_soon": due_soon,
+        "overdue": overdue,
+    }
+
+
+def test_weekly_stats_match_the_per_week_orm_queries(client, db, user, auth_headers, seeded):
+    response = client.get("/analytics/weekly-stats?weeks=3", headers=auth_headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats == _orm_weekly_stats(db, user.id, 3)
+    # Each Monday lands in its own week and the Sunday before it in the previous one
+    assert [week["journal_entries"] for week in stats] == [2, 2, 2]
+    assert stats[0]["average_mood"] == 5.5
+    assert stats[0]["total_habits"] == 21
+
+
+def test_completed_dates_match_the_per_habit_orm_queries(db, seeded):
+    habit_ids = list(seeded.values())
+    completed = read_models.completed_dates_by_habit(db, habit_ids)
+    for habit_id in habit_ids:
+        assert completed[habit_id] == _orm_completed_dates(db, habit_id)
+    assert completed[seeded["stretch"]] == []
+    assert read_models.completed_dates_by_habit(db, []) == {}
+
+
+def test_streaks_count_up_to_the_gap(client, auth_headers, seeded):
+    analytics = {s["habit_name"]: s for s in client.get("/analytics/habits/streaks", headers=auth_headers).json()}
+    habits = {s["habit_name"]: s for s in client.get("/habits/streaks/", headers=auth_headers).json()}
+    assert set(analytics) == set(habits) == {"Run", "Read", "Stretch"}
+
+    for streaks in (analytics, habits):
+        assert (streaks["Run"]["current_streak"], streaks["Run"]["longest_streak"]) == (3, 5)
+        assert streaks["Run"]["last_completed"] == TODAY.isoformat()
+        assert streaks["Read"]["longest_streak"] == 2
+        assert streaks["Read"]["last_completed"] == _days_ago(1).isoformat()
+        assert streaks["Stretch"] == {"habit_id": seeded["stretch"], "habit_name": "Stretch", "current_streak": 0,
+                                      "longest_streak": 0, "last_completed": None}
+    # Only the habits router lets a streak last done yesterday carry on
+    assert analytics["Read"]["current_streak"] == 0
+    assert habits["Read"]["current_streak"] == 2
+
+
+def test_goal_overview_matches_the_orm_counts(client, db, user, auth_headers, seeded):
+    overview = client.get("/goals/stats/overview", headers=auth_headers).json()
+    assert overview == _orm_goal_overview(db, user.id)
+    assert (overview["total_goals"], overview["completed_goals"], overview["due_soon"], overview["overdue"]) == (7, 2, 2, 1)
+
+
+def test_a_user_without_data_gets_empty_results(client, db, empty_user_headers, seeded):
+    stats = client.get("/analytics/weekly-stats?weeks=2", headers=empty_user_headers).json()
+    assert [(week["habits_completed"], week["total_habits"], week["average_mood"], week["journal_entries"])
+            for week in stats] == [(0, 0, None, 0)] * 2
+    assert client.get("/analytics/habits/streaks", headers=empty_user_headers).json() == []
+    assert client.get("/habits/streaks/", headers=empty_user_headers).json() == []
+    assert client.get("/goals/stats/overview", headers=empty_user_headers).json() == {
+        "total_goals": 0, "completed_goals": 0, "completion_rate": 0, "due_soon": 0, "overdue": 0
+    }
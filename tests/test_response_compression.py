@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.response_compression import ResponseCompressionMiddleware, negotiate_encoding
+
+BIG_TEXT = "journal " * 500
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0, *", None),
+    ("*", "gzip"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("deflate, gzip;q=0.3", "gzip"),
+    ("gzip;q=abc", None),
+    ("gzip;q=", None),
+    (" , ;q=1, gzip ; q = 0.5", "gzip"),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG_TEXT, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"0" * 5000, media_type="image/png")
+
+    app.add_middleware(ResponseCompressionMiddleware, minimum_size=100, gzip_level=6)
+    return app
+
+
+@pytest.fixture
+def client():
+    return TestClient(make_app())
+
+
+def test_large_body_is_gzipped(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BIG_TEXT)
+    assert response.text == BIG_TEXT
+
+
+def test_identity_when_not_accepted(client):
+    response = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == BIG_TEXT
+
+
+@pytest.mark.parametrize("path", ["/small", "/not-modified", "/image"])
+def test_skipped_responses(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+async def _call(asgi_app, path="/"):
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("test", 1), "root_path": "",
+    }
+    await asgi_app(scope, receive, send)
+    disconnected.set()
+    return messages
+
+
+def test_streaming_chunks_are_flushed_incrementally():
+    events = [f"data: event {i} {'x' * 80}\n\n" for i in range(5)]
+
+    app = FastAPI()
+
+    @app.get("/stream")
+    def stream():
+        async def generate():
+            for event in events:
+                yield event
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    app.add_middleware(ResponseCompressionMiddleware, minimum_size=10)
+    messages = asyncio.run(_call(app, "/stream"))
+
+    start = messages[0]
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    # Each chunk decompresses on its own to exactly the event sent, without waiting for the end
+    decompressor = zlib.decompressobj(31)
+    bodies = [m["body"] for m in messages[1:] if m["body"]]
+    assert [decompressor.decompress(body).decode() for body in bodies[:len(events)]] == events
+    assert messages[-1]["more_body"] is False
+    assert gzip.decompress(b"".join(m["body"] for m in messages[1:])).decode() == "".join(events)
+
+
+def test_start_without_body_is_still_sent():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+
+    messages = asyncio.run(_call(ResponseCompressionMiddleware(app, minimum_size=10)))
+    assert messages[0] == {"type": "http.response.start", "status": 204, "headers": []}
+    assert messages[1]["type"] == "http.response.body"
+    assert messages[1]["more_body"] is False
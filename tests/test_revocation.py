@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta
+
+from app.models import RevokedToken
+from app.revocation import BloomFilter, RevocationList, purge_expired_revocations
+
+
+def _record(db, user, jti, expires_in=timedelta(days=1), revoked_ago=timedelta(0)):
+    now = datetime.utcnow()
+    db.add(RevokedToken(jti=jti, user_id=user.id, expires_at=now + expires_in, revoked_at=now - revoked_ago))
+    db.commit()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    ids = [f"token-{i}" for i in range(1000)]
+    for jti in ids:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in ids)
+    assert sum(f"other-{i}" in bloom for i in range(1000)) < 20
+
+
+def test_sync_picks_up_revocations_from_other_workers(db, user):
+    revocations = RevocationList(capacity=100, sync_interval=0)
+    assert not revocations.is_revoked(db, "a")
+
+    other_worker = RevocationList(capacity=100, sync_interval=0)
+    other_worker.revoke(db, "a", user.id, datetime.utcnow() + timedelta(days=1))
+    db.commit()
+
+    assert revocations.is_revoked(db, "a")
+    assert not revocations.is_revoked(db, "b")
+
+
+def test_overlap_window_does_not_add_ids_twice(db, user):
+    revocations = RevocationList(capacity=100, sync_interval=0)
+    revocations.sync(db)
+    _record(db, user, "a")
+    revocations.revoke(db, "b", user.id, datetime.utcnow() + timedelta(days=1))
+    db.commit()
+
+    for _ in range(3):
+        revocations.sync(db)
+    assert revocations._filter.count == 2
+
+
+def test_ids_leave_the_overlap_bookkeeping(db, user):
+    revocations = RevocationList(capacity=100, sync_interval=0)
+    _record(db, user, "old", revoked_ago=timedelta(minutes=5))
+    _record(db, user, "new")
+    revocations.sync(db)
+    assert set(revocations._recent) == {"new"}
+
+
+def test_purge_deletes_expired_revocations(db, user):
+    _record(db, user, "expired", expires_in=timedelta(seconds=-1))
+    _record(db, user, "live")
+
+    assert purge_expired_revocations() == 1
+    db.expire_all()
+    assert [jti for (jti,) in db.query(RevokedToken.jti)] == ["live"]
+
+
+class _Later(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime.utcnow() + timedelta(seconds=5)
+
+
+def test_rebuild_drops_expired_ids_from_the_filter(db, user, monkeypatch):
+    revocations = RevocationList(capacity=100, sync_interval=0, rebuild_interval=3600)
+    _record(db, user, "soon", expires_in=timedelta(seconds=1))
+    _record(db, user, "live")
+    revocations.sync(db)
+    assert revocations._filter.count == 2
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 3601)
+    monkeypatch.setattr("app.revocation.datetime", _Later)
+    revocations.sync(db)
+    assert revocations._filter.count == 1
+    assert "soon" not in revocations._filter
+
+
+def test_app_startup_schedules_the_purge(db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app):
+        assert not app.state.revocation_purge.done()
+    assert app.state.revocation_purge.cancelled()
@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.models import JournalEntry, User
+from app.search import decode_cursor, highlight, search_entries
+
+
+def _entry(db, user, content, days_ago=0):
+    entry = JournalEntry(user_id=user.id, date=date.today() - timedelta(days=days_ago), content=content)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def test_snippets_escape_entry_text(db, user):
+    _entry(db, user, 'Walked by the lake <script>alert("x")</script> & felt calm')
+    [result], _ = search_entries(db, user.id, "lake")
+    assert "<script>" not in result["snippet"]
+    assert "&lt;script&gt;" in result["snippet"]
+    assert "&amp;" in result["snippet"]
+    assert "<mark>lake</mark>" in result["snippet"]
+
+
+def test_highlight_marks_only_delimited_matches():
+    assert highlight("a <b> c") == "a &lt;b&gt; <mark>c</mark>"
+
+
+def test_index_follows_inserts_updates_and_deletes(db, user):
+    entry = _entry(db, user, "Morning run in the rain")
+    assert [r["id"] for r in search_entries(db, user.id, "rain")[0]] == [entry.id]
+
+    entry.content = "Evening swim"
+    db.commit()
+    assert search_entries(db, user.id, "rain")[0] == []
+    assert [r["id"] for r in search_entries(db, user.id, "swim")[0]] == [entry.id]
+
+    db.delete(entry)
+    db.commit()
+    assert search_entries(db, user.id, "swim")[0] == []
+
+
+def test_index_reads_compressed_entries_without_a_copy_of_them(db, user):
+    long_text = "A long walk along the river before breakfast, then coffee with an old friend. " * 10
+    entry = _entry(db, user, long_text)
+    assert bytes(entry._content)[:1] == b"\x00"  # stored compressed
+    [result], _ = search_entries(db, user.id, "river")
+    assert "<mark>river</mark>" in result["snippet"]
+
+    entry.content = long_text.replace("river", "canal")
+    db.commit()
+    db.delete(_entry(db, user, "A short note about the river"))
+    db.commit()
+    assert search_entries(db, user.id, "river")[0] == []
+
+    tables = {name for (name,) in db.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    assert "journal_fts_content" not in tables
+    # Compares the index with the text read through the content view
+    db.execute(text("INSERT INTO journal_fts (journal_fts, rank) VALUES ('integrity-check', 1)"))
+
+
+def test_results_are_scoped_to_the_user(db, user):
+    other = User(email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.commit()
+    _entry(db, other, "Gardening all afternoon")
+    assert search_entries(db, user.id, "gardening")[0] == []
+
+
+def test_pages_cover_every_match_once(db, user):
+    ids = {_entry(db, user, f"Tea with friends, day {day}", days_ago=day).id for day in range(7)}
+    seen, cursor = [], None
+    while True:
+        results, cursor = search_entries(db, user.id, "tea", limit=3, cursor=cursor)
+        seen.extend(r["id"] for r in results)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(ids)
+
+
+def test_cursor_survives_new_entries(db, user):
+    for day in range(4):
+        _entry(db, user, f"Reading a novel, chapter {day}", days_ago=day)
+    first, cursor = search_entries(db, user.id, "novel", limit=2)
+    # Ranks of the existing entries change as the corpus grows; the cursor still resumes after page one
+    _entry(db, user, "novel " * 20, days_ago=30)
+    second, _ = search_entries(db, user.id, "novel", limit=10, cursor=cursor)
+    assert decode_cursor(cursor) == 2
+    assert len(second) == 3
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "W10", "eyJvZmZzZXQiOiAtMX0"])
+def test_malformed_cursor_is_rejected(db, user, cursor):
+    with pytest.raises(ValueError):
+        search_entries(db, user.id, "anything", cursor=cursor)
+
+
+def test_search_endpoint(client, auth_headers, db, user):
+    _entry(db, user, "Quiet <b>evening</b> walk")
+    response = client.get("/journal/search", params={"q": "evening"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["snippet"].count("<b>") == 0
+    assert client.get("/journal/search", params={"q": "x", "cursor": "bad"}, headers=auth_headers).status_code == 400
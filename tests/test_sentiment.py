@@ -0,0 +1,91 @@
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+from app import sentiment
+from app.models import JournalEntry
+from app.sentiment import (
+    INTENSIFIERS, LEXICON, NEGATION_WEIGHT, PHRASES, backfill, mood_from_score, score_text, score_texts
+)
+
+
+def test_terms_match_whole_words_only():
+    assert score_text("I said goodbye to the goods.").hits == 0
+    assert score_text("A good day.").positive == LEXICON["good"]
+    assert score_text("Sadly it was sadder.").hits == 0
+
+
+def test_negation_flips_and_softens_the_next_few_words():
+    assert score_text("not happy").negative == pytest.approx(-LEXICON["happy"] * NEGATION_WEIGHT)
+    assert score_text("I was not at all happy").negative > 0  # within NEGATION_SCOPE tokens
+    assert score_text("not the day I had hoped, but happy").positive == LEXICON["happy"]  # the comma ends it
+    assert score_text("no, it went far beyond okay and I was happy").positive == LEXICON["happy"]
+    assert score_text("didn’t feel sad").positive > 0  # typographic apostrophe
+
+
+def test_intensifiers_scale_the_next_term_only():
+    assert score_text("very happy").positive == pytest.approx(LEXICON["happy"] * INTENSIFIERS["very"])
+    assert score_text("slightly sad").negative == pytest.approx(-LEXICON["sad"] * INTENSIFIERS["slightly"])
+    assert score_text("very happy and calm").positive == pytest.approx(
+        LEXICON["happy"] * INTENSIFIERS["very"] + LEXICON["calm"]
+    )
+
+
+def test_phrases_replace_their_words():
+    burned_out = score_text("I am burned out")
+    assert (burned_out.negative, burned_out.hits) == (-PHRASES[("burned", "out")], 1)
+    assert score_text("woke up well rested").positive == PHRASES[("well", "rested")]
+    assert score_text("I worked hard").hits == 0
+
+
+def test_compound_is_bounded_and_signed():
+    assert score_text("").compound == 0.0
+    assert 0 < score_text("happy").compound < score_text("happy grateful proud").compound < 1
+    assert -1 < score_text("miserable hopeless awful").compound < 0
+
+
+def test_score_texts_matches_score_text():
+    texts = ["A great day.", None, "Not great, really tired.", ""]
+    assert score_texts(texts) == [score_text(text) for text in texts]
+
+
+def test_mood_moves_one_step_with_the_sentiment():
+    assert mood_from_score(5, score_text("Amazing, wonderful day")) == 6
+    assert mood_from_score(5, score_text("Awful and exhausted")) == 4
+    assert mood_from_score(5, score_text("Went to the shop")) == 5
+    assert mood_from_score(10, score_text("joy")) == 10
+    assert mood_from_score(None, score_text("joy")) is None
+
+
+@pytest.fixture
+def entries(db, user):
+    rows = [
+        JournalEntry(user_id=user.id, date=date.today() - timedelta(days=3), content="Happy and proud.",
+                     mood_before=5, mood_after=5),
+        JournalEntry(user_id=user.id, date=date.today() - timedelta(days=2), content="Sad and drained.",
+                     mood_before=5, mood_after=4),
+        JournalEntry(user_id=user.id, date=date.today() - timedelta(days=1), content="Great.", mood_before=None),
+        JournalEntry(user_id=user.id, date=date.today(), content="Lovely, joy.", mood_before=5,
+                     ai_status="pending"),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def test_backfill_recomputes_stale_moods(db, entries):
+    assert backfill(batch_size=1, dry_run=True)[:2] == (2, 1)
+    db.expire_all()
+    assert entries[0].mood_after == 5
+
+    assert backfill(batch_size=1)[:2] == (2, 1)
+    db.expire_all()
+    assert [entry.mood_after for entry in entries] == [6, 4, None, None]
+    assert backfill()[:2] == (2, 0)
+
+
+def test_backfill_command(db, entries, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["sentiment", "backfill", "--dry-run"])
+    sentiment.main()
+    assert capsys.readouterr().out.startswith("Would update mood_after on 1 of 2 journal entries")
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app import models, schemas
+from app.serialization import rows_to_dicts
+from tests.helpers import assert_max_queries
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def rows(db, user):
+    habit = models.Habit(user_id=user.id, name="Run", description=None, category="health")
+    db.add(habit)
+    db.flush()
+    db.add_all([
+        models.HabitCheckIn(user_id=user.id, habit_id=habit.id, date=TODAY, completed=True, notes="Easy 5k"),
+        models.HabitCheckIn(user_id=user.id, habit_id=habit.id, date=TODAY - timedelta(days=1), completed=False),
+        models.MoodEntry(user_id=user.id, date=TODAY, mood_score=7, energy_level=6, stress_level=None, notes="Calm"),
+        models.JournalEntry(user_id=user.id, date=TODAY, content="Long walk by the river. " * 30,
+                            ai_response="That sounds restorative.", mood_before=5, mood_after=6),
+        models.JournalEntry(user_id=user.id, date=TODAY - timedelta(days=1), content="Short one.", mood_before=4),
+        models.Goal(user_id=user.id, title="Sleep by 11", target_date=TODAY + timedelta(days=30)),
+    ])
+    db.commit()
+
+
+@pytest.mark.parametrize("path, model, schema, order", [
+    ("/habits/", models.Habit, schemas.Habit, None),
+    ("/habits/check-ins/", models.HabitCheckIn, schemas.HabitCheckIn, models.HabitCheckIn.date.desc()),
+    ("/moods/", models.MoodEntry, schemas.MoodEntry, models.MoodEntry.date.desc()),
+    ("/journal/", models.JournalEntry, schemas.JournalEntry, models.JournalEntry.date.desc()),
+    ("/goals/", models.Goal, schemas.Goal, models.Goal.created_at.desc()),
+])
+def test_list_endpoints_match_their_response_model(client, auth_headers, db, rows, path, model, schema, order):
+    query = db.query(model)
+    if order is not None:
+        query = query.order_by(order)
+    expected = jsonable_encoder([schema.from_orm(obj) for obj in query])
+
+    with assert_max_queries(3):
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_empty_result_is_an_empty_list(client, auth_headers):
+    assert rows_to_dicts([]) == []
+    assert client.get("/goals/", headers=auth_headers).json() == []
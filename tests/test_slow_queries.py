@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine, track_queries
+from app.slow_queries import SlowQueryLog, parameter_shape
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return tmp_path / "slow.jsonl"
+
+
+def test_slow_select_is_logged_with_plan_and_route(db, user, log_path):
+    slow_log = SlowQueryLog(engine, str(log_path), threshold_ms=0)
+    try:
+        with track_queries("GET /auth/me"):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT id FROM users WHERE email = :email"), {"email": user.email}).all()
+    finally:
+        slow_log.close()
+
+    [record] = [r for r in _records(log_path) if "FROM users" in r["statement"]]
+    assert record["route"] == "GET /auth/me"
+    assert record["params"] == ["str"]
+    assert user.email not in json.dumps(record)
+    assert record["duration_ms"] >= 0
+    assert any("users" in step for step in record["plan"])
+
+
+def test_fast_statements_and_writes_are_not_explained(db, log_path):
+    slow_log = SlowQueryLog(engine, str(log_path), threshold_ms=10_000)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1")).all()
+    finally:
+        slow_log.close()
+    assert not log_path.exists()
+
+    slow_log = SlowQueryLog(engine, str(log_path), threshold_ms=0)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE users SET full_name = full_name WHERE id = :id"), {"id": 1})
+    finally:
+        slow_log.close()
+    [record] = [r for r in _records(log_path) if r["statement"].startswith("UPDATE")]
+    assert "plan" not in record
+
+
+def test_each_statement_shape_is_explained_once_per_interval(db, log_path):
+    slow_log = SlowQueryLog(engine, str(log_path), threshold_ms=0, explain_interval=3600)
+    try:
+        with engine.connect() as connection:
+            for user_id in range(3):
+                connection.execute(text("SELECT id FROM users WHERE id = :id"), {"id": user_id}).all()
+    finally:
+        slow_log.close()
+    records = [r for r in _records(log_path) if "FROM users WHERE id" in r["statement"]]
+    assert len(records) == 3
+    assert sum("plan" in r for r in records) == 1
+
+
+def test_log_rotates(db, log_path):
+    slow_log = SlowQueryLog(engine, str(log_path), threshold_ms=0, explain=False, max_bytes=500, backup_count=2)
+    try:
+        with engine.connect() as connection:
+            for _ in range(20):
+                connection.execute(text("SELECT 1")).all()
+    finally:
+        slow_log.close()
+    assert (log_path.parent / "slow.jsonl.1").exists()
+    assert not (log_path.parent / "slow.jsonl.3").exists()
+
+
+def test_parameter_shape_never_includes_values():
+    assert parameter_shape({"content": "secret", "id": 3}, False) == {"content": "str", "id": "int"}
+    assert parameter_shape([("a", 1), ("b", 2)], True) == {"rows": 2, "row": ["str", "int"]}
@@ -0,0 +1,28 @@
+import start_production
+from app.config import settings
+
+
+def test_pool_budget_rejects_too_many_workers(monkeypatch):
+    monkeypatch.setattr(settings, "database_url", "postgresql://db/app")
+    monkeypatch.setattr(settings, "db_pool_size", 5)
+    monkeypatch.setattr(settings, "db_max_overflow", 5)
+    monkeypatch.setattr(settings, "db_max_connections", 97)
+
+    assert start_production.pool_budget_error(9) == ""
+    error = start_production.pool_budget_error(10)
+    assert "10 workers" in error and "100" in error
+
+
+def test_pool_budget_ignores_sqlite(monkeypatch):
+    monkeypatch.setattr(settings, "database_url", "sqlite:///./x.db")
+    assert start_production.pool_budget_error(1000) == ""
+
+
+def test_gunicorn_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 3)
+    monkeypatch.setattr(settings, "web_max_requests", 500)
+    options = start_production.gunicorn_options()
+    assert options["workers"] == 3
+    assert options["max_requests"] == 500
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["preload_app"] == settings.web_preload